@@ -0,0 +1,312 @@
+"""
+Timing and memory profile of the parsing pipeline stages on generated pages, compared to a stored baseline
+"""
+
+from typing import Callable, Optional, Union
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+import json
+import logging
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generator import OryxPageGenerator
+from src import runner
+from src.backends import BACKENDS, resolve_backend
+from src.loss_parser import OryxLossParser
+from src.util import HTMLFileContent
+
+
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+SCALES = (1, 10, 100)
+STAGES = ("load", "truncate_content", "truncate_soup", "parse_losses")
+# Stages faster than this are not flagged, timer noise dominates there
+MIN_SECONDS = 0.005
+# Iterations of the calibration workload, the unit of the stored stage times
+CALIBRATION_LOOPS = 100_000
+
+
+class StageResult:
+    def __init__(self, seconds: float = 0.0, peak_bytes: int = 0):
+        """
+        :param seconds: best wall time over the repeats
+        :param peak_bytes: peak traced memory allocated during the stage
+        """
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+
+    def to_dict(self) -> dict:
+        return {"seconds": round(self.seconds, 6), "peak_bytes": self.peak_bytes}
+
+
+class PipelineBenchmark:
+    """
+    Runs load -> truncate_content -> truncate_soup -> parse_losses on a generated page per scale.
+    Timing runs are done without tracemalloc (it slows allocations down a lot), the memory run after them.
+    """
+
+    def __init__(
+        self,
+        generator: Optional[OryxPageGenerator] = None,
+        backend: str = "auto",
+        repeat: int = 3,
+    ):
+        """
+        :param generator: page of scale 1, scaled up by multiplying the categories
+        :param backend: BeautifulSoup parser backend
+        :param repeat: timing runs per scale, the fastest one is kept
+        """
+        self.generator = generator if generator else OryxPageGenerator()
+        self.backend = resolve_backend(backend)
+        self.repeat = repeat
+        self.limit, self.limit_tag = runner.UKR_LOSSES_CUTOFF
+
+    def run(self, scales: tuple[int, ...] = SCALES) -> dict:
+        """
+        :param scales: page size factors
+        :return: {scale: {stage: StageResult}}
+        """
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for scale in scales:
+                generator = self.generator.scaled(scale)
+                page = generator.write(Path(tmp_dir) / f"oryx_{scale}x.html")
+                results[scale] = self.run_page(page, generator.expected_rows)
+                logger.info(f"Benchmarked {scale}x page ({page.stat().st_size} bytes)")
+        return results
+
+    def run_page(self, page: Path, expected_rows: int) -> dict:
+        stages = {stage: StageResult(float("inf")) for stage in STAGES}
+        for _ in range(self.repeat):
+            for stage, (seconds, _) in self._pipeline(page, expected_rows).items():
+                stages[stage].seconds = min(stages[stage].seconds, seconds)
+        tracemalloc.start()
+        try:
+            peaks = self._pipeline(page, expected_rows, traced=True)
+        finally:
+            tracemalloc.stop()
+        for stage, (_, peak_bytes) in peaks.items():
+            stages[stage].peak_bytes = peak_bytes
+        return stages
+
+    def _pipeline(self, page: Path, expected_rows: int, traced: bool = False) -> dict:
+        measured = {}
+        content = self._measure(
+            measured, "load", traced, HTMLFileContent(page, self.backend).load
+        )
+        self._measure(
+            measured,
+            "truncate_content",
+            traced,
+            lambda: content.truncate_content(self.limit, self.limit_tag),
+        )
+        self._measure(
+            measured,
+            "truncate_soup",
+            traced,
+            lambda: content.truncate_soup(self.limit, self.limit_tag),
+        )
+        rows = self._measure(
+            measured,
+            "parse_losses",
+            traced,
+            lambda: OryxLossParser(self.backend).parse_losses(content.soup),
+        )
+        if len(rows) != expected_rows:
+            raise Exception(f"Parsed {len(rows)} rows from {page}, expected {expected_rows}")
+        return measured
+
+    @staticmethod
+    def _measure(measured: dict, stage: str, traced: bool, func: Callable):
+        if traced:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1] - before if traced else 0
+        measured[stage] = (seconds, peak_bytes)
+        return result
+
+
+def calibrate(repeat: int = 3) -> float:
+    """
+    Best time of a fixed pure Python workload (string and dict operations, like the parsing stages).
+    Stage times are stored and compared as multiples of it, so a baseline taken on a faster or slower
+    machine does not show false regressions.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = {}
+        for i in range(CALIBRATION_LOOPS):
+            key = f"type {i % 1000}"
+            counts[key] = counts.get(key, 0) + len(key.split())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def to_baseline(results: dict, reference_seconds: float) -> dict:
+    """
+    :param results: {scale: {stage: StageResult}}
+    :param reference_seconds: calibration time of the machine the results come from
+    """
+    return {
+        str(scale): {
+            stage: {
+                **result.to_dict(),
+                "relative": round(result.seconds / reference_seconds, 4),
+            }
+            for stage, result in stages.items()
+        }
+        for scale, stages in results.items()
+    }
+
+
+def find_regressions(
+    results: dict,
+    baseline: dict,
+    tolerance: float = 0.5,
+    memory_tolerance: float = 0.2,
+    reference_seconds: float = 1.0,
+) -> list[str]:
+    """
+    :param results: {scale: {stage: StageResult}} of the current run
+    :param baseline: stored results of the same backend (see to_baseline)
+    :param tolerance: allowed relative slowdown of a stage
+    :param memory_tolerance: allowed relative growth of the peak memory of a stage
+    :param reference_seconds: calibration time of this machine, stage times are compared
+    as multiples of it (the "relative" of the baseline)
+    :return: description of every stage over its threshold
+    """
+    regressions = []
+    for scale, stages in results.items():
+        for stage, result in stages.items():
+            stored = baseline.get(str(scale), {}).get(stage)
+            if stored is None:
+                continue
+            # baselines stored before the calibration only have absolute seconds, not comparable
+            relative = result.seconds / reference_seconds
+            max_relative = stored.get("relative", float("inf")) * (1 + tolerance)
+            if result.seconds > MIN_SECONDS and relative > max_relative:
+                regressions.append(
+                    f"{scale}x {stage}: {relative:.2f} > {max_relative:.2f} x reference time"
+                )
+            max_bytes = stored["peak_bytes"] * (1 + memory_tolerance)
+            if result.peak_bytes > max_bytes:
+                regressions.append(
+                    f"{scale}x {stage}: {result.peak_bytes} bytes > {max_bytes:.0f} bytes"
+                )
+    return regressions
+
+
+def format_results(results: dict) -> str:
+    lines = [f"{'scale':>6} {'stage':<18} {'seconds':>10} {'peak MB':>10}"]
+    for scale, stages in results.items():
+        for stage, result in stages.items():
+            lines.append(
+                f"{str(scale) + 'x':>6} {stage:<18} {result.seconds:>10.4f} "
+                f"{result.peak_bytes / 2**20:>10.2f}"
+            )
+    return "\n".join(lines)
+
+
+def load_baseline(baseline_file: Union[str, Path]) -> dict:
+    try:
+        with open(baseline_file) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(
+    baseline_file: Union[str, Path],
+    backend: str,
+    results: dict,
+    reference_seconds: float,
+):
+    """Results are stored per backend, other backends in the file are kept"""
+    baseline = load_baseline(baseline_file)
+    baseline[backend] = to_baseline(results, reference_seconds)
+    with open(baseline_file, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def run_benchmarks(args: Namespace) -> list[str]:
+    """
+    :param args: parsed command line arguments (see parse_benchmark_args)
+    :return: regressions against the baseline, empty when the baseline got updated
+    """
+    benchmark = PipelineBenchmark(backend=args.backend, repeat=args.repeat)
+    reference_seconds = calibrate(args.repeat)
+    results = benchmark.run(tuple(args.scales))
+    print(format_results(results))
+    print(f"reference time {reference_seconds:.4f}s")
+    if args.update_baseline:
+        save_baseline(args.baseline_file, benchmark.backend, results, reference_seconds)
+        return []
+    baseline = load_baseline(args.baseline_file).get(benchmark.backend)
+    if not baseline:
+        logger.warning(f"No {benchmark.backend} baseline in {args.baseline_file}")
+        return []
+    return find_regressions(
+        results, baseline, args.tolerance, args.memory_tolerance, reference_seconds
+    )
+
+
+def parse_benchmark_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Benchmarking the loss parsing stages on generated Oryx pages"
+    )
+    parser.add_argument(
+        "--scales",
+        help="Page size factors (default: 1 10 100)",
+        type=int,
+        nargs="+",
+        default=list(SCALES),
+    )
+    parser.add_argument(
+        "--backend",
+        help="Html parser backend used by BeautifulSoup (auto: fastest installed)",
+        choices=BACKENDS,
+        default="auto",
+    )
+    parser.add_argument(
+        "--repeat", help="Timing runs per scale (default: 3)", type=int, default=3
+    )
+    parser.add_argument(
+        "--tolerance",
+        help="Allowed relative slowdown of a stage (default: 0.5)",
+        type=float,
+        default=0.5,
+    )
+    parser.add_argument(
+        "--memory_tolerance",
+        help="Allowed relative growth of the peak memory of a stage (default: 0.2)",
+        type=float,
+        default=0.2,
+    )
+    parser.add_argument(
+        "--baseline_file",
+        help=f"Stored results to compare with (default: {BASELINE_FILE.name} of the benchmarks package)",
+        default=BASELINE_FILE,
+    )
+    parser.add_argument(
+        "--tags",
+        help="Only time the per tag reads of the loss parser, on the given pages "
+        "(a generated page without any)",
+        nargs="*",
+        metavar="PAGE",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        dest="update_baseline",
+        help="Store the results as the new baseline instead of comparing",
+        action="store_true",
+    )
+    arguments = parser.parse_args()
+    return arguments
@@ -0,0 +1,120 @@
+"""
+Deterministic generator of Oryx shaped loss pages, for benchmarking the parsing pipeline
+"""
+
+from typing import Union
+from pathlib import Path
+import random
+
+from src import runner
+
+
+STATUSES = ("destroyed", "damaged", "abandoned", "captured")
+TYPE_PREFIXES = ("T-", "BMP-", "BTR-", "MT-LB ", "2S", "BM-", "Mi-", "Su-", "ZSU-")
+TYPE_SUFFIXES = ("", "A", "BV", "M", "K", "B3M", "AMD")
+FLAG_LINKS = (
+    "https://upload.wikimedia.org/wikipedia/commons/4/49/Flag_of_Ukraine.svg",
+    "https://upload.wikimedia.org/wikipedia/en/f/f3/Flag_of_Russia.svg",
+)
+
+
+class OryxPageGenerator:
+    """
+    Page layout follows the Oryx blog: an intro h3 summary, one "of which" h3 per category
+    with a <ul> of types, each type an <li> of flag images, count and name, and a proof <a> per loss.
+    Some losses are split over two <a> tags, as on the real page, which OryxLossParser merges back.
+    The same parameters always give the same page.
+    """
+
+    def __init__(
+        self,
+        categories: int = 10,
+        types_per_category: int = 5,
+        losses_per_type: int = 10,
+        broken_every: int = 7,
+        cutoff: str = runner.UKR_LOSSES_CUTOFF[0],
+        seed: int = 0,
+    ):
+        """
+        :param categories: number of category sections
+        :param types_per_category: number of types (<li>) in a category
+        :param losses_per_type: number of losses (proof links) of a type
+        :param broken_every: every n-th loss is split over two <a> tags (0: none)
+        :param cutoff: text of the link ending the parsed part of the page
+        :param seed: seed of the type names, statuses and links
+        """
+        self.categories = categories
+        self.types_per_category = types_per_category
+        self.losses_per_type = losses_per_type
+        self.broken_every = broken_every
+        self.cutoff = cutoff
+        self.seed = seed
+
+    @property
+    def expected_rows(self) -> int:
+        """Rows parsed from the page, broken losses counted once"""
+        return self.categories * self.types_per_category * self.losses_per_type
+
+    def scaled(self, factor: int) -> "OryxPageGenerator":
+        """Same page shape with factor times as many categories"""
+        return OryxPageGenerator(
+            self.categories * factor,
+            self.types_per_category,
+            self.losses_per_type,
+            self.broken_every,
+            self.cutoff,
+            self.seed,
+        )
+
+    def render(self) -> str:
+        rnd = random.Random(self.seed)
+        body = [self._category(rnd, counter) for counter in range(self.categories)]
+        total = self.expected_rows
+        return "\n".join(
+            [
+                "<!DOCTYPE html>",
+                f'<html><head><meta charset="utf-8"><title>Oryx: {self.cutoff}</title></head>',
+                '<body><div class="post-body entry-content">',
+                f"<h3><span>Ukraine - {total}, of which: destroyed: {total}</span></h3>",
+                "<p>Intro of the list, with a <a href=\"https://example.com\">link</a>.</p>",
+                *body,
+                "<h3>Notes</h3>",
+                f'<p>See also <a href="https://www.oryxspioenkop.com/">{self.cutoff}</a></p>',
+                '<ul><li><a href="https://after.cutoff/">(1, destroyed)</a></li></ul>',
+                "</div></body></html>",
+                "",
+            ]
+        )
+
+    def write(self, output_file: Union[str, Path]) -> Path:
+        output_file = Path(output_file)
+        output_file.write_text(self.render(), encoding="utf-8")
+        return output_file
+
+    def _category(self, rnd: random.Random, counter: int) -> str:
+        count = self.types_per_category * self.losses_per_type
+        header = (
+            f'<h3><span class="mw-headline" id="c{counter}">Category {counter} '
+            f"({count}, of which destroyed: {count})</span></h3>"
+        )
+        items = [self._type(rnd, counter, number) for number in range(self.types_per_category)]
+        return "\n".join([header, "<ul>", *items, "</ul>"])
+
+    def _type(self, rnd: random.Random, counter: int, number: int) -> str:
+        name = f"{rnd.choice(TYPE_PREFIXES)}{rnd.randint(1, 99)}{rnd.choice(TYPE_SUFFIXES)}"
+        flags = "".join(
+            f'<img class="thumbborder" src="{link}" width="23">'
+            for link in FLAG_LINKS[: rnd.randint(1, len(FLAG_LINKS))]
+        )
+        links = []
+        for loss in range(1, self.losses_per_type + 1):
+            link = f"https://i.postimg.cc/{counter}-{number}-{loss}/{rnd.getrandbits(32):08x}.jpg"
+            status = rnd.choice(STATUSES)
+            if self.broken_every and loss % self.broken_every == 0:
+                links.append(
+                    f'<a href="{link}">({loss}, {status}</a>'
+                    f'<a href="{link}b"> and {rnd.choice(STATUSES)})</a>'
+                )
+            else:
+                links.append(f'<a href="{link}">({loss}, {status})</a>')
+        return f"<li>{flags} {self.losses_per_type} {name}: {' '.join(links)}</li>"
@@ -0,0 +1,103 @@
+"""
+Per tag cost of reading the h3/li tags of a page: one subtree walk per lookup, as the loss parser
+used to do, compared to the single walk of ListItem.from_tag
+"""
+
+from typing import Callable, Optional, Union
+from pathlib import Path
+import logging
+import tempfile
+import time
+
+from bs4 import Tag
+
+from benchmarks.generator import OryxPageGenerator
+from src.backends import resolve_backend
+from src.loss_parser import PARSED_TAGS, ListItem, OryxLossParser, ParseContext
+from src.util import HTMLFileContent
+
+
+logger = logging.getLogger(__name__)
+
+APPROACHES = ("repeated_walks", "single_walk", "parse_tag_data")
+
+
+def repeated_walks(tag: Tag):
+    """Reads of the tag before the single walk: a get_text/find_all walk per value"""
+    if tag.name == "h3":
+        return tag.get_text(), tag.get_text()
+    images = [img["src"] for img in tag.find_all("img") if "src" in img.attrs]
+    anchors = [(a.get_text(strip=True), a.get("href")) for a in tag.find_all("a")]
+    return tag.get_text(strip=True), images, anchors
+
+
+def single_walk(tag: Tag):
+    if tag.name == "h3":
+        return tag.get_text()
+    return ListItem.from_tag(tag)
+
+
+class TagBenchmark:
+    """
+    Times each approach over all h3/li tags of a page (parsing the page itself is not timed),
+    parse_tag_data being the full hot path of OryxLossParser, rows included.
+    """
+
+    def __init__(self, backend: str = "auto", repeat: int = 5):
+        """
+        :param backend: BeautifulSoup parser backend
+        :param repeat: timing runs per approach, the fastest one is kept
+        """
+        self.backend = resolve_backend(backend)
+        self.repeat = repeat
+
+    def run(self, pages: Optional[list[Union[str, Path]]] = None) -> dict:
+        """
+        :param pages: html files, a generated page if not given
+        :return: {page name: {approach: microseconds per tag}}
+        """
+        if pages:
+            return {Path(page).name: self.run_page(page) for page in pages}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            page = OryxPageGenerator().write(Path(tmp_dir) / "oryx_generated.html")
+            return {page.name: self.run_page(page)}
+
+    def run_page(self, page: Union[str, Path]) -> dict:
+        content = HTMLFileContent(page, self.backend)
+        content.load()
+        tags = content.soup.find_all(PARSED_TAGS)
+        loss_parser = OryxLossParser(self.backend)
+        results = {}
+        for approach in APPROACHES:
+            seconds = min(
+                self._time_tags(tags, self._approach(approach, loss_parser))
+                for _ in range(self.repeat)
+            )
+            results[approach] = seconds / max(len(tags), 1) * 1e6
+        logger.info(f"Benchmarked {len(tags)} tags of {page}")
+        return results
+
+    @staticmethod
+    def _approach(name: str, loss_parser: OryxLossParser) -> Callable:
+        if name == "parse_tag_data":
+            # a new context per run, every li read as a type as after the first category
+            context = ParseContext(category_counter=1)
+            return lambda tag: list(loss_parser.parse_tag_data(tag, context))
+        return {"repeated_walks": repeated_walks, "single_walk": single_walk}[name]
+
+    @staticmethod
+    def _time_tags(tags: list[Tag], func: Callable) -> float:
+        start = time.perf_counter()
+        for tag in tags:
+            func(tag)
+        return time.perf_counter() - start
+
+
+def format_tag_results(results: dict) -> str:
+    lines = [f"{'page':<30} " + " ".join(f"{name:>16}" for name in APPROACHES)]
+    for page, timings in results.items():
+        lines.append(
+            f"{page:<30} "
+            + " ".join(f"{timings[name]:>14.2f}us" for name in APPROACHES)
+        )
+    return "\n".join(lines)
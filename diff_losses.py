@@ -0,0 +1,11 @@
+"""
+Running row level diff between two parsed Oryx loss snapshots
+"""
+
+from src import diff
+from src import util
+
+
+if __name__ == "__main__":
+    args = util.parse_diff_args()
+    diff.SnapshotDiff(args.old, args.new).to_csv(args.output_file)
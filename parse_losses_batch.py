@@ -0,0 +1,15 @@
+"""
+Running loss parsing from Oryx for a directory (or glob) of dated snapshots
+"""
+
+import sys
+
+from src import batch
+from src import util
+
+
+if __name__ == "__main__":
+    args = util.parse_batch_args()
+    summary = batch.run_batch_parsing(args)
+    print(summary)
+    sys.exit(1 if summary.failed else 0)
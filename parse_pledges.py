@@ -1,3 +1,11 @@
 """
 Run parsing of heavy weapons pledged to Ukraine
 """
+
+from src import runner
+from src import util
+
+
+if __name__ == "__main__":
+    args = util.parse_pledge_args()
+    runner.run_pledge_parsing(args)
@@ -0,0 +1,19 @@
+"""
+Benchmarking the loss parsing pipeline, exits with 1 when a stage regressed past the stored baseline
+"""
+
+import sys
+
+from benchmarks import bench, tags
+
+
+if __name__ == "__main__":
+    args = bench.parse_benchmark_args()
+    if args.tags is not None:
+        tag_benchmark = tags.TagBenchmark(args.backend, args.repeat)
+        print(tags.format_tag_results(tag_benchmark.run(args.tags)))
+        sys.exit(0)
+    regressions = bench.run_benchmarks(args)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    sys.exit(1 if regressions else 0)
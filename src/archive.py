@@ -0,0 +1,173 @@
+"""
+Snapshots read straight out of tar/zip archives (e.g. monthly tarballs of daily pages),
+without extracting them to disk
+"""
+
+from typing import BinaryIO, ContextManager, Iterator, Optional, TextIO, Union
+from contextlib import contextmanager
+from functools import total_ordering
+from pathlib import Path, PurePosixPath
+import io
+import logging
+import tarfile
+import zipfile
+
+from src import compressed
+from src import util
+from src.backends import DEFAULT_BACKEND
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMBER_PATTERN = "*.html"
+
+
+@total_ordering
+class ArchiveMember:
+    """
+    One file of a tar or zip archive, used in place of a file path by the parsing pipeline.
+    Picklable, so it can be sent to the batch worker processes. A tar member keeps its header,
+    opening it seeks to its data instead of reading the archive from the start
+    (a compressed tarball is still decompressed up to the member).
+    """
+
+    def __init__(
+        self,
+        archive: Union[str, Path],
+        member: str,
+        tarinfo: Optional[tarfile.TarInfo] = None,
+    ):
+        """
+        :param archive: path to the tar (also compressed) or zip file
+        :param member: path of the file inside the archive
+        :param tarinfo: header of a tar member, None for a zip member
+        """
+        self.archive = Path(archive)
+        self.member = member
+        self.tarinfo = tarinfo
+
+    @property
+    def name(self) -> str:
+        """File name of the member, as Path.name (e.g. for the snapshot date)"""
+        return PurePosixPath(self.member).name
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """
+        Bytes of the member, decompressed when the member itself is compressed (e.g. a .html.gz
+        in a tarball, see compressed.open_stream). The archive is closed with it.
+        """
+        with self.open_raw() as member_file:
+            yield compressed.open_stream(member_file)
+
+    @contextmanager
+    def open_raw(self) -> Iterator[BinaryIO]:
+        """Bytes of the member as stored in the archive"""
+        if self.tarinfo is None:
+            with zipfile.ZipFile(self.archive) as zip_file:
+                with zip_file.open(self.member) as member_file:
+                    yield member_file
+            return
+        with tarfile.open(self.archive) as tar_file:
+            with tar_file.extractfile(self.tarinfo) as member_file:
+                yield member_file
+
+    @contextmanager
+    def open_text(self) -> Iterator[TextIO]:
+        """Text of the member, decoded as open() does"""
+        with self.open() as member_file:
+            yield io.TextIOWrapper(member_file)
+
+    def _key(self) -> tuple[str, str]:
+        return str(self.archive), self.member
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ArchiveMember):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __lt__(self, other) -> bool:
+        if not isinstance(other, ArchiveMember):
+            return NotImplemented
+        return self._key() < other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __str__(self) -> str:
+        return f"{self.archive}:{self.member}"
+
+    def __repr__(self) -> str:
+        return f"ArchiveMember({str(self.archive)!r}, {self.member!r})"
+
+
+class ArchiveMemberContent(util.HTMLFileContent):
+    """HTMLFileContent of an archive member, read from the archive instead of a file"""
+
+    def __init__(self, source: ArchiveMember, backend: str = DEFAULT_BACKEND):
+        super().__init__(source, backend)
+
+    def open_text(self) -> ContextManager[TextIO]:
+        return self._source.open_text()
+
+    def _read_prefix(self, marker: bytes, tag_name: Optional[str]) -> Optional[bytes]:
+        with self._source.open() as member_file:
+            return compressed.read_until_cutoff(member_file, marker, tag_name)
+
+
+def is_archive(file: Union[str, Path]) -> bool:
+    """Tar (also gzip, bz2 or xz compressed) or zip file, told by its content"""
+    return zipfile.is_zipfile(file) or tarfile.is_tarfile(file)
+
+
+def find_members(
+    archive: Union[str, Path], pattern: str = DEFAULT_MEMBER_PATTERN
+) -> list[ArchiveMember]:
+    """
+    :param archive: path to the tar or zip file
+    :param pattern: glob pattern matched from the right of the member paths (as PurePath.match),
+    e.g. *.html or 2025-04-*.html
+    :return: matching files in the archive, sorted by path
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zip_file:
+            members = [
+                ArchiveMember(archive, info.filename)
+                for info in zip_file.infolist()
+                if not info.is_dir()
+            ]
+    else:
+        with tarfile.open(archive) as tar_file:
+            members = [
+                ArchiveMember(archive, info.name, info)
+                for info in tar_file
+                if info.isfile()
+            ]
+    matching = [
+        member for member in members if PurePosixPath(member.member).match(pattern)
+    ]
+    logger.debug(f"{len(matching)} of {len(members)} files in {archive} match {pattern}")
+    return sorted(matching)
+
+
+def html_content(
+    source: Union[str, Path, ArchiveMember], backend: str = DEFAULT_BACKEND
+) -> util.HTMLFileContent:
+    """Content of an html file or archive member"""
+    if isinstance(source, ArchiveMember):
+        return ArchiveMemberContent(source, backend)
+    return util.HTMLFileContent(source, backend)
+
+
+def open_text(source: Union[str, Path, ArchiveMember]) -> ContextManager[TextIO]:
+    """Text of an html file or archive member (see HTMLFileContent.open_text)"""
+    if isinstance(source, ArchiveMember):
+        return source.open_text()
+    return compressed.open_text(source)
+
+
+def open_raw(source: Union[str, Path, ArchiveMember]) -> ContextManager[BinaryIO]:
+    """Bytes of an html file or archive member as stored (a compressed file is not decompressed)"""
+    if isinstance(source, ArchiveMember):
+        return source.open_raw()
+    return open(source, "rb")
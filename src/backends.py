@@ -0,0 +1,34 @@
+"""
+Selectable BeautifulSoup tree builders (parser backends)
+"""
+
+from bs4.builder import builder_registry
+
+DEFAULT_BACKEND = "html.parser"
+# Preference order for "auto", fastest first.
+# On a 2.7MB Oryx page: lxml ~3.1s, html5lib ~6.4s, html.parser ~7.9s (parse + find_all)
+# html5lib is left out as it rewrites malformed markup to the html5 spec.
+AUTO_PREFERENCE = ("lxml", "html.parser")
+BACKENDS = ("auto", "html.parser", "lxml", "html5lib")
+
+
+def available_backends() -> list[str]:
+    return [
+        backend
+        for backend in BACKENDS[1:]
+        if builder_registry.lookup(backend) is not None
+    ]
+
+
+def resolve_backend(backend: str = DEFAULT_BACKEND) -> str:
+    """
+    :param backend: one of BACKENDS, "auto" picks the fastest installed one
+    :return: name of the backend, as accepted by BeautifulSoup
+    """
+    if backend == "auto":
+        return next(name for name in AUTO_PREFERENCE if name in available_backends())
+    if backend not in BACKENDS:
+        raise Exception(f"Unknown parser backend '{backend}', use one of {BACKENDS}")
+    if backend not in available_backends():
+        raise Exception(f"Parser backend '{backend}' is not installed!")
+    return backend
@@ -0,0 +1,261 @@
+"""
+Parsing many dated Oryx snapshots in one run, fanned out over a process pool
+"""
+
+from typing import Callable, Optional, Union
+from argparse import Namespace
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from itertools import chain
+import glob
+import logging
+import time
+
+from src import archive
+from src import cache
+from src import compressed
+from src import runner
+from src import util
+
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file, or a snapshot in a tar/zip archive
+Snapshot = Union[Path, archive.ArchiveMember]
+# Characters of an error message kept in the batch summary
+MAX_ERROR_CHARS = 200
+
+
+def find_snapshots(
+    input_path: Union[str, Path],
+    member_pattern: str = archive.DEFAULT_MEMBER_PATTERN,
+) -> list[Snapshot]:
+    """
+    :param input_path: directory (all .html files in it, also compressed ones), glob pattern
+    or tar/zip archive
+    :param member_pattern: glob pattern of the snapshots in the archives (see archive.find_members)
+    :return: matching files, sorted by name (i.e. by snapshot date), archives replaced by
+    their members
+    """
+    path = Path(input_path)
+    if path.is_dir():
+        files = chain.from_iterable(
+            path.glob(pattern) for pattern in compressed.SNAPSHOT_PATTERNS
+        )
+    else:
+        files = (Path(file) for file in glob.glob(str(input_path)))
+    snapshots = []
+    for file in sorted(file for file in files if file.is_file()):
+        if archive.is_archive(file):
+            snapshots.extend(archive.find_members(file, member_pattern))
+        else:
+            snapshots.append(file)
+    return snapshots
+
+
+def output_path(
+    file: Snapshot, output_dir: Union[str, Path], output_format: str = "csv"
+) -> Path:
+    return (
+        Path(output_dir)
+        / f"{compressed.snapshot_stem(file)}_parsed.{output_format}"
+    )
+
+
+def _parse_to_file(
+    file: Snapshot,
+    output_file: Path,
+    output_format: str,
+    limit: str,
+    limit_tag: Optional[str],
+    backend: str,
+    stream: bool,
+    pretruncate: bool,
+    cache_dir: Optional[Path] = None,
+    enrich: bool = False,
+) -> tuple[int, None]:
+    losses = list(
+        runner.parse_file(
+            file,
+            limit,
+            limit_tag,
+            backend,
+            stream,
+            pretruncate=pretruncate,
+            cache_dir=cache_dir,
+        )
+    )
+    snapshot_date = util.snapshot_date_from_path(file)
+    output = util.ParsedContent(losses, snapshot_date).load()
+    if enrich:
+        output.enrich()
+    output.write(output_file, output_format)
+    return len(losses), None
+
+
+def _parse_with_date(
+    file: Snapshot,
+    limit: str,
+    limit_tag: Optional[str],
+    backend: str,
+    stream: bool,
+    pretruncate: bool,
+    cache_dir: Optional[Path] = None,
+) -> tuple[int, list[dict]]:
+    snapshot_date = util.snapshot_date_from_path(file)
+    losses = [
+        {"snapshot_date": snapshot_date, **util.row_dict(row)}
+        for row in runner.parse_file(
+            file,
+            limit,
+            limit_tag,
+            backend,
+            stream,
+            pretruncate=pretruncate,
+            cache_dir=cache_dir,
+        )
+    ]
+    return len(losses), losses
+
+
+class BatchSummary:
+    def __init__(self):
+        self.rows: dict[Snapshot, int] = {}
+        self.failed: dict[Snapshot, str] = {}
+        self.seconds = 0.0
+
+    def __str__(self) -> str:
+        total = len(self.rows) + len(self.failed)
+        lines = [
+            f"Parsed {len(self.rows)}/{total} snapshots "
+            f"({sum(self.rows.values())} rows) in {self.seconds:.1f}s"
+        ]
+        lines += [f"Failed: {file}: {error}" for file, error in self.failed.items()]
+        return "\n".join(lines)
+
+
+class BatchParser:
+    def __init__(
+        self,
+        limit: str,
+        limit_tag: Optional[str] = None,
+        backend: str = "auto",
+        stream: bool = False,
+        workers: Optional[int] = None,
+        pretruncate: bool = False,
+        cache_dir: Optional[Path] = None,
+        enrich: bool = False,
+    ):
+        self.limit = limit
+        self.limit_tag = limit_tag
+        self.backend = backend
+        self.stream = stream
+        self.workers = workers
+        self.pretruncate = pretruncate
+        self.cache_dir = cache_dir
+        self.enrich = enrich
+
+    def to_files(
+        self,
+        files: list[Snapshot],
+        output_dir: Union[str, Path],
+        output_format: str = "csv",
+    ) -> BatchSummary:
+        """One output per input file, named <input name>_parsed.<format>"""
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        summary, _ = self._run(
+            files,
+            lambda file: (
+                partial(_parse_to_file, enrich=self.enrich),
+                file,
+                output_path(file, output_dir, output_format),
+                output_format,
+            ),
+        )
+        return summary
+
+    def to_combined(
+        self,
+        files: list[Snapshot],
+        output_file: Union[str, Path],
+        output_format: Optional[str] = None,
+    ) -> BatchSummary:
+        """Single output for all input files, with snapshot_date column taken from the file names"""
+        summary, results = self._run(files, lambda file: (_parse_with_date, file))
+        losses = [row for file in sorted(results, key=str) for row in results[file]]
+        if results:
+            output = util.ParsedContent(losses).load()
+            if self.enrich:
+                output.enrich()
+            output.write(output_file, output_format)
+        else:
+            logger.warning("No snapshot parsed, combined output not written")
+        return summary
+
+    def _run(
+        self, files: list[Snapshot], make_task: Callable
+    ) -> tuple[BatchSummary, dict]:
+        """A failing file is recorded in the summary, the rest of the batch still runs"""
+        summary = BatchSummary()
+        results = {}
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for file in files:
+                func, *args = make_task(file)
+                future = executor.submit(
+                    func,
+                    *args,
+                    self.limit,
+                    self.limit_tag,
+                    self.backend,
+                    self.stream,
+                    self.pretruncate,
+                    self.cache_dir,
+                )
+                futures[future] = file
+            for future in as_completed(futures):
+                file = futures[future]
+                try:
+                    summary.rows[file], results[file] = future.result()
+                except Exception as e:
+                    summary.failed[file] = error_message(e)
+                    logger.error(f"Parsing {file} failed: {summary.failed[file]}")
+                    continue
+                logger.info(f"Parsed {file} ({summary.rows[file]} rows)")
+        summary.seconds = time.perf_counter() - start
+        return summary, results
+
+
+def error_message(error: Exception) -> str:
+    """
+    Type and the start of the message: the message of a decoding error holds the bytes
+    it failed on, which can be a whole snapshot
+    """
+    message = str(error)
+    if len(message) > MAX_ERROR_CHARS:
+        message = message[:MAX_ERROR_CHARS] + "..."
+    return f"{type(error).__name__}: {message}"
+
+
+def run_batch_parsing(args: Namespace) -> BatchSummary:
+    """
+    :param args: parsed command line arguments (see util.parse_batch_args)
+    :return: summary of parsed and failed snapshots
+    """
+    limit, limit_tag = runner.CUTOFFS[args.side]
+    batch_parser = BatchParser(
+        limit,
+        limit_tag,
+        args.backend,
+        args.stream,
+        args.workers,
+        args.pretruncate,
+        cache.resolve_cache_dir(args),
+        args.enrich,
+    )
+    files = find_snapshots(args.input, args.members)
+    if args.output_dir:
+        return batch_parser.to_files(files, args.output_dir, args.format or "csv")
+    return batch_parser.to_combined(files, args.output_file, args.format)
@@ -0,0 +1,130 @@
+"""
+Parse result cache: rows of a page parsed before are loaded from disk instead of parsing its html again.
+Entries are pickles, loading one can run arbitrary code: only point the cache at a directory
+that nobody else can write to.
+"""
+
+from typing import Optional, Union
+from argparse import Namespace
+from pathlib import Path
+import hashlib
+import logging
+import os
+import pickle
+
+from src import archive
+from src.backends import DEFAULT_BACKEND, resolve_backend
+from src.loss_parser import PARSER_VERSION
+from src.util import LossRow
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = ".pickle"
+
+
+class ParseCache:
+    """
+    One pickle file per parsed page, named by a hash of the page bytes, the cutoff and parser settings
+    and PARSER_VERSION. Reading an entry refreshes its modification time, and the least
+    recently used entries are removed when the directory grows over max_bytes.
+    Entries are written to a temp file and renamed, so parallel (batch) workers can share the directory.
+    """
+
+    def __init__(
+        self, cache_dir: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        """
+        :param cache_dir: directory of the entries, created if needed
+        :param max_bytes: total size of the entries kept
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(
+        file: Union[str, Path, archive.ArchiveMember],
+        limit: str,
+        limit_tag: Optional[str] = None,
+        backend: str = DEFAULT_BACKEND,
+        parallel: bool = False,
+    ) -> str:
+        """
+        The whole file is hashed: same bytes and cutoff give the same truncated page,
+        without searching the cutoff first
+        :param file: path to the html file, or a member of a tar/zip archive
+        :param limit: cutoff string
+        :param limit_tag: name of the tag holding the cutoff string
+        :param backend: BeautifulSoup parser backend, rows of another backend are not reused
+        :param parallel: parsed in worker processes, rows of a single process run are not reused
+        :return: hex digest
+        """
+        with archive.open_raw(file) as html_file:
+            digest = hashlib.file_digest(html_file, "sha256")
+        settings = (limit, limit_tag, resolve_backend(backend), parallel)
+        digest.update(repr((*settings, PARSER_VERSION)).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[list[LossRow]]:
+        """
+        :param key: see key()
+        :return: cached rows, None if there are none (or the entry is unreadable)
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                rows = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Removing unreadable cache entry {path}: {e!r}")
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def put(self, key: str, rows: list[LossRow]):
+        """
+        :param key: see key()
+        :param rows: parsed rows of the page
+        :return:
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as file:
+            pickle.dump(rows, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, path)
+        self.evict()
+
+    def evict(self):
+        """Least recently used entries are removed until the rest fits in max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.debug(f"Evicted cache entry {path}")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{ENTRY_SUFFIX}"
+
+
+def resolve_cache_dir(args: Namespace) -> Optional[Path]:
+    """
+    :param args: parsed command line arguments (see util._add_parsing_args)
+    :return: cache directory, None when caching is not asked for
+    """
+    return Path(args.cache_dir) if args.cache_dir else None
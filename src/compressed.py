@@ -0,0 +1,129 @@
+"""
+Compressed html snapshots (gzip, bz2, xz, zstd): detected by their magic bytes and decompressed
+while they are read, without a temporary file
+"""
+
+from typing import BinaryIO, Optional, TextIO, TYPE_CHECKING, Union
+from pathlib import Path
+import bz2
+import gzip
+import io
+import logging
+import lzma
+
+from src import cutoff
+
+if TYPE_CHECKING:
+    from src.archive import ArchiveMember
+
+
+logger = logging.getLogger(__name__)
+
+# Format by the leading bytes of the file, the file name is not looked at.
+# The openers take a path or an open binary file.
+MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+# Name suffixes of the formats, only used to find snapshots in a directory
+SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+SNAPSHOT_PATTERNS = ("*.html", *(f"*.html{suffix}" for suffix in SUFFIXES))
+# Decompressed bytes read at once while searching the cutoff
+CHUNK_SIZE = 1024 * 1024
+MAGIC_LENGTH = max(map(len, MAGIC_BYTES))
+
+
+def detect_compression(file: Union[str, Path]) -> Optional[str]:
+    """
+    :param file: path to the file
+    :return: one of the MAGIC_BYTES formats, None for an uncompressed file
+    """
+    with open(file, "rb") as binary_file:
+        return _compression_of(binary_file.read(MAGIC_LENGTH))
+
+
+def open_binary(file: Union[str, Path]) -> BinaryIO:
+    """Decompressed bytes of a compressed file, the file as is otherwise"""
+    compression = detect_compression(file)
+    if compression is None:
+        return open(file, "rb")
+    logger.debug(f"Reading {compression} compressed {file}")
+    return _OPENERS[compression](file)
+
+
+def open_stream(binary_file: BinaryIO) -> BinaryIO:
+    """
+    Decompressed bytes of an already open compressed stream (e.g. a member of an archive),
+    the stream as is otherwise. The format is told by peeking at its leading bytes.
+    """
+    if not hasattr(binary_file, "peek"):
+        binary_file = io.BufferedReader(binary_file)
+    compression = _compression_of(binary_file.peek(MAGIC_LENGTH)[:MAGIC_LENGTH])
+    if compression is None:
+        return binary_file
+    logger.debug(f"Reading {compression} compressed stream")
+    return _OPENERS[compression](binary_file)
+
+
+def open_text(file: Union[str, Path]) -> TextIO:
+    """Same text as open(file) gives for the uncompressed file (locale encoding, newlines)"""
+    if detect_compression(file) is None:
+        return open(file)
+    return io.TextIOWrapper(open_binary(file))
+
+
+def read_until_cutoff(
+    binary_file: BinaryIO,
+    marker: bytes,
+    tag_name: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Optional[bytes]:
+    """
+    Content before the cutoff (see cutoff.find_cutoff_bytes), read in chunks: the rest of a
+    compressed file is not decompressed. The cutoff only depends on the bytes before the marker,
+    so it is searched again only when a chunk brings a new occurrence of the marker.
+    :param binary_file: html bytes, e.g. decompressed by open_binary
+    :param marker: encoded cutoff string
+    :param tag_name: name of the tag holding the cutoff string
+    :param chunk_size: bytes read at once
+    :return: content up to the start tag of the cutoff, None when it is not found
+    """
+    if not tag_name or not marker:
+        return None
+    data = bytearray()
+    while chunk := binary_file.read(chunk_size):
+        searched_from = max(len(data) - len(marker) + 1, 0)
+        data += chunk
+        if data.find(marker, searched_from) == -1:
+            continue
+        position = cutoff.find_cutoff_bytes(data, marker, tag_name)
+        if position is not None:
+            return bytes(data[:position])
+    return None
+
+
+def snapshot_stem(file: Union[str, Path, "ArchiveMember"]) -> str:
+    """Name without the compression and html suffixes (2025-04-21_x of 2025-04-21_x.html.gz)"""
+    path = Path(file if isinstance(file, str) else file.name)
+    if path.suffix.lower() in SUFFIXES:
+        path = path.with_suffix("")
+    return path.stem
+
+
+def _compression_of(head: bytes) -> Optional[str]:
+    return next(
+        (name for magic, name in MAGIC_BYTES.items() if head.startswith(magic)), None
+    )
+
+
+def _open_zstd(file: Union[str, Path, BinaryIO]) -> BinaryIO:
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception(f"{file} is zstd compressed, install zstandard to read it!")
+    return zstandard.open(file, "rb")
+
+
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open, "zstd": _open_zstd}
@@ -0,0 +1,225 @@
+"""
+Locating the cutoff (the tag holding a marker string) in a parsed tree and in its html source
+"""
+
+from typing import Optional
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString, Tag
+
+
+# String types counted by Tag.get_text(), i.e. no comments, doctype or script/style contents
+TEXT_TYPES = (NavigableString, CData)
+# Markup that can hold "<a"-like text without being a tag, skipped when counting start tags
+SKIPPED_MARKUP = r"<!--.*?-->|<script\b.*?</script\s*>|<style\b.*?</style\s*>"
+# Text nodes joined and searched at once, only the last ones are carried over to the next chunk
+CHUNK_NODES = 1024
+
+
+def find_cutoff_tag(
+    soup: BeautifulSoup, string: str, tag_name: Optional[str] = None
+) -> Tag:
+    """
+    Same tag as the first of soup.find_all(tag_name) with the string in its get_text(),
+    found in a single pass over the text nodes instead of getting the text of every tag.
+    :param soup: parsed tree
+    :param string: marker string
+    :param tag_name: name of the tag holding the marker (any tag if not given)
+    :return: outermost tag named tag_name holding an occurrence of the string
+    """
+    if not string:
+        raise Exception("Empty cutoff string!")
+    chunk = []
+    for node in soup.descendants:
+        if type(node) in TEXT_TYPES:
+            chunk.append(node)
+            if len(chunk) >= CHUNK_NODES:
+                tag, chunk = _search_chunk(chunk, string, tag_name)
+                if tag is not None:
+                    return tag
+    tag, _ = _search_chunk(chunk, string, tag_name)
+    if tag is not None:
+        return tag
+    raise Exception(f"String '{string}' not found in content!")
+
+
+def find_cutoff_pos(
+    soup: BeautifulSoup, content: str, string: str, tag_name: Optional[str] = None
+) -> int:
+    """
+    :param soup: tree parsed from content
+    :param content: html source of the tree
+    :param string: marker string
+    :param tag_name: name of the tag holding the marker (any tag if not given)
+    :return: offset of the start tag of the cutoff tag in content
+    """
+    tag = find_cutoff_tag(soup, string, tag_name)
+    if tag.sourceline is not None and tag.sourcepos is not None:
+        return _source_pos(content, tag)
+    return _nth_start_tag_pos(content, tag)
+
+
+def _search_chunk(
+    nodes: list[NavigableString], string: str, tag_name: Optional[str]
+) -> tuple[Optional[Tag], list[NavigableString]]:
+    """
+    :return: cutoff tag if the joined text of the nodes holds the string inside a tag named tag_name,
+    and the last nodes, which can be the start of a match continuing in the next chunk
+    """
+    text = "".join(nodes)
+    starts = list(accumulate((len(node) for node in nodes), initial=0))
+    position = text.find(string)
+    while position != -1:
+        first = nodes[bisect_right(starts, position) - 1]
+        last = nodes[bisect_right(starts, position + len(string) - 1) - 1]
+        tag = _outermost(_common_parent(first, last), tag_name)
+        if tag is not None:
+            return tag, []
+        position = text.find(string, position + 1)
+    carried = bisect_right(starts, max(len(text) - len(string) + 1, 0)) - 1
+    return None, nodes[carried:]
+
+
+def _common_parent(first: NavigableString, last: NavigableString) -> Tag:
+    ancestors = {id(parent) for parent in first.parents}
+    return next(parent for parent in last.parents if id(parent) in ancestors)
+
+
+def _outermost(tag: Tag, tag_name: Optional[str]) -> Optional[Tag]:
+    """Outermost one of the tag and its parents named tag_name (the soup object itself excluded)"""
+    found = None
+    for node in [tag, *tag.parents]:
+        if isinstance(node, BeautifulSoup):
+            break
+        if tag_name is None or node.name == tag_name:
+            found = node
+    return found
+
+
+def _source_pos(content: str, tag: Tag) -> int:
+    """
+    From the parser position of the tag: line and column of "<" with html.parser,
+    of the end of the start tag with html5lib.
+    """
+    line_start = 0
+    for _ in range(tag.sourceline - 1):
+        line_start = content.index("\n", line_start) + 1
+    position = line_start + tag.sourcepos
+    if content.startswith("<", position):
+        return position
+    return content.rfind("<", 0, position)
+
+
+def _nth_start_tag_pos(content: str, tag: Tag) -> int:
+    """
+    Backends without position info (lxml): the start tag is found by counting the
+    tags of the same name before it, in the tree and in the source.
+    """
+    index = sum(1 for _ in tag.find_all_previous(tag.name))
+    start_tags = re.compile(
+        rf"{SKIPPED_MARKUP}|<({re.escape(tag.name)})[\s/>]", re.IGNORECASE | re.DOTALL
+    )
+    for match in start_tags.finditer(content):
+        if match.group(1) is None:
+            continue
+        if index == 0:
+            return match.start()
+        index -= 1
+    raise Exception(f"Start tag of <{tag.name}> cutoff not found in content!")
+
+
+def find_cutoff_bytes(
+    data: bytes, marker: bytes, tag_name: Optional[str] = None
+) -> Optional[int]:
+    """
+    Cutoff on the raw (e.g. memory mapped) html, before any parsing: the first occurrence of the
+    marker in the text of a tag_name element, backtracked to the start of that element.
+    Occurrences inside a start tag (e.g. an attribute value), comment, script or style are skipped,
+    as get_text() does not see them either.
+    :param data: html source
+    :param marker: encoded marker string
+    :param tag_name: name of the tag holding the marker
+    :return: offset of the start tag, None when the literal search can not tell it safely
+    (no tag name, the marker is not found as is in the text of such a tag, or the content before it
+    holds the marker split by an entity or an inline tag, which get_text() would find first)
+    """
+    if not tag_name or not marker:
+        return None
+    names = {tag_name.lower().encode(), tag_name.upper().encode()}
+    position = data.find(marker)
+    while position != -1:
+        if not _in_skipped_markup(data, position) and data.rfind(
+            b"<", 0, position
+        ) < data.rfind(b">", 0, position):
+            start = max(_rfind_tag(data, b"<" + name, position) for name in names)
+            if start != -1 and not any(
+                _find_tag(data, b"</" + name, start, position) != -1 for name in names
+            ):
+                return None if _has_split_marker(data, marker, start) else start
+        position = data.find(marker, position + 1)
+    return None
+
+
+def _has_split_marker(data: bytes, marker: bytes, end: int) -> bool:
+    """The marker with an entity or a tag in place of / between its characters before end"""
+    pattern = _split_marker_pattern(marker)
+    match = pattern.search(data, 0, end)
+    while match is not None:
+        if b"&" in match.group() or b"<" in match.group():
+            return True
+        match = pattern.search(data, match.start() + 1, end)
+    return False
+
+
+@lru_cache(maxsize=16)
+def _split_marker_pattern(marker: bytes) -> re.Pattern:
+    """
+    Matches the marker as is too. Tags are allowed between the characters, an ASCII character
+    can also be written as an entity (e.g. &#32; or &amp;), other bytes only match as they are.
+    """
+    parts = []
+    for index, byte in enumerate(marker):
+        literal = re.escape(bytes([byte]))
+        # no tags before the first character, the match would start at the tag holding the marker
+        tags = rb"(?:<[^<>]*>)*" if index else b""
+        if byte < 0x80:
+            parts.append(tags + rb"(?:" + literal + rb"|&#?\w+;)")
+        elif byte >= 0xC0:
+            parts.append(tags + literal)
+        else:
+            parts.append(literal)
+    return re.compile(b"".join(parts))
+
+
+def _in_skipped_markup(data: bytes, position: int) -> bool:
+    if data.rfind(b"<!--", 0, position) > data.rfind(b"-->", 0, position):
+        return True
+    for name in (b"script", b"style", b"SCRIPT", b"STYLE"):
+        if _rfind_tag(data, b"<" + name, position) > _rfind_tag(
+            data, b"</" + name, position
+        ):
+            return True
+    return False
+
+
+def _is_tag_end(data: bytes, position: int) -> bool:
+    """Tag name ends at the position, i.e. <a is not the start of <abbr"""
+    return data[position : position + 1] in (b" ", b"\t", b"\n", b"\r", b"\f", b">", b"/")
+
+
+def _rfind_tag(data: bytes, token: bytes, end: int) -> int:
+    position = data.rfind(token, 0, end)
+    while position != -1 and not _is_tag_end(data, position + len(token)):
+        position = data.rfind(token, 0, position)
+    return position
+
+
+def _find_tag(data: bytes, token: bytes, start: int, end: int) -> int:
+    position = data.find(token, start, end)
+    while position != -1 and not _is_tag_end(data, position + len(token)):
+        position = data.find(token, position + 1, end)
+    return position
@@ -0,0 +1,116 @@
+"""
+Row level diff between two parsed snapshots (csv files written by ParsedContent.to_csv)
+"""
+
+from typing import Iterator, Union
+from pathlib import Path
+import csv
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+# Loss level columns, a different value means the loss item itself changed.
+# Aggregates (category_summary, type_ttl_count, category_counter) change with every new loss, so are not compared.
+COMPARED_COLUMNS = ("category_name", "loss_item")
+INDEX_COLUMN = ""
+
+
+class SnapshotDiff:
+    """
+    Losses are keyed by type name + proof link (+ occurrence number, as one proof can show several items).
+    Only a key -> compared values index of the old snapshot is kept in memory, both files are streamed.
+    """
+
+    def __init__(self, old_file: Union[str, Path], new_file: Union[str, Path]):
+        self.old_file = old_file
+        self.new_file = new_file
+        self.counts = {"added": 0, "removed": 0, "changed": 0}
+
+    def iter_changes(self) -> Iterator[dict]:
+        """
+        :return: added and changed rows (new values) in new file order, then removed rows (old values)
+        """
+        old_index = {
+            key: (line, values) for key, line, values, _ in self._index(self.old_file)
+        }
+        for key, _, values, row in self._index(self.new_file):
+            old = old_index.pop(key, None)
+            if old is None:
+                yield self._change("added", row)
+            elif old[1] != values:
+                yield self._change("changed", row, old[1])
+        removed_lines = sorted(line for line, _ in old_index.values())
+        for row in self._read_lines(self.old_file, removed_lines):
+            yield self._change("removed", row)
+        logger.info(f"Snapshot diff: {self.counts}")
+
+    def columns(self) -> list[str]:
+        """
+        Columns of the new file, then those only in the old one (e.g. the snapshot_date of a combined
+        batch csv or the --enrich columns), so removed rows fit the header too
+        """
+        header = self._header(self.new_file)
+        header += [col for col in self._header(self.old_file) if col not in header]
+        previous_columns = [f"previous_{column}" for column in COMPARED_COLUMNS]
+        return (
+            ["change"]
+            + [col for col in header if col != INDEX_COLUMN]
+            + previous_columns
+        )
+
+    def to_csv(self, output_file: Union[str, Path]):
+        """Written to a temp file next to the output and renamed, a failed diff leaves no partial file"""
+        output_file = Path(output_file)
+        tmp_file = output_file.with_name(f".{output_file.name}.tmp")
+        try:
+            with open(tmp_file, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=self.columns())
+                writer.writeheader()
+                writer.writerows(self.iter_changes())
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_file, output_file)
+
+    @staticmethod
+    def _header(file: Union[str, Path]) -> list[str]:
+        with open(file, newline="") as csv_file:
+            return next(csv.reader(csv_file), [])
+
+    def _change(self, change: str, row: dict, previous: tuple = ()) -> dict:
+        self.counts[change] += 1
+        previous_values = {
+            f"previous_{column}": previous[i] if previous else None
+            for i, column in enumerate(COMPARED_COLUMNS)
+        }
+        return {"change": change, **row, **previous_values}
+
+    @staticmethod
+    def _rows(file: Union[str, Path]) -> Iterator[dict]:
+        with open(file, newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                row.pop(INDEX_COLUMN, None)
+                yield row
+
+    def _index(self, file: Union[str, Path]) -> Iterator[tuple]:
+        """Yielding key, line number, compared values and the row itself"""
+        occurrences = {}
+        for line, row in enumerate(self._rows(file)):
+            base_key = (row["type_name"], row["loss_proof"])
+            occurrences[base_key] = occurrences.get(base_key, 0) + 1
+            values = tuple(row[column] for column in COMPARED_COLUMNS)
+            yield (*base_key, occurrences[base_key]), line, values, row
+
+    @classmethod
+    def _read_lines(cls, file: Union[str, Path], lines: list[int]) -> Iterator[dict]:
+        """Re-reading rows by line number (lines sorted), instead of keeping them in memory"""
+        wanted = iter(lines)
+        next_line = next(wanted, None)
+        for line, row in enumerate(cls._rows(file)):
+            if next_line is None:
+                return
+            if line == next_line:
+                yield row
+                next_line = next(wanted, None)
@@ -0,0 +1,87 @@
+"""
+Structured columns derived from the loss_item and category_summary texts, computed once when the
+rows are written instead of by every consumer of the output
+"""
+
+from typing import Callable
+import logging
+
+import pandas as pd
+
+from src.extractors import STATUS_COUNT_PATTERN, STATUSES, TOTAL_PATTERN
+
+
+logger = logging.getLogger(__name__)
+
+# "(12, captured and later destroyed)", "(1 and 2, destroyed)": the first number is the ordinal
+ORDINAL_PATTERN = r"^\(\s*(\d+)"
+ENRICHED_COLUMNS = (
+    "loss_ordinal",
+    *(f"loss_{status}" for status in STATUSES),
+    "category_total",
+    *(f"category_{status}" for status in STATUSES),
+)
+
+
+def enrich_losses(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds to the long rows:
+    loss_ordinal (Int64): number of the loss within its type, the first one of "(1 and 2, destroyed)"
+    loss_<status> (boolean): status named in loss_item, e.g. both loss_captured and loss_destroyed
+    for "(3, captured and later destroyed)"
+    category_total, category_<status> (Int64): counts of category_summary, 0 for a status it does not list
+    Missing texts give missing values. The columns are extracted with vectorized string operations
+    over the distinct texts only (a category summary is repeated on every row of the category),
+    and spread back to the rows by their factorized codes.
+    :param frame: long rows (see util.ParsedContent.to_dataframe)
+    :return: new frame with ENRICHED_COLUMNS added
+    """
+    items = _by_distinct_text(_column(frame, "loss_item"), _parse_loss_items)
+    summaries = _by_distinct_text(
+        _column(frame, "category_summary"), _parse_category_summaries
+    )
+    return pd.concat([frame, items, summaries], axis=1)
+
+
+def _parse_loss_items(texts: pd.Series) -> pd.DataFrame:
+    lowered = texts.str.lower()
+    columns = {"loss_ordinal": _extract_int(texts, ORDINAL_PATTERN)}
+    for status in STATUSES:
+        # merged broken entries can lose the space, e.g. "damagedand abandoned"
+        columns[f"loss_{status}"] = lowered.str.contains(status, regex=False)
+    return pd.DataFrame(columns)
+
+
+def _parse_category_summaries(texts: pd.Series) -> pd.DataFrame:
+    lowered = texts.str.lower()
+    columns = {"category_total": _extract_int(texts, TOTAL_PATTERN)}
+    for status in STATUSES:
+        counts = _extract_int(lowered, STATUS_COUNT_PATTERN.format(status=status))
+        columns[f"category_{status}"] = counts.fillna(0)
+    return pd.DataFrame(columns)
+
+
+def _extract_int(texts: pd.Series, pattern: str) -> pd.Series:
+    return texts.str.extract(pattern, expand=False).astype("Int64")
+
+
+def _by_distinct_text(
+    column: pd.Series, parse: Callable[[pd.Series], pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    :param column: text column of the rows
+    :param parse: vectorized parsing of a string Series into a frame of the same length
+    :return: parsed frame row aligned with the column
+    """
+    codes, distinct = pd.factorize(column)
+    parsed = parse(pd.Series(distinct, dtype="string"))
+    # code -1 (missing text) is not in the index, reindexing fills its rows with <NA>
+    rows = parsed.reindex(codes)
+    rows.index = column.index
+    return rows
+
+
+def _column(frame: pd.DataFrame, name: str) -> pd.Series:
+    if name in frame:
+        return frame[name]
+    return pd.Series(pd.NA, index=frame.index, dtype="string")
@@ -0,0 +1,192 @@
+"""
+Several kinds of records (losses, category totals, pledges) read from one walk of a parsed page:
+each extractor names the tags it handles, the registry dispatches every tag of the walk to them
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, NamedTuple, Optional, Union
+from collections import Counter, defaultdict
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from src.backends import DEFAULT_BACKEND, resolve_backend
+from src.loss_parser import PARSED_TAGS, OryxLossParser, ParseContext
+
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("destroyed", "damaged", "abandoned", "captured")
+# "7, of which destroyed: 4, damaged: 1, captured: 2"
+TOTAL_PATTERN = r"^\s*(\d+)"
+STATUS_COUNT_PATTERN = r"\b{status}\s*:\s*(\d+)"
+TOTAL_REGEX = re.compile(TOTAL_PATTERN)
+STATUS_COUNT_REGEXES = {
+    status: re.compile(STATUS_COUNT_PATTERN.format(status=status), re.IGNORECASE)
+    for status in STATUSES
+}
+
+
+class Extractor(ABC):
+    """
+    Reads one kind of record from the tags named in `tags`. An instance holds the state of a single
+    document, ExtractorRegistry.extract creates new ones for every page.
+    """
+
+    # names of the handled tags
+    tags: tuple[str, ...] = ()
+
+    @abstractmethod
+    def handle(self, tag: Tag) -> Iterable:
+        """
+        :param tag: one of the tags, in document order
+        :return: records completed by the tag
+        """
+
+    def finish(self) -> Iterable:
+        """Records completed by the end of the document"""
+        return ()
+
+    def count(self, counters: Counter):
+        """Adds the counters of the document (e.g. rows, skipped entries), none by default"""
+
+
+class LossExtractor(Extractor):
+    """The rows of OryxLossParser.iter_losses, from the same tag handling (parse_tag_data)"""
+
+    tags = PARSED_TAGS
+
+    def __init__(
+        self,
+        loss_parser: Optional[OryxLossParser] = None,
+        context: Optional[ParseContext] = None,
+    ):
+        """
+        :param loss_parser: parser settings, a default one if not given
+        :param context: state to continue from (and left updated), a new one if not given
+        """
+        self.loss_parser = loss_parser if loss_parser else OryxLossParser()
+        self.context = context if context else ParseContext()
+
+    def handle(self, tag: Tag) -> Iterable:
+        return self.loss_parser.parse_tag_data(tag, self.context)
+
+    def count(self, counters: Counter):
+        counters.update(self.context.counters)
+
+
+class CategoryTotal(NamedTuple):
+    """Counts of one category, from the "(<total>, of which <status>: <count>, ...)" of its <h3>"""
+
+    category_counter: int
+    category_name: str
+    category_summary: str
+    total: Optional[int]
+    destroyed: int
+    damaged: int
+    abandoned: int
+    captured: int
+
+
+class CategoryTotalsExtractor(Extractor):
+    """One CategoryTotal per category <h3>, a status the summary does not list is counted 0"""
+
+    tags = ("h3",)
+
+    def __init__(self):
+        self.loss_parser = OryxLossParser()
+        self.category_counter = 0
+
+    def handle(self, tag: Tag) -> Iterable:
+        text = tag.get_text()
+        if not self.loss_parser.is_category(text):
+            return ()
+        self.category_counter += 1
+        name = self.loss_parser.parse_category_name(text)
+        summary = self.loss_parser.parse_category_summary(text, name)
+        total = TOTAL_REGEX.search(summary)
+        counts = {
+            status: int(match.group(1)) if (match := regex.search(summary)) else 0
+            for status, regex in STATUS_COUNT_REGEXES.items()
+        }
+        return (
+            CategoryTotal(
+                self.category_counter,
+                name,
+                summary,
+                int(total.group(1)) if total else None,
+                **counts,
+            ),
+        )
+
+    def count(self, counters: Counter):
+        counters.update(category_totals=self.category_counter)
+
+
+class ExtractorRegistry:
+    """
+    Extractor factories by name. extract walks the tree once, whatever the number of extractors,
+    handing each tag to the extractors registered for its name in the order they were registered.
+    """
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Extractor]] = {}
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return tuple(self._factories)
+
+    def register(self, name: str, factory: Callable[[], Extractor]):
+        """
+        :param name: key of the records in the extract results
+        :param factory: creates the extractor of one document, e.g. the Extractor class itself
+        """
+        if name in self._factories:
+            raise Exception(f"Extractor {name} is already registered!")
+        self._factories[name] = factory
+
+    def extract(
+        self,
+        html_content: Union[str, Tag],
+        names: Optional[Iterable[str]] = None,
+        backend: str = DEFAULT_BACKEND,
+        counters: Optional[Counter] = None,
+    ) -> dict[str, list]:
+        """
+        :param html_content: raw html or an already parsed (and truncated) tree, e.g. HTMLFileContent.soup
+        :param names: extractors to run, all registered ones if not given
+        :param backend: BeautifulSoup parser backend, used for raw html
+        :param counters: the counters of every extractor are added to it (see Extractor.count)
+        :return: {name: records}
+        """
+        names = tuple(names) if names is not None else self.names
+        unknown = [name for name in names if name not in self._factories]
+        if unknown:
+            raise Exception(
+                f"Unknown extractors {unknown}, registered: {list(self._factories)}"
+            )
+        extractors = {name: self._factories[name]() for name in names}
+        handlers = defaultdict(list)
+        for name, extractor in extractors.items():
+            for tag_name in extractor.tags:
+                handlers[tag_name].append((name, extractor))
+        soup = (
+            html_content
+            if isinstance(html_content, Tag)
+            else BeautifulSoup(html_content, resolve_backend(backend))
+        )
+        results = {name: [] for name in names}
+        for tag in soup.descendants:
+            # text nodes have no name, so no handlers
+            for name, extractor in handlers.get(tag.name, ()):
+                results[name].extend(extractor.handle(tag))
+        for name, extractor in extractors.items():
+            results[name].extend(extractor.finish())
+            if counters is not None:
+                extractor.count(counters)
+        logger.debug(
+            ", ".join(f"{len(records)} {name}" for name, records in results.items())
+        )
+        return results
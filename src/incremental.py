@@ -0,0 +1,103 @@
+"""
+Incremental loss parsing: rows of category sections unchanged since the previous run are reused from a cache file
+"""
+
+from typing import Optional, Union
+from collections import Counter
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+
+from src.loss_parser import OryxLossParser, ParseContext
+from src.util import LossRow
+
+
+logger = logging.getLogger(__name__)
+
+# 2: rows stored as LossRow field lists
+CACHE_VERSION = 2
+
+
+class IncrementalLossParser:
+    """
+    Consecutive snapshots differ in a handful of categories only. Each category section
+    (raw html from the "of which" <h3> to the next one) is fingerprinted, and only
+    sections with a new fingerprint are parsed. The cache file keeps the fingerprints and
+    rows of the latest run.
+    """
+
+    def __init__(
+        self, cache_file: Union[str, Path], loss_parser: Optional[OryxLossParser] = None
+    ):
+        self.cache_file = Path(cache_file)
+        self.loss_parser = loss_parser if loss_parser else OryxLossParser()
+        self.reused = 0
+        self.parsed = 0
+        # counters of the parsed sections' contexts, plus the rows of the reused ones
+        self.counters = Counter()
+
+    def parse_losses(self, html_content: str) -> list:
+        """
+        Same rows as OryxLossParser.parse_losses on the same (truncated) html content
+        :param html_content:
+        :return:
+        """
+        self.reused, self.parsed = 0, 0
+        self.counters = Counter()
+        cached = self._load_cache()
+        current = {}
+        all_losses = []
+        buffer = None
+        for counter, section in enumerate(
+            self.loss_parser.split_sections(html_content)
+        ):
+            fingerprint = self._fingerprint(section, buffer)
+            known = current.get(fingerprint) or cached.get(fingerprint)
+            if known:
+                rows, buffer = known["rows"], known["buffer"]
+                rows = [
+                    LossRow._make(row)._replace(category_counter=counter + 1)
+                    for row in rows
+                ]
+                self.reused += 1
+                self.counters["rows"] += len(rows)
+            else:
+                context = ParseContext(counter, buffer)
+                rows = self.loss_parser.parse_losses(section, context)
+                buffer = context.buffer
+                self.parsed += 1
+                self.counters.update(context.counters)
+            current[fingerprint] = {"rows": rows, "buffer": buffer}
+            all_losses.extend(rows)
+        logger.info(f"Sections reused: {self.reused}, parsed: {self.parsed}")
+        self._save_cache(current)
+        return all_losses
+
+    @staticmethod
+    def _fingerprint(section: str, buffer: Optional[str]) -> str:
+        """Carried over broken loss text changes the rows of the section, so it is part of the key"""
+        digest = hashlib.sha256(section.encode())
+        digest.update(repr(buffer).encode())
+        return digest.hexdigest()
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_file) as file:
+                cache = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable cache file {self.cache_file}: {e}")
+            return {}
+        if cache.get("version") != CACHE_VERSION:
+            return {}
+        return cache["sections"]
+
+    def _save_cache(self, sections: dict):
+        """Written to a temp file first, so an interrupted run does not leave a broken cache"""
+        tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        with open(tmp_file, "w") as file:
+            json.dump({"version": CACHE_VERSION, "sections": sections}, file)
+        os.replace(tmp_file, self.cache_file)
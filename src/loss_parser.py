@@ -2,36 +2,238 @@
 Parsing losses from Oryx sourced html content
 """
 
-from typing import Optional
+from typing import Iterator, NamedTuple, Optional, Union, TYPE_CHECKING
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import html
 import logging
+import os
 import re
+import sys
 
 from bs4 import BeautifulSoup
-from bs4.element import ResultSet
+from bs4.element import ResultSet, Tag
+
+from src import cutoff
+from src.cutoff import TEXT_TYPES
+from src.backends import DEFAULT_BACKEND, resolve_backend
+from src.util import LossRow
+
+if TYPE_CHECKING:
+    from src.stream_parser import StreamedTag
 
 
 logger = logging.getLogger(__name__)
 
+# Raw <h3> header, used to split pages into category sections without parsing them
+H3_PATTERN = re.compile(r"<h3[\s>].*?</h3>", re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^>]*>")
+# Tags holding categories, types and losses, in document order
+PARSED_TAGS = ("h3", "h2", "li")
+# Sections handed to a worker process at once, per worker
+SHARDS_PER_WORKER = 4
+# Bumped when the rows parsed from the same page change, invalidates cached results (see cache.py)
+PARSER_VERSION = 1
+# Start of the "(<count>, of which ...)" part of a category <h3> text
+CATEGORY_NAME_END = re.compile(r"\(\d")
+BRACKETS_PATTERN = re.compile(r"[()]")
 
-class OryxLossParser:
-    def __init__(self):
-        self.category_counter = 0
+
+def _interned(value: Optional[str]) -> Optional[str]:
+    """Equal strings of many rows (category, type, loss texts) share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ListItem(NamedTuple):
+    """What the loss parsing reads from an <li> type entry"""
+
+    # text as get_text(strip=True)
+    text: str
+    # space separated src of the <img> tags, None without any
+    img_links: Optional[str]
+    # (text as get_text(strip=True), href) of every <a> tag, in document order
+    anchors: list[tuple[str, Optional[str]]]
+
+    @classmethod
+    def from_tag(cls, tag: Union[Tag, "StreamedTag"]) -> "ListItem":
+        """
+        A bs4 tag is collected in a single walk of its subtree, instead of one walk
+        each for get_text, find_all("img"), find_all("a") and the text of every link.
+        The StreamedTag of the stream parser already holds its text and a/img tags.
+        """
+        if not isinstance(tag, Tag):
+            images = [img["src"] for img in tag.find_all("img") if "src" in img.attrs]
+            anchors = [
+                (a.get_text(strip=True), a.get("href")) for a in tag.find_all("a")
+            ]
+            return cls(tag.get_text(strip=True), " ".join(images) or None, anchors)
+        texts, images, anchors = [], [], []
+        cls._walk(tag, texts, images, anchors, ())
+        return cls(
+            "".join(texts),
+            " ".join(images) or None,
+            [("".join(anchor_texts), href) for anchor_texts, href in anchors],
+        )
+
+    @classmethod
+    def _walk(
+        cls,
+        tag: Tag,
+        texts: list[str],
+        images: list[str],
+        anchors: list[tuple[list[str], Optional[str]]],
+        open_anchors: tuple[list[str], ...],
+    ):
+        """
+        :param open_anchors: text lists of the <a> tags containing this one
+        (nested links are not valid html, but get_text of the outer one would include
+        the inner text)
+        """
+        for child in tag.contents:
+            if type(child) in TEXT_TYPES:
+                text = child.strip()
+                if text:
+                    texts.append(text)
+                    for anchor_texts in open_anchors:
+                        anchor_texts.append(text)
+            elif isinstance(child, Tag):
+                if child.name == "a":
+                    anchor = ([], child.get("href"))
+                    anchors.append(anchor)
+                    cls._walk(child, texts, images, anchors, (*open_anchors, anchor[0]))
+                    continue
+                if child.name == "img" and "src" in child.attrs:
+                    images.append(child["src"])
+                cls._walk(child, texts, images, anchors, open_anchors)
+
+
+class ParseContext:
+    """State of parsing one document: the current category and type, and unfinished broken loss text"""
+
+    def __init__(self, category_counter: int = 0, buffer: Optional[str] = None):
+        """
+        :param category_counter: number of categories before the parsed content
+        :param buffer: unfinished broken loss text carried over from previous content
+        """
+        self.category_counter = category_counter
         self.category_name = None
         self.category_summary = None
         self.type_name = None
         self.type_ttl_count = 0
         self.type_img_links = None
         self.errors = []
-        self.buffer = None
+        self.buffer = buffer
+        # tags, categories, types, rows, merged_fragments, skipped_entries (see profiling.ParseProfile)
+        self.counters = Counter()
+
 
-    def parse_losses(self, html_content: str) -> list:
+class OryxLossParser:
+    """
+    Holds settings only, the state of a parse is in a ParseContext created per call.
+    One instance can parse any number of documents, also from several threads at once.
+    """
+
+    def __init__(self, backend: str = DEFAULT_BACKEND):
+        self.backend = resolve_backend(backend)
+
+    def parse_losses(
+        self, html_content: Union[str, Tag], context: Optional[ParseContext] = None
+    ) -> list[LossRow]:
+        """
+        :param html_content: raw html or an already parsed (and truncated) tree, e.g. HTMLFileContent.soup
+        :param context: state to continue from (and left updated), e.g. for the sections of split_sections.
+        A new one if not given.
+        :return:
+        """
+        return list(self.iter_losses(html_content, context))
+
+    def iter_losses(
+        self, html_content: Union[str, Tag], context: Optional[ParseContext] = None
+    ) -> Iterator[LossRow]:
+        """
+        Rows of parse_losses, yielded as the tree is walked. Only the rows not consumed yet are held,
+        and a consumer stopping early leaves the rest of the tree unvisited.
+        :param html_content: raw html or an already parsed (and truncated) tree, e.g. HTMLFileContent.soup
+        :param context: state to continue from (and left updated), a new one if not given
+        :return: generator of loss rows
+        """
+        context = context if context else ParseContext()
+        soup = (
+            html_content
+            if isinstance(html_content, Tag)
+            else BeautifulSoup(html_content, self.backend)
+        )
+        for tag in soup.descendants:
+            if tag.name in PARSED_TAGS:
+                yield from self.parse_tag_data(tag, context)
+
+    def parse_losses_parallel(
+        self,
+        html_content: str,
+        workers: Optional[int] = None,
+        counters: Optional[Counter] = None,
+    ) -> list:
+        """
+        Same rows as parse_losses, with the category sections of split_sections parsed in worker processes.
+        Each section starts from a context holding the number of categories before it.
+        A section following one that ended with unfinished broken loss text is parsed again
+        (in this process) with the carried over text, so loss items split across sections are merged as usual.
+        :param html_content: raw (truncated) html
+        :param workers: number of worker processes (default: number of CPUs)
+        :param counters: updated with the counters of the section contexts
+        :return:
+        """
+        sections = self.split_sections(html_content)
+        workers = workers if workers else os.cpu_count()
+        chunksize = max(1, len(sections) // (workers * SHARDS_PER_WORKER))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    self._parse_shard,
+                    sections,
+                    range(len(sections)),
+                    chunksize=chunksize,
+                )
+            )
         all_losses = []
-        soup = BeautifulSoup(html_content, "html.parser")
-        tags = soup.find_all(["h3", "h2", "li"])
-        for tag in tags:
-            self._parse_tag_data(tag, all_losses)
+        buffer = None
+        for counter, (section, result) in enumerate(zip(sections, results)):
+            rows, end_buffer, section_counters = result
+            if buffer is not None:
+                logger.debug(f"Re-parsing section {counter + 1} with carried text")
+                context = ParseContext(counter, buffer)
+                rows = self.parse_losses(section, context)
+                end_buffer, section_counters = context.buffer, context.counters
+            if counters is not None:
+                counters.update(section_counters)
+            all_losses.extend(rows)
+            buffer = end_buffer
         return all_losses
 
+    def _parse_shard(
+        self, section: str, category_counter: int
+    ) -> tuple[list, Optional[str], Counter]:
+        """Rows of a section, the broken loss text left unfinished at its end and the counters"""
+        context = ParseContext(category_counter)
+        rows = self.parse_losses(section, context)
+        return rows, context.buffer, context.counters
+
+    def split_sections(self, html_content: str) -> list[str]:
+        """
+        Splitting raw html into category sections, each running from a category <h3> ("of which" header)
+        until the next one. Content before the first category holds no losses and is dropped.
+        Nothing is parsed here, the text of the <h3> headers is taken by dropping their inner tags.
+        :param html_content:
+        :return:
+        """
+        starts = [
+            match.start()
+            for match in H3_PATTERN.finditer(html_content)
+            if self.is_category(html.unescape(TAG_PATTERN.sub("", match.group())))
+        ]
+        ends = starts[1:] + [len(html_content)]
+        return [html_content[start:end] for start, end in zip(starts, ends)]
+
     def truncate_content(
         self, html_content, exclude_from_str: str, tag_name: Optional[str] = None
     ) -> str:
@@ -41,29 +243,25 @@ class OryxLossParser:
         :param tag_name:
         :return:
         """
-        soup = BeautifulSoup(html_content, "html.parser")
-        tags = soup.find_all(tag_name) if tag_name else soup.find_all()
-        position = self._find_str_pos(tags, exclude_from_str, str(soup))
+        soup = BeautifulSoup(html_content, self.backend)
+        position = cutoff.find_cutoff_pos(soup, html_content, exclude_from_str, tag_name)
         return html_content[:position]
 
-    def _find_str_pos(self, tags: ResultSet, string: str, content: str) -> int:
+    def parse_tag_data(self, tag, context: ParseContext) -> Iterator[LossRow]:
         """
-        :param tags: ResultSet type from bs4 (is a list actually)
-        :param exclude_from_str:
-        :param content:
-        :return:
+        An <li> subtree is walked once (ListItem.from_tag), the type and the losses
+        are then taken from the collected text, image sources and links
         """
-        for tag in tags:
-            if string in tag.get_text():
-                return content.find(str(tag))
-        raise Exception(f"String '{string}' not found in content!")
-
-    def _parse_tag_data(self, tag, losses_lst: list):
-        self._parse_category(tag)
-        self._parse_type(tag)
-        self._add_losses(tag, losses_lst)
+        context.counters["tags"] += 1
+        if tag.name == "h3":
+            self._parse_category(tag, context)
+        elif tag.name == "li" and context.category_counter > 0:
+            item = ListItem.from_tag(tag)
+            self._parse_type(item, context)
+            return self._iter_item_losses(item, context)
+        return iter(())
 
-    def _parse_category(self, tag: ResultSet):
+    def _parse_category(self, tag: ResultSet, context: ParseContext):
         """
         Loss category (e.g. "Tanks") is stored in h3/mw-headline.
         Some <h3> exist without headline, we want to ignore those.
@@ -72,41 +270,48 @@ class OryxLossParser:
         """
         if tag.name == "h3":
             # new_category = tag.find("span", class_="mw-headline")
-            new_category = (
-                tag.get_text()
-                if "of which" in tag.get_text() and "(" in tag.get_text()
-                else None
-            )
+            text = tag.get_text()
+            if self.is_category(text):
+                self._update_category(text, context)
 
-            if new_category:
-                self._update_category(tag, new_category)
+    @staticmethod
+    def is_category(text: str) -> bool:
+        """Category <h3> texts hold the "(<total>, of which ...)" summary, other <h3> do not"""
+        return "of which" in text and "(" in text
 
-    def _update_category(self, tag: ResultSet, new_category: str):
-        self.category_counter += 1
-        self.category_name = self._parse_category_name(new_category)
-        self.category_summary = self._parse_category_summary(tag)
+    def _update_category(self, new_category: str, context: ParseContext):
+        """
+        :param new_category: text of the category <h3>
+        :param context:
+        """
+        context.category_counter += 1
+        context.counters["categories"] += 1
+        context.category_name = _interned(self.parse_category_name(new_category))
+        context.category_summary = _interned(
+            self.parse_category_summary(new_category, context.category_name)
+        )
 
-    def _parse_category_name(self, category: str) -> str:
-        category = category[0 : re.search(r"\(\d", category).start()].strip()
+    def parse_category_name(self, category: str) -> str:
+        """Text of the category <h3> before its summary (e.g. Tanks)"""
+        category = category[0 : CATEGORY_NAME_END.search(category).start()].strip()
         return category
 
-    def _parse_category_summary(self, tag: ResultSet) -> str:
+    def parse_category_summary(self, full_text: str, category_name: str) -> str:
         """Getting the high level breakdown (destroyed, damaged, abandoned) for the category"""
-        full_text = tag.get_text()
-        summary = full_text[len(self.category_name) : -1]
-        summary_cleaned = re.sub(r"[()]", "", summary).strip()
+        summary = full_text[len(category_name) : -1]
+        summary_cleaned = BRACKETS_PATTERN.sub("", summary).strip()
         return summary_cleaned
 
-    def _parse_type(self, tag: ResultSet):
-        if self.category_counter > 0 and tag.name == "li":
-            words = tag.get_text(strip=True).split(":")[0].split()
-            self.type_ttl_count = self._parse_type_count(words)
-            self.type_name = " ".join(
-                words[1:]
-            )  # rest of the text is the vehicle type, sometimes contains space
-            self.type_img_links = self._parse_type_images(tag)
+    def _parse_type(self, item: "ListItem", context: ParseContext):
+        words = item.text.split(":")[0].split()
+        context.type_ttl_count = self._parse_type_count(words, context)
+        context.type_name = _interned(
+            " ".join(words[1:])
+        )  # rest of the text is the vehicle type, sometimes contains space
+        context.type_img_links = _interned(item.img_links)
+        context.counters["types"] += 1
 
-    def _parse_type_count(self, type_text: list[str]) -> int:
+    def _parse_type_count(self, type_text: list[str], context: ParseContext) -> int:
         """
         Text starts with ttl loss count for the particular vehicle, but this is missing for some entries
         :param type_text:
@@ -118,64 +323,68 @@ class OryxLossParser:
             )  # text starts with ttl loss count for the particular vehicle
         except Exception as e:  # some entries have loss count missing
             type_count = 0
-            self.errors.append((e, type_text))
+            context.errors.append((e, type_text))
         return type_count
 
-    def _parse_type_images(self, tag: ResultSet) -> Optional[str]:
-        img_tags = tag.find_all("img")
-        img_links = [img["src"] for img in img_tags if "src" in img.attrs]
-        if img_links:
-            img_str = " ".join(img_links)
-            return img_str
-
-    def _parse_loss_item(self, tag: ResultSet) -> tuple[str, str]:
-        text = tag.get_text(strip=True)
-        proof = tag.get("href")
-        text = self._merge_broken_losses(text)
+    def _parse_loss_item(
+        self, text: str, proof: Optional[str], context: ParseContext
+    ) -> tuple[str, str]:
+        """
+        :param text: stripped text of the link
+        :param proof: href of the link
+        :param context:
+        :return: loss text and proof link, ("skip", "skip") for a broken entry fragment
+        """
+        text = self._merge_broken_losses(text, context)
         if text:
             return text, proof
         else:
             return ("skip", "skip")
 
-    def _merge_broken_losses(self, text: str) -> Optional[str]:
+    def _merge_broken_losses(self, text: str, context: ParseContext) -> Optional[str]:
         """
         Some entries are not properly formed and get added in multiple places due to wrong html tag usage in source.
         These are merged here into a single entry.
         E.g. 152mm 2A65 Msta-B howitzer damaged with link https://postimg.cc/q6CYJkkd
         :param text:
+        :param context:
         :return:
         """
-        if ")" not in text and self.buffer is None:
-            self.buffer = text
+        if ")" not in text and context.buffer is None:
+            context.buffer = text
             return None
-        if self.buffer and ")" not in text:
-            self.buffer += text
+        if context.buffer and ")" not in text:
+            context.buffer += text
             return None
-        if self.buffer and (")") in text:
-            text = self.buffer + text
-            self.buffer = None
+        if context.buffer and (")") in text:
+            text = context.buffer + text
+            context.buffer = None
+            context.counters["merged_fragments"] += 1
             logger.debug(f"Returning merged text: {text}")
             return text
         return text
 
-    def _create_longrow(self, text: str, proof: str) -> dict:
-        row = {}
-        row["category_counter"] = self.category_counter
-        row["category_name"] = self.category_name
-        row["category_summary"] = self.category_summary
-        row["type_name"] = self.type_name
-        row["type_ttl_count"] = self.type_ttl_count
-        row["type_img_links"] = self.type_img_links
-        row["loss_item"] = text
-        row["loss_proof"] = proof
-        return row
-
-    def _add_losses(self, tag: ResultSet, loss_list: list):
-        if tag.name == "li" and self.category_counter > 0:
-            loss_items = tag.find_all("a")
-            for item_tag in loss_items:
-                item, link = self._parse_loss_item(item_tag)
-                if item != "skip" and "link" != "skip":
-                    loss_list.append(self._create_longrow(item, link))
-                else:
-                    logger.debug("Skipping entry")
+    def _create_longrow(self, text: str, proof: str, context: ParseContext) -> LossRow:
+        """Loss texts repeat a lot (e.g. "(1, destroyed)"), so they are interned too"""
+        return LossRow(
+            context.category_counter,
+            context.category_name,
+            context.category_summary,
+            context.type_name,
+            context.type_ttl_count,
+            context.type_img_links,
+            _interned(text),
+            proof,
+        )
+
+    def _iter_item_losses(
+        self, item: "ListItem", context: ParseContext
+    ) -> Iterator[LossRow]:
+        for text, href in item.anchors:
+            loss, link = self._parse_loss_item(text, href, context)
+            if loss != "skip" and "link" != "skip":
+                context.counters["rows"] += 1
+                yield self._create_longrow(loss, link, context)
+            else:
+                context.counters["skipped_entries"] += 1
+                logger.debug("Skipping entry")
@@ -0,0 +1,202 @@
+"""
+Normalized output: loss rows split into linked categories, types and losses tables
+"""
+
+from typing import Iterable, Iterator, NamedTuple, Optional, Self, Union
+from pathlib import Path
+import sqlite3
+
+from src.util import (
+    Content,
+    LossRow,
+    ParsedContent,
+    LONGROW_COLUMNS,
+    LOSSES_SQLITE_TABLE,
+    NORMALIZED_FORMATS,
+    resolve_output_format,
+    sqlite_table_columns,
+)
+
+
+class CategoryRow(NamedTuple):
+    category_counter: int
+    category_name: Optional[str]
+    category_summary: Optional[str]
+
+
+class TypeRow(NamedTuple):
+    type_id: int
+    category_counter: int
+    type_name: Optional[str]
+    type_ttl_count: Optional[int]
+    type_img_links: Optional[str]
+
+
+class LossItemRow(NamedTuple):
+    loss_id: int
+    type_id: int
+    loss_item: Optional[str]
+    loss_proof: Optional[str]
+
+
+# Prefix of the sqlite tables, kept apart from the losses table of the long row (upsert) output
+SQLITE_PREFIX = "norm_"
+# Tables and view of the sqlite output, by their columns. Existing ones are only replaced when
+# they have these columns (written by this class), anything else in the database is left alone.
+SQLITE_TABLES = {
+    "norm_categories": CategoryRow._fields,
+    "norm_types": TypeRow._fields,
+    "norm_losses": LossItemRow._fields,
+    "long_losses": LONGROW_COLUMNS,
+}
+SQLITE_SCHEMA = """
+DROP VIEW IF EXISTS long_losses;
+DROP TABLE IF EXISTS norm_losses;
+DROP TABLE IF EXISTS norm_types;
+DROP TABLE IF EXISTS norm_categories;
+CREATE TABLE norm_categories (
+    category_counter INTEGER PRIMARY KEY,
+    category_name TEXT,
+    category_summary TEXT
+);
+CREATE TABLE norm_types (
+    type_id INTEGER PRIMARY KEY,
+    category_counter INTEGER REFERENCES norm_categories (category_counter),
+    type_name TEXT,
+    type_ttl_count INTEGER,
+    type_img_links TEXT
+);
+CREATE TABLE norm_losses (
+    loss_id INTEGER PRIMARY KEY,
+    type_id INTEGER REFERENCES norm_types (type_id),
+    loss_item TEXT,
+    loss_proof TEXT
+);
+CREATE VIEW long_losses AS
+SELECT c.category_counter, c.category_name, c.category_summary,
+       t.type_name, t.type_ttl_count, t.type_img_links,
+       l.loss_item, l.loss_proof
+FROM norm_losses l
+JOIN norm_types t ON t.type_id = l.type_id
+JOIN norm_categories c ON c.category_counter = t.category_counter
+ORDER BY l.loss_id;
+"""
+
+
+class NormalizedContent(Content):
+    """
+    Category and type context is stored once, instead of being repeated on every loss row.
+    Rows are consumed one by one, so a generator of rows is never held in memory in long form.
+    """
+
+    def __init__(self, source: Iterable[Union[LossRow, dict]]):
+        super().__init__(source)
+
+    def load(self) -> Self:
+        categories, types, losses = [], [], []
+        last_type = None
+        for row in self._source:
+            if not isinstance(row, LossRow):
+                row = LossRow(*(row[column] for column in LONGROW_COLUMNS))
+            if not categories or categories[-1].category_counter != row.category_counter:
+                categories.append(
+                    CategoryRow(
+                        row.category_counter, row.category_name, row.category_summary
+                    )
+                )
+            type_key = (
+                row.category_counter,
+                row.type_name,
+                row.type_ttl_count,
+                row.type_img_links,
+            )
+            if type_key != last_type:
+                last_type = type_key
+                types.append(TypeRow(len(types) + 1, *type_key))
+            losses.append(
+                LossItemRow(len(losses) + 1, len(types), row.loss_item, row.loss_proof)
+            )
+        self._content = {"categories": categories, "types": types, "losses": losses}
+        return self
+
+    def iter_longrows(self) -> Iterator[LossRow]:
+        """Compatibility view: the long row layout of OryxLossParser.parse_losses"""
+        categories = {
+            category.category_counter: category
+            for category in self._content["categories"]
+        }
+        types = {type_row.type_id: type_row for type_row in self._content["types"]}
+        for loss in self._content["losses"]:
+            type_row = types[loss.type_id]
+            category = categories[type_row.category_counter]
+            yield LossRow(
+                *category,
+                type_row.type_name,
+                type_row.type_ttl_count,
+                type_row.type_img_links,
+                loss.loss_item,
+                loss.loss_proof,
+            )
+
+    def table_paths(self, output_file: Union[str, Path], extension: str) -> dict:
+        """out.csv -> out_categories.csv, out_types.csv, out_losses.csv"""
+        output_file = Path(output_file)
+        return {
+            table: output_file.with_name(f"{output_file.stem}_{table}{extension}")
+            for table in self._content
+        }
+
+    def write(self, output_file: Union[str, Path], output_format: Optional[str] = None):
+        """
+        :param output_file: sqlite database, or base name of the per table csv/parquet files
+        :param output_format: csv, parquet or sqlite, inferred from the file extension if not given
+        :return:
+        """
+        output_format = resolve_output_format(output_file, output_format)
+        if output_format == "sqlite":
+            self.to_sqlite(output_file)
+            return
+        if output_format not in NORMALIZED_FORMATS:
+            raise Exception(f"Normalized output can not be written as {output_format}")
+        for table, path in self.table_paths(output_file, f".{output_format}").items():
+            ParsedContent(self._content[table]).load().write(path, output_format)
+
+    def to_sqlite(self, output_file: Union[str, Path]):
+        """
+        Tables (norm_categories, norm_types, norm_losses) are replaced, long_losses view gives back
+        the long row layout. A database holding the losses table of the long row output, or a table
+        or view of the same name with other columns, is not written.
+        """
+        connection = sqlite3.connect(output_file)
+        try:
+            self._check_sqlite_tables(connection, output_file)
+            with connection:
+                connection.executescript(SQLITE_SCHEMA)
+                for table, rows in self._content.items():
+                    if not rows:
+                        continue
+                    columns = rows[0]._fields
+                    connection.executemany(
+                        f"INSERT INTO {SQLITE_PREFIX}{table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' for _ in columns)})",
+                        rows,
+                    )
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _check_sqlite_tables(
+        connection: sqlite3.Connection, output_file: Union[str, Path]
+    ):
+        if sqlite_table_columns(connection, LOSSES_SQLITE_TABLE):
+            raise Exception(
+                f"{output_file} holds the {LOSSES_SQLITE_TABLE} table of the long row "
+                "output, write the normalized tables into another database!"
+            )
+        for table, columns in SQLITE_TABLES.items():
+            existing = sqlite_table_columns(connection, table)
+            if existing and existing != columns:
+                raise Exception(
+                    f"{output_file} has a {table} table of another layout, "
+                    "not replaced with normalized tables!"
+                )
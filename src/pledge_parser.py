@@ -1,5 +1,103 @@
 """
 Parsing pledged and received weaponry from Oryx html content.
 
-Todo later (lower priority)
+The page lists the weaponry per donor country: an <h3> with the country name (and flag),
+followed by <li> entries like "4 M109A3GN self-propelled howitzer (delivered)",
+the status in brackets often linking to the source. <h2> headers separate the sections of the page.
 """
+
+from typing import Iterable, NamedTuple, Optional
+from collections import Counter
+import logging
+import re
+
+from bs4.element import Tag
+
+from src.extractors import Extractor
+from src.loss_parser import ListItem
+
+
+logger = logging.getLogger(__name__)
+
+# Donor headers, section headers and pledge entries
+PLEDGE_TAGS = ("h2", "h3", "li")
+# "4 M109A3GN self-propelled howitzer (delivered)": count, equipment, rest
+# (a type name starting with digits, e.g. "2S1 Gvozdika", is not a count)
+ENTRY_PATTERN = re.compile(r"^\s*(?:(\d+)\s+)?([^(\[]*)(.*)$", re.DOTALL)
+# Brackets dropped from the status text, separators stripped from its ends
+STATUS_BRACKETS = str.maketrans("()[]", "    ")
+STATUS_STRIP = ":,; "
+
+
+class PledgeRow(NamedTuple):
+    """One pledge entry of a donor"""
+
+    donor_counter: int
+    donor: str
+    donor_img_links: Optional[str]
+    item_count: Optional[int]
+    equipment: str
+    status: Optional[str]
+    proof: Optional[str]
+
+
+class PledgeExtractor(Extractor):
+    """
+    PledgeRow per <li> entry under a donor <h3>. Entries before the first donor or after an <h2>
+    (until the next donor) are not pledges of a country and are skipped.
+    """
+
+    tags = PLEDGE_TAGS
+
+    def __init__(self):
+        self.donor_counter = 0
+        self.donor: Optional[str] = None
+        self.donor_img_links: Optional[str] = None
+        self.pledges = 0
+        self.skipped = 0
+
+    def handle(self, tag: Tag) -> Iterable[PledgeRow]:
+        if tag.name == "h2":
+            self.donor = None
+        elif tag.name == "h3":
+            self._update_donor(ListItem.from_tag(tag))
+        elif self.donor is not None:
+            row = self._parse_entry(ListItem.from_tag(tag))
+            if row is not None:
+                return (row,)
+        return ()
+
+    def count(self, counters: Counter):
+        counters.update(pledges=self.pledges, skipped_entries=self.skipped)
+
+    def _update_donor(self, heading: ListItem):
+        name = heading.text.split("(")[0].strip().rstrip(":").strip()
+        if not name:
+            return
+        self.donor_counter += 1
+        self.donor = name
+        self.donor_img_links = heading.img_links
+
+    def _parse_entry(self, item: ListItem) -> Optional[PledgeRow]:
+        """
+        :param item: text, images and links of the <li>
+        :return: None for an entry without equipment name
+        """
+        count, equipment, rest = ENTRY_PATTERN.match(item.text).groups()
+        equipment = equipment.strip().rstrip(":").strip()
+        if not equipment:
+            self.skipped += 1
+            logger.debug(f"Skipped pledge entry of {self.donor}: {item.text}")
+            return None
+        status = " ".join(rest.translate(STATUS_BRACKETS).split())
+        links = [href for _, href in item.anchors if href]
+        self.pledges += 1
+        return PledgeRow(
+            self.donor_counter,
+            self.donor,
+            self.donor_img_links,
+            int(count) if count else None,
+            equipment,
+            status.strip(STATUS_STRIP) or None,
+            " ".join(links) or None,
+        )
@@ -0,0 +1,129 @@
+"""
+Instrumentation of a parsing run: wall/CPU time and peak memory per stage, and parse counters
+"""
+
+from typing import ContextManager, Iterator, Optional, Union
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+import cProfile
+import json
+import logging
+import time
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("cache", "load", "truncate", "parse", "write")
+# Stage run under cProfile when a cprofile_file is given
+PROFILED_STAGE = "parse"
+
+
+class StageStats:
+    def __init__(self):
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_bytes = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class ParseProfile:
+    """
+    Collected by runner.parse_file/run_loss_parsing when given. Memory is traced with tracemalloc
+    (peak of each stage), which slows allocation heavy stages down, so the times are for comparing
+    snapshots and stages with each other, not with unprofiled runs.
+    """
+
+    def __init__(
+        self,
+        cprofile_file: Optional[Union[str, Path]] = None,
+        trace_memory: bool = True,
+    ):
+        """
+        :param cprofile_file: pstats dump of the parse stage, not written if not given
+        :param trace_memory: measure peak memory per stage
+        """
+        self.cprofile_file = cprofile_file
+        self.trace_memory = trace_memory
+        self.stages: dict[str, StageStats] = {}
+        self.counters = Counter()
+        # one profiler for every entry of the parse stage, its dump adds up like the times do
+        self._profiler: Optional[cProfile.Profile] = None
+        self._profiling = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """
+        Times the block, a stage entered again (e.g. parse of several files) adds up.
+        The cProfile dump holds all entries of the parse stage so far, a nested entry
+        is profiled by the outer one.
+        :param name: one of STAGES
+        """
+        stats = self.stages.setdefault(name, StageStats())
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        profiler = None
+        if self.cprofile_file and name == PROFILED_STAGE and not self._profiling:
+            if self._profiler is None:
+                self._profiler = cProfile.Profile()
+            profiler = self._profiler
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            self._profiling = True
+            profiler.enable()
+        try:
+            yield stats
+        finally:
+            if profiler:
+                profiler.disable()
+                self._profiling = False
+            stats.wall_seconds += time.perf_counter() - wall
+            stats.cpu_seconds += time.process_time() - cpu
+            if self.trace_memory:
+                stats.peak_bytes = max(
+                    stats.peak_bytes, tracemalloc.get_traced_memory()[1]
+                )
+            if started_tracing:
+                tracemalloc.stop()
+            if profiler:
+                profiler.dump_stats(self.cprofile_file)
+                logger.info(
+                    f"cProfile stats of the {name} stage written to {self.cprofile_file}"
+                )
+
+    def to_dict(self) -> dict:
+        wall_seconds = sum(stats.wall_seconds for stats in self.stages.values())
+        rows = self.counters.get("rows", 0)
+        return {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            "wall_seconds": round(wall_seconds, 6),
+            "rows_per_second": round(rows / wall_seconds, 1) if wall_seconds else None,
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def write(self, report_file: Union[str, Path], **details):
+        """
+        :param report_file: json file of the report
+        :param details: added to the report as is, e.g. the input file
+        :return:
+        """
+        with open(report_file, "w") as file:
+            json.dump({**details, **self.to_dict()}, file, indent=2)
+        logger.info(f"Profile report written to {report_file}")
+
+
+def stage(profile: Optional[ParseProfile], name: str) -> ContextManager:
+    """profile.stage(name), or nothing measured without a profile"""
+    return profile.stage(name) if profile else nullcontext()
@@ -0,0 +1,278 @@
+"""
+Shared flow of the loss parsing entry points (parse_ukr_losses.py, parse_ru_losses.py)
+and of parse_pledges.py
+"""
+
+from typing import Iterable, Iterator, Optional, Union
+from argparse import Namespace
+from pathlib import Path
+import logging
+
+from src import archive
+from src import cache
+from src import extractors
+from src import incremental
+from src import loss_parser
+from src import normalized
+from src import pledge_parser
+from src import profiling
+from src import stream_parser
+from src import util
+
+
+logger = logging.getLogger(__name__)
+
+# Cutoff string and the tag holding it, the parsing stops there
+UKR_LOSSES_CUTOFF = (
+    "Attack On Europe: Documenting Ukrainian Equipment"
+    " Losses During The Russian Invasion Of Ukraine",
+    "a",
+)
+RU_LOSSES_CUTOFF = (
+    "Documenting Russian Equipment Losses During The Russian Invasion Of Ukraine",
+    "a",
+)
+CUTOFFS = {"ukr": UKR_LOSSES_CUTOFF, "ru": RU_LOSSES_CUTOFF}
+# Record kinds extract_file can read from a page in one walk
+EXTRACTORS = extractors.ExtractorRegistry()
+EXTRACTORS.register("losses", extractors.LossExtractor)
+EXTRACTORS.register("category_totals", extractors.CategoryTotalsExtractor)
+EXTRACTORS.register("pledges", pledge_parser.PledgeExtractor)
+
+
+def parse_file(
+    file: Union[str, Path, archive.ArchiveMember],
+    limit: str,
+    limit_tag: Optional[str] = None,
+    backend: str = "auto",
+    stream: bool = False,
+    cache_file: Optional[Union[str, Path]] = None,
+    pretruncate: bool = False,
+    workers: Optional[int] = None,
+    cache_dir: Optional[Union[str, Path]] = None,
+    profile: Optional[profiling.ParseProfile] = None,
+) -> Iterable[util.LossRow]:
+    """
+    :param file: path to the html file (also compressed), or a member of a tar/zip archive
+    :param limit: cutoff string, content from the tag containing it is not parsed
+    :param limit_tag: name of the tag holding the cutoff string
+    :param backend: BeautifulSoup parser backend (not used when streaming)
+    :param stream: parse with the streaming tokenizer instead of building the full tree
+    :param cache_file: reuse rows of category sections unchanged since the run using the same cache file
+    :param pretruncate: cut the file at the cutoff before parsing it (not used when streaming)
+    :param workers: parse the category sections in this many processes (raw bytes cut at the cutoff,
+    not used when streaming or with cache_file)
+    :param cache_dir: directory of the parse result cache (see cache.ParseCache), not used if not given.
+    A page parsed before with the same cutoff and backend is loaded from there without parsing it.
+    The whole file is hashed and the rows are listed for it, so it is not used when streaming
+    or with pretruncate (these stop reading at the cutoff), nor with cache_file.
+    :param profile: stage times and parse counters are collected into it. The rows are then
+    parsed into a list within the parse stage, instead of being generated while written.
+    :return: loss rows, a generator when streaming (rows are produced while the file is read)
+    or parsing a single tree (rows are produced while it is walked, e.g. for the chunked writers)
+    """
+    if cache_dir and (stream or pretruncate or cache_file):
+        logger.info(
+            "Parse result cache not used with stream, pretruncate or cache_file"
+        )
+    elif cache_dir:
+        result_cache = cache.ParseCache(cache_dir)
+        with profiling.stage(profile, "cache"):
+            key = result_cache.key(file, limit, limit_tag, backend, bool(workers))
+            rows = result_cache.get(key)
+        if rows is not None:
+            logger.info(f"Parse results of {file} loaded from the cache")
+            if profile:
+                profile.counters.update(rows=len(rows), cache_hits=1)
+            return rows
+        rows = list(
+            parse_file(
+                file, limit, limit_tag, backend, workers=workers, profile=profile
+            )
+        )
+        with profiling.stage(profile, "cache"):
+            result_cache.put(key, rows)
+        return rows
+    context = loss_parser.ParseContext()
+    if stream:
+        rows = _iter_stream(file, limit, limit_tag, context)
+    else:
+        rows = _parse_tree(
+            file,
+            limit,
+            limit_tag,
+            backend,
+            cache_file,
+            pretruncate,
+            workers,
+            profile,
+            context,
+        )
+    if profile is None:
+        return rows
+    if not isinstance(rows, list):
+        # generators are consumed here, the parallel and incremental parsers already ran in the stage
+        with profile.stage("parse"):
+            rows = list(rows)
+    profile.counters.update(context.counters)
+    return rows
+
+
+def _parse_tree(
+    file: Union[str, Path, archive.ArchiveMember],
+    limit: str,
+    limit_tag: Optional[str],
+    backend: str,
+    cache_file: Optional[Union[str, Path]],
+    pretruncate: bool,
+    workers: Optional[int],
+    profile: Optional[profiling.ParseProfile],
+    context: loss_parser.ParseContext,
+) -> Iterable[util.LossRow]:
+    """
+    Load and truncate stages of parse_file, the parsing is left to the returned generator
+    when a single tree is walked
+    """
+    content = archive.html_content(file, backend)
+    parser = loss_parser.OryxLossParser(backend)
+    if workers or cache_file:
+        # only the raw content up to the cutoff is needed, the page is not parsed as a whole
+        with profiling.stage(profile, "truncate"):
+            content.read_truncated(limit, limit_tag)
+    if workers and not cache_file:
+        with profiling.stage(profile, "parse"):
+            return parser.parse_losses_parallel(content(), workers, context.counters)
+    if cache_file:
+        incremental_parser = incremental.IncrementalLossParser(cache_file, parser)
+        with profiling.stage(profile, "parse"):
+            rows = incremental_parser.parse_losses(content())
+        context.counters.update(
+            incremental_parser.counters,
+            sections_reused=incremental_parser.reused,
+            sections_parsed=incremental_parser.parsed,
+        )
+        return rows
+    if pretruncate:
+        with profiling.stage(profile, "load"):
+            content.load_truncated(limit, limit_tag)
+    else:
+        with profiling.stage(profile, "load"):
+            content.load()
+        with profiling.stage(profile, "truncate"):
+            content.truncate_soup(limit, limit_tag)
+    return parser.iter_losses(content.soup, context)
+
+
+def extract_file(
+    file: Union[str, Path, archive.ArchiveMember],
+    names: Iterable[str],
+    limit: Optional[str] = None,
+    limit_tag: Optional[str] = None,
+    backend: str = "auto",
+    pretruncate: bool = False,
+    profile: Optional[profiling.ParseProfile] = None,
+) -> dict[str, list]:
+    """
+    Records of several EXTRACTORS from a single walk of the page, e.g. the loss rows and the category
+    totals of a loss page.
+    :param file: path to the html file (also compressed), or a member of a tar/zip archive
+    :param names: registered extractors to run
+    :param limit: cutoff string, content from the tag containing it is not read. Whole page if not given.
+    :param limit_tag: name of the tag holding the cutoff string
+    :param backend: BeautifulSoup parser backend
+    :param pretruncate: cut the file at the cutoff before parsing it
+    :param profile: stage times and the counters of the extractors are collected into it
+    :return: {name: records}
+    """
+    content = archive.html_content(file, backend)
+    if limit and pretruncate:
+        with profiling.stage(profile, "load"):
+            content.load_truncated(limit, limit_tag)
+    else:
+        with profiling.stage(profile, "load"):
+            content.load()
+        if limit:
+            with profiling.stage(profile, "truncate"):
+                content.truncate_soup(limit, limit_tag)
+    with profiling.stage(profile, "parse"):
+        return EXTRACTORS.extract(
+            content.soup, names, counters=profile.counters if profile else None
+        )
+
+
+def _iter_stream(
+    file: Union[str, Path, archive.ArchiveMember],
+    limit: str,
+    limit_tag: Optional[str] = None,
+    context: Optional[loss_parser.ParseContext] = None,
+) -> Iterator[dict]:
+    with archive.open_text(file) as html_file:
+        yield from stream_parser.OryxStreamParser().iter_losses(
+            html_file, limit, limit_tag, context
+        )
+
+
+def run_loss_parsing(args: Namespace, limit: str, limit_tag: Optional[str] = None):
+    """
+    :param args: parsed command line arguments (see util.parse_args)
+    :param limit: cutoff string, content from the tag containing it is not parsed
+    :param limit_tag: name of the tag holding the cutoff string
+    :return:
+    """
+    profile = None
+    if args.profile or args.cprofile:
+        profile = profiling.ParseProfile(args.cprofile)
+    if args.category_totals:
+        # both from one walk of the page, the result cache only holds loss rows
+        records = extract_file(
+            args.file,
+            ("losses", "category_totals"),
+            limit,
+            limit_tag,
+            args.backend,
+            args.pretruncate,
+            profile,
+        )
+        losses = records["losses"]
+        with profiling.stage(profile, "write"):
+            totals = [total._asdict() for total in records["category_totals"]]
+            util.ParsedContent(totals).load().write(args.category_totals)
+    else:
+        losses = parse_file(
+            args.file,
+            limit,
+            limit_tag,
+            args.backend,
+            args.stream,
+            args.cache_file,
+            args.pretruncate,
+            args.workers,
+            cache.resolve_cache_dir(args),
+            profile,
+        )
+    with profiling.stage(profile, "write"):
+        if args.normalized:
+            output = normalized.NormalizedContent(losses).load()
+        else:
+            snapshot_date = args.snapshot_date or util.snapshot_date_from_path(
+                args.file
+            )
+            output = util.ParsedContent(losses, snapshot_date).load()
+            if args.enrich:
+                output.enrich()
+        output.write(args.output_file, args.format)
+    if args.profile:
+        profile.write(
+            args.profile, file=str(args.file), output_file=str(args.output_file)
+        )
+
+
+def run_pledge_parsing(args: Namespace):
+    """
+    :param args: parsed command line arguments (see util.parse_pledge_args)
+    :return:
+    """
+    records = extract_file(args.file, ("pledges",), backend=args.backend)
+    pledges = [pledge._asdict() for pledge in records["pledges"]]
+    logger.info(f"{len(pledges)} pledges parsed from {args.file}")
+    util.ParsedContent(pledges).load().write(args.output_file, args.format)
@@ -0,0 +1,262 @@
+"""
+Streaming loss parsing from Oryx sourced html content, without building the full DOM.
+
+The page is fed to an incremental tokenizer (html.parser.HTMLParser) chunk by chunk.
+Only the tags the loss state machine looks at (h2/h3/li and the a/img tags inside them)
+are kept, and each one is handed to OryxLossParser as soon as it is closed.
+"""
+
+from typing import Iterator, Optional, TextIO
+from html.parser import HTMLParser
+import logging
+
+from src.loss_parser import OryxLossParser, ParseContext
+
+
+logger = logging.getLogger(__name__)
+
+# Tags BeautifulSoup treats as empty elements, these never get a closing tag
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "keygen",
+    "link",
+    "menuitem",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+    "basefont",
+    "bgsound",
+    "command",
+    "frame",
+    "image",
+    "isindex",
+    "nextid",
+    "spacer",
+}
+# Text of these is not part of get_text() in BeautifulSoup either
+SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+
+class StreamedTag:
+    """
+    Lightweight stand-in for bs4 Tag, holding only what OryxLossParser reads from a tag:
+    name, attributes, text and the nested a/img tags.
+    """
+
+    def __init__(self, name: str, attrs: list[tuple[str, Optional[str]]]):
+        self.name = name
+        self.attrs = {key: "" if value is None else value for key, value in attrs}
+        self.strings: list[str] = []
+        self.children: list["StreamedTag"] = []
+
+    def get_text(self, strip: bool = False) -> str:
+        if strip:
+            return "".join(string.strip() for string in self.strings if string.strip())
+        return "".join(self.strings)
+
+    def find_all(self, name: str) -> list["StreamedTag"]:
+        return [child for child in self.children if child.name == name]
+
+    def get(self, key: str, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.attrs[key]
+
+
+class _OpenElement:
+    def __init__(self, name: str, tag: Optional[StreamedTag], is_candidate: bool):
+        self.name = name
+        self.tag = tag
+        self.is_candidate = is_candidate
+        self.snapshot = None
+
+
+class OryxTokenizer(HTMLParser):
+    """
+    Incremental tokenizer collecting h2/h3/li tags in document order.
+    When exclude_from_str is set, stops at the first tag_name tag containing it,
+    dropping everything from that tag onward (same cutoff as truncate_content).
+    """
+
+    collected_tags = ("h2", "h3", "li")
+    nested_tags = ("a", "img")
+
+    def __init__(
+        self, exclude_from_str: Optional[str] = None, tag_name: Optional[str] = None
+    ):
+        super().__init__(convert_charrefs=True)
+        self.exclude_from_str = exclude_from_str
+        self.tag_name = tag_name
+        self.done = False
+        self.cutoff_found = False
+        self._stack: list[_OpenElement] = []
+        self._text_buffer: list[str] = []
+        self._skip_text_depth = 0
+        self._pending: list[StreamedTag] = []
+        self._ready: list[StreamedTag] = []
+
+    def pop_ready(self) -> list[StreamedTag]:
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self):
+        super().close()
+        if not self.done:
+            self._flush_text()
+            while self._stack and not self.done:
+                self._close_element(self._stack.pop())
+            self._release_pending()
+            self.done = True
+
+    def handle_starttag(self, tag: str, attrs: list):
+        if self.done:
+            return
+        self._flush_text()
+        is_candidate = self.exclude_from_str is not None and (
+            self.tag_name is None or tag == self.tag_name
+        )
+        snapshot = self._snapshot() if is_candidate else None
+        streamed = None
+        if tag in self.collected_tags or tag in self.nested_tags or is_candidate:
+            streamed = StreamedTag(tag, attrs)
+            if tag in self.nested_tags:
+                for parent in self._open_tags():
+                    parent.children.append(streamed)
+            if tag in self.collected_tags:
+                self._pending.append(streamed)
+        if tag in VOID_TAGS:
+            return
+        element = _OpenElement(tag, streamed, is_candidate)
+        element.snapshot = snapshot
+        self._stack.append(element)
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_text_depth += 1
+
+    def handle_startendtag(self, tag: str, attrs: list):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        if self.done:
+            return
+        self._flush_text()
+        names = [element.name for element in self._stack]
+        if tag not in names:
+            return
+        position = len(names) - 1 - names[::-1].index(tag)
+        while len(self._stack) > position and not self.done:
+            self._close_element(self._stack.pop())
+        # tags completed inside an open cutoff candidate are held, the cut may still roll them back
+        if not self.done and not any(
+            element.name in self.collected_tags or element.is_candidate
+            for element in self._stack
+        ):
+            self._release_pending()
+
+    def handle_data(self, data: str):
+        if not self.done and not self._skip_text_depth:
+            self._text_buffer.append(data)
+
+    def handle_unknown_decl(self, data: str):
+        if data.startswith("CDATA["):
+            self.handle_data(data[len("CDATA[") :])
+
+    def handle_comment(self, data: str):
+        self._flush_text()
+
+    def _open_tags(self) -> list[StreamedTag]:
+        return [element.tag for element in self._stack if element.tag is not None]
+
+    def _flush_text(self):
+        if not self._text_buffer:
+            return
+        text = "".join(self._text_buffer)
+        self._text_buffer = []
+        for streamed in self._open_tags():
+            streamed.strings.append(text)
+
+    def _snapshot(self) -> tuple[list, int]:
+        tags = [
+            (streamed, len(streamed.strings), len(streamed.children))
+            for streamed in self._open_tags()
+        ]
+        return tags, len(self._pending)
+
+    def _close_element(self, element: _OpenElement):
+        if element.name in SKIPPED_TEXT_TAGS:
+            self._skip_text_depth -= 1
+        if element.is_candidate and self.exclude_from_str in element.tag.get_text():
+            self._cut(element)
+
+    def _cut(self, element: _OpenElement):
+        """Rolling back to the start of the outermost open cutoff candidate (it contains the string too)"""
+        first_candidate = next(
+            (open_el for open_el in self._stack if open_el.is_candidate), element
+        )
+        tags, pending_count = first_candidate.snapshot
+        for streamed, strings_count, children_count in tags:
+            del streamed.strings[strings_count:]
+            del streamed.children[children_count:]
+        del self._pending[pending_count:]
+        self._stack = []
+        self._release_pending()
+        self.cutoff_found = True
+        self.done = True
+        logger.debug(f"Cutoff string found, stopping at <{first_candidate.name}>")
+
+    def _release_pending(self):
+        self._ready.extend(self._pending)
+        self._pending = []
+
+
+class OryxStreamParser:
+    """
+    Streaming counterpart of OryxLossParser.parse_losses: yields the same rows,
+    while only keeping the currently open h2/h3/li tags in memory.
+    """
+
+    def __init__(
+        self,
+        loss_parser: Optional[OryxLossParser] = None,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.loss_parser = loss_parser if loss_parser else OryxLossParser()
+        self.chunk_size = chunk_size
+
+    def iter_losses(
+        self,
+        stream: TextIO,
+        exclude_from_str: Optional[str] = None,
+        tag_name: Optional[str] = None,
+        context: Optional[ParseContext] = None,
+    ) -> Iterator[dict]:
+        """
+        :param stream: text stream with html content, read in chunk_size pieces
+        :param exclude_from_str: cutoff string, reading stops once it is found
+        :param tag_name: name of the tag holding the cutoff string
+        :param context: parse state, left updated (e.g. its counters), a new one if not given
+        :return: generator of loss rows
+        """
+        tokenizer = OryxTokenizer(exclude_from_str, tag_name)
+        context = context if context else ParseContext()
+        while not tokenizer.done:
+            chunk = stream.read(self.chunk_size)
+            if chunk:
+                tokenizer.feed(chunk)
+            else:
+                tokenizer.close()
+            for tag in tokenizer.pop_ready():
+                yield from self.loss_parser.parse_tag_data(tag, context)
+        if exclude_from_str is not None and not tokenizer.cutoff_found:
+            raise Exception(f"String '{exclude_from_str}' not found in content!")
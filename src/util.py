@@ -3,13 +3,114 @@ Helper functions/classes shared by the different parsers
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Self, Union, Optional
+from typing import (
+    Any,
+    ContextManager,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Self,
+    TextIO,
+    Union,
+    Optional,
+    TYPE_CHECKING,
+    get_args,
+    get_type_hints,
+)
 from pathlib import Path
 from argparse import ArgumentParser, Namespace
+from itertools import chain, islice
+import csv
+import locale
+import logging
+import mmap
+import os
+import re
+import sqlite3
 
 from bs4 import BeautifulSoup
-from bs4.element import ResultSet
-import pandas as pd
+from bs4.element import Tag
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+    from src.archive import ArchiveMember
+
+from src import compressed
+from src import cutoff
+from src.backends import BACKENDS, DEFAULT_BACKEND, resolve_backend
+
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("csv", "parquet", "arrow", "feather", "sqlite")
+# The sqlite output is the losses table, other records only go to files
+TABLE_FORMATS = ("csv", "parquet", "arrow", "feather")
+# The normalized tables go to one file per table or into one database
+NORMALIZED_FORMATS = ("csv", "parquet", "sqlite")
+FORMAT_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+    ".feather": "feather",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".db": "sqlite",
+}
+
+
+class LossRow(NamedTuple):
+    """
+    One loss in the long row layout. A tuple row is a fraction of the size of a dict one,
+    and the category/type values are interned strings shared by all rows of the type.
+    """
+
+    category_counter: int
+    category_name: Optional[str]
+    category_summary: Optional[str]
+    type_name: Optional[str]
+    type_ttl_count: Optional[int]
+    type_img_links: Optional[str]
+    loss_item: str
+    loss_proof: Optional[str]
+
+
+LONGROW_COLUMNS = LossRow._fields
+# Rows taken from a row generator at once by the chunked writers (one parquet row group each)
+CHUNK_ROWS = 10_000
+# Columns repeating the same few values on every loss row, written dictionary encoded
+CATEGORICAL_COLUMNS = (
+    "snapshot_date",
+    "category_name",
+    "category_summary",
+    "type_name",
+    "type_img_links",
+)
+# Losses of many snapshots accumulated in one table. One proof link can show several items of a type,
+# so the natural key has an occurrence number next to snapshot date + type + proof link.
+LOSSES_SQLITE_KEY = ("snapshot_date", "type_name", "loss_proof", "occurrence")
+LOSSES_SQLITE_TABLE = "losses"
+LOSSES_SQLITE_COLUMNS = ("snapshot_date", *LONGROW_COLUMNS, "occurrence")
+LOSSES_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS losses (
+    snapshot_date TEXT NOT NULL,
+    category_counter INTEGER,
+    category_name TEXT,
+    category_summary TEXT,
+    type_name TEXT,
+    type_ttl_count INTEGER,
+    type_img_links TEXT,
+    loss_item TEXT,
+    loss_proof TEXT,
+    occurrence INTEGER NOT NULL,
+    UNIQUE (snapshot_date, type_name, loss_proof, occurrence)
+);
+CREATE INDEX IF NOT EXISTS losses_snapshot_date ON losses (snapshot_date);
+CREATE INDEX IF NOT EXISTS losses_category_name ON losses (category_name, snapshot_date);
+CREATE INDEX IF NOT EXISTS losses_type_name ON losses (type_name, snapshot_date);
+"""
 
 
 class Content(ABC):
@@ -26,16 +127,80 @@ class Content(ABC):
 
 
 class HTMLFileContent(Content):
-    def __init__(self, source: Union[str, Path]):
+    def __init__(self, source: Union[str, Path], backend: str = DEFAULT_BACKEND):
         self.soup: Optional[BeautifulSoup] = None
+        self.backend = resolve_backend(backend)
         super().__init__(source)
 
     def load(self) -> Self:
-        with open(self._source) as file:
+        with self.open_text() as file:
             self._content = file.read()
-        self.soup = BeautifulSoup(self._content, "html.parser")
+        self.soup = BeautifulSoup(self._content, self.backend)
+        return self
+
+    def load_truncated(
+        self, exclude_from_str: str, tag_name: Optional[str] = None
+    ) -> Self:
+        """
+        Same content and soup as load + truncate_content + truncate_soup, but the cutoff is searched
+        as bytes in the memory mapped (or decompressed) file, and only the part before it is decoded
+        and parsed.
+        Falls back to the tree based truncation when the literal search can not find the cutoff safely.
+        :param exclude_from_str:
+        :param tag_name:
+        :return:
+        """
+        self.soup = None
+        self.read_truncated(exclude_from_str, tag_name)
+        if self.soup is None:
+            self.soup = BeautifulSoup(self._content, self.backend)
+            return self
+        return self.truncate_soup(exclude_from_str, tag_name)
+
+    def read_truncated(
+        self, exclude_from_str: str, tag_name: Optional[str] = None
+    ) -> Self:
+        """
+        Raw content up to the cutoff, as with load + truncate_content. The content is not parsed
+        when the cutoff is found in the memory mapped bytes (soup is left as it was),
+        the fallback (load + truncate_content) parses it.
+        A compressed file is decompressed only up to the cutoff (see compressed.read_until_cutoff).
+        :param exclude_from_str:
+        :param tag_name:
+        :return:
+        """
+        encoding = locale.getpreferredencoding(False)
+        marker = exclude_from_str.encode(encoding)
+        prefix = self._read_prefix(marker, tag_name)
+        if prefix is None:
+            logger.info(f"Cutoff not found in the raw bytes of {self._source}, parsing all")
+            return self.load().truncate_content(exclude_from_str, tag_name)
+        # Newlines translated as when reading in text mode (load)
+        self._content = (
+            prefix.decode(encoding).replace("\r\n", "\n").replace("\r", "\n")
+        )
         return self
 
+    def open_text(self) -> ContextManager[TextIO]:
+        """Text of the source as open() reads it, a compressed file decompressed"""
+        return compressed.open_text(self._source)
+
+    def _read_prefix(self, marker: bytes, tag_name: Optional[str]) -> Optional[bytes]:
+        if compressed.detect_compression(self._source):
+            with compressed.open_binary(self._source) as binary_file:
+                return compressed.read_until_cutoff(binary_file, marker, tag_name)
+        return self._mapped_prefix(marker, tag_name)
+
+    def _mapped_prefix(
+        self, marker: bytes, tag_name: Optional[str]
+    ) -> Optional[bytes]:
+        with open(self._source, "rb") as file:
+            if not os.fstat(file.fileno()).st_size:
+                return None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                position = cutoff.find_cutoff_bytes(data, marker, tag_name)
+                return data[:position] if position is not None else None
+
     def truncate_content(
         self, exclude_from_str: str, tag_name: Optional[str] = None
     ) -> Self:
@@ -44,35 +209,548 @@ class HTMLFileContent(Content):
         :param tag_name:
         :return:
         """
-        tags = self.soup.find_all(tag_name) if tag_name else self.soup.find_all()
-        position = self._find_str_pos(tags, exclude_from_str)
+        position = cutoff.find_cutoff_pos(
+            self.soup, self._content, exclude_from_str, tag_name
+        )
         self._content = self._content[:position]
         return self
 
-    def _find_str_pos(self, tags: ResultSet, string: str) -> int:
-        for tag in tags:
-            if string in tag.get_text():
-                return str(self.soup).find(str(tag))
-        raise Exception(f"String '{string}' not found in content!")
+    def truncate_soup(
+        self, exclude_from_str: str, tag_name: Optional[str] = None
+    ) -> Self:
+        """
+        Same cutoff as truncate_content, but applied as a node boundary in the already parsed tree,
+        so the content does not need to be serialized and parsed again.
+        Only self.soup is truncated, the raw content is left as loaded.
+        :param exclude_from_str:
+        :param tag_name:
+        :return:
+        """
+        cutoff_tag = cutoff.find_cutoff_tag(self.soup, exclude_from_str, tag_name)
+        self._remove_from(cutoff_tag)
+        return self
+
+    @staticmethod
+    def _remove_from(tag: Tag):
+        """Removing the tag and everything after it in document order"""
+        for node in [tag, *tag.parents]:
+            for sibling in list(node.next_siblings):
+                sibling.extract()
+        tag.extract()
 
 
 class ParsedContent(Content):
-    def __init__(self, source: list[dict]):
+    """
+    Rows are kept as given (list or generator of LossRow records, other NamedTuple records or dicts),
+    pandas is only imported when a DataFrame is requested (to_dataframe, columnar writers).
+    """
+
+    def __init__(
+        self,
+        source: Iterable[Union[LossRow, dict]],
+        snapshot_date: Optional[str] = None,
+    ):
+        """
+        :param source: loss rows
+        :param snapshot_date: date of the snapshot, used for rows without snapshot_date (sqlite output)
+        """
+        self.snapshot_date = snapshot_date
         super().__init__(source)
 
     def load(self) -> Self:
-        self._content = pd.DataFrame(self._source)
+        self._content = self._source
+        return self
+
+    def to_dataframe(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        if not self._is_dataframe():
+            rows = list(self._content)
+            if rows and _is_record(rows[0]):
+                self._content = pd.DataFrame.from_records(rows, columns=rows[0]._fields)
+            else:
+                self._content = pd.DataFrame(rows)
+        return self._content
+
+    def enrich(self) -> Self:
+        """
+        Adds the status columns parsed from loss_item and category_summary (see enrich.enrich_losses).
+        They are computed over whole columns, so the rows are collected into a DataFrame first.
+        The sqlite output keeps its table layout, without these columns.
+        """
+        from src import enrich
+
+        self._content = enrich.enrich_losses(self.to_dataframe())
         return self
 
     def to_csv(self, output_file: Union[str, Path]):
-        self._content.to_csv(output_file)
+        """
+        Rows are streamed to csv.writer, in the same layout pandas' DataFrame.to_csv writes:
+        header, then a leading index column, None as empty field.
+        :param output_file:
+        :return:
+        """
+        if self._is_dataframe():
+            self._content.to_csv(output_file)
+            return
+        with open(output_file, "w", newline="") as file:
+            writer = csv.writer(file, lineterminator=os.linesep)
+            rows = iter(self._content)
+            first_row = next(rows, None)
+            if first_row is None:
+                writer.writerow([""])
+                return
+            if _is_record(first_row):
+                writer.writerow(["", *first_row._fields])
+                for index, row in enumerate(chain([first_row], rows)):
+                    writer.writerow([index, *row])
+                return
+            columns = list(first_row)
+            writer.writerow(["", *columns])
+            writer.writerow([0, *first_row.values()])
+            for index, row in enumerate(rows, start=1):
+                writer.writerow([index, *(row[column] for column in columns)])
+
+    def to_parquet(self, output_file: Union[str, Path]):
+        """
+        Rows not in a DataFrame yet are written CHUNK_ROWS at a time, one row group each,
+        so memory use is bounded by the chunk size when the rows come from a generator.
+        :param output_file:
+        :return:
+        """
+        if self._is_dataframe():
+            self._categorized().to_parquet(output_file)
+            return
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in iter_chunks(self._content, CHUNK_ROWS):
+                table = self._arrow_table(chunk, writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            self._content = []
+            self._categorized().to_parquet(output_file)
+
+    def to_feather(self, output_file: Union[str, Path]):
+        """
+        Feather (v2) is the Arrow IPC file format, so this serves .arrow output too.
+        Not chunked: the IPC file format needs the same dictionaries in every batch,
+        which are only known once all rows are read.
+        """
+        self._categorized().to_feather(output_file)
+
+    def to_sqlite(self, output_file: Union[str, Path]):
+        """
+        Rows are upserted into the losses table of the database (created if needed), keyed by LOSSES_SQLITE_KEY.
+        Re-running a snapshot updates its rows in place, new snapshots are appended.
+        Written with executemany in one transaction, database in WAL mode.
+        :param output_file:
+        :return:
+        """
+        columns = LOSSES_SQLITE_COLUMNS
+        updated = [column for column in columns if column not in LOSSES_SQLITE_KEY]
+        upsert = (
+            f"INSERT INTO {LOSSES_SQLITE_TABLE} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(LOSSES_SQLITE_KEY)}) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in updated)
+        )
+        connection = sqlite3.connect(output_file)
+        try:
+            self._check_sqlite_tables(connection, output_file)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(LOSSES_SQLITE_SCHEMA)
+            with connection:
+                connection.executemany(upsert, self._iter_sqlite_rows())
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _check_sqlite_tables(
+        connection: sqlite3.Connection, output_file: Union[str, Path]
+    ):
+        """The losses table is only written with its own layout, never next to normalized tables"""
+        from src import normalized
+
+        tables = normalized.SQLITE_TABLES
+        if any(sqlite_table_columns(connection, table) for table in tables):
+            raise Exception(
+                f"{output_file} holds normalized tables, "
+                "write the long rows into another database!"
+            )
+        existing = sqlite_table_columns(connection, LOSSES_SQLITE_TABLE)
+        if existing and existing != LOSSES_SQLITE_COLUMNS:
+            raise Exception(
+                f"{output_file} has a {LOSSES_SQLITE_TABLE} table of another layout!"
+            )
+
+    def write(self, output_file: Union[str, Path], output_format: Optional[str] = None):
+        """
+        :param output_file:
+        :param output_format: one of OUTPUT_FORMATS, inferred from the file extension if not given
+        :return:
+        """
+        writers = {
+            "csv": self.to_csv,
+            "parquet": self.to_parquet,
+            "arrow": self.to_feather,
+            "feather": self.to_feather,
+            "sqlite": self.to_sqlite,
+        }
+        writers[resolve_output_format(output_file, output_format)](output_file)
+
+    def _iter_sqlite_rows(self) -> Iterator[tuple]:
+        rows = (
+            self._content.to_dict("records") if self._is_dataframe() else self._content
+        )
+        occurrences = {}
+        for row in rows:
+            if isinstance(row, LossRow):
+                snapshot_date, values = self.snapshot_date, row
+            else:
+                snapshot_date = row.get("snapshot_date") or self.snapshot_date
+                values = LossRow(*(row[column] for column in LONGROW_COLUMNS))
+            if not snapshot_date:
+                raise Exception("Snapshot date is needed for sqlite output!")
+            key = (snapshot_date, values.type_name, values.loss_proof)
+            occurrences[key] = occurrences.get(key, 0) + 1
+            yield snapshot_date, *values, occurrences[key]
+
+    def _is_dataframe(self) -> bool:
+        """Checked without importing pandas (rows may still be a generator)"""
+        return type(self._content).__name__ == "DataFrame"
+
+    @staticmethod
+    def _arrow_table(
+        chunk: list[Union[LossRow, dict]], schema: Optional["pa.Schema"] = None
+    ) -> "pa.Table":
+        """
+        :param chunk: rows, LossRow (NamedTuple) records are transposed to columns directly
+        :param schema: schema of the previous chunks, set up from this one if not given
+        (categorical columns dictionary encoded, annotated record fields by their type - the LossRow
+        ones for dict rows - so a column empty in the first chunk is not typed from it,
+        other all empty columns as strings)
+        """
+        import pyarrow as pa
+
+        if _is_record(chunk[0]):
+            columns = dict(zip(chunk[0]._fields, map(list, zip(*chunk))))
+            table = pa.Table.from_pydict(columns, schema=schema)
+            annotations = get_type_hints(type(chunk[0]))
+        else:
+            table = pa.Table.from_pylist(chunk, schema=schema)
+            annotations = get_type_hints(LossRow)
+        if schema is not None:
+            return table
+        fields = []
+        for field in table.schema:
+            declared = _arrow_type(annotations.get(field.name))
+            if field.name in CATEGORICAL_COLUMNS:
+                field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+            elif declared is not None:
+                field = field.with_type(declared)
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            fields.append(field)
+        return table.cast(pa.schema(fields))
+
+    def _categorized(self) -> "pd.DataFrame":
+        """Columnar formats store pandas categories as dictionary encoded columns"""
+        frame = self.to_dataframe()
+        columns = {
+            column: "category" for column in CATEGORICAL_COLUMNS if column in frame.columns
+        }
+        return frame.astype(columns)
+
+
+def sqlite_table_columns(connection: sqlite3.Connection, table: str) -> tuple:
+    """Column names of a table or view, empty if the database has none of that name"""
+    return tuple(row[1] for row in connection.execute(f"PRAGMA table_info({table})"))
+
+
+def _arrow_type(annotation: Any) -> Optional["pa.DataType"]:
+    """Arrow type of an int/float/bool/str (or Optional one) field annotation, None for others"""
+    import pyarrow as pa
+
+    types = {int: pa.int64(), float: pa.float64(), bool: pa.bool_(), str: pa.string()}
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    return types.get(args[0] if len(args) == 1 else annotation)
+
+
+def _is_record(row: Any) -> bool:
+    """LossRow or another NamedTuple row, written by its fields"""
+    return isinstance(row, tuple) and hasattr(row, "_fields")
+
+
+def row_dict(row: Union[LossRow, dict]) -> dict:
+    """For consumers of rows with extra columns (e.g. snapshot_date of batch rows)"""
+    return row._asdict() if isinstance(row, LossRow) else row
+
+
+def iter_chunks(rows: Iterable, size: int) -> Iterator[list]:
+    """
+    :param rows: any iterable, e.g. the generator of OryxLossParser.iter_losses
+    :param size: rows per chunk
+    :return: lists of at most size rows, only one held at a time
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def resolve_output_format(
+    output_file: Union[str, Path], output_format: Optional[str] = None
+) -> str:
+    """Unknown extensions fall back to csv"""
+    if output_format:
+        return output_format
+    return FORMAT_EXTENSIONS.get(Path(output_file).suffix.lower(), "csv")
+
+
+def snapshot_date_from_path(
+    path: Union[str, Path, "ArchiveMember"]
+) -> Optional[str]:
+    """Snapshot files are named like 2025-04-21_attack-on-europe-documenting-ukrainian.html"""
+    name = Path(path).name if isinstance(path, str) else path.name
+    match = re.match(r"(\d{4}-\d{2}-\d{2})", name)
+    return match.group(1) if match else None
 
 
 def parse_args() -> Namespace:
     parser = ArgumentParser(description="Moving html content into longrow csv file")
     parser.add_argument("--file", help="Path to file with html content", required=True)
+    parser.add_argument(
+        "--output_file",
+        help="Name of output file (csv, .parquet, .arrow, .feather or .sqlite/.db)",
+        required=True,
+    )
+    _add_parsing_args(parser)
+    parser.add_argument(
+        "--cache_file",
+        help="Json file keeping category sections of the previous run, "
+        "only changed sections are parsed again (not with --stream)",
+    )
+    parser.add_argument(
+        "--workers",
+        help="Parse the category sections of the page in this many worker processes "
+        "(not with --stream or --cache_file)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--snapshot_date",
+        help="Snapshot date for sqlite output (default: from a YYYY-MM-DD file name prefix)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Json file of a report with the time and peak memory of each stage and parse counters",
+    )
+    parser.add_argument(
+        "--cprofile",
+        help="File of a cProfile (pstats) dump of the parse stage",
+    )
+    parser.add_argument(
+        "--normalized",
+        help="Write linked categories, types and losses tables instead of long rows "
+        "(<output>_<table>.csv/.parquet files, or one .sqlite/.db database)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--category_totals",
+        help="Also write the counts of every category (csv, .parquet, .arrow or .feather), "
+        "read in the same walk of the page as the losses (not with --stream, --workers "
+        "or --cache_file)",
+    )
+    arguments = parser.parse_args()
+    if arguments.stream and arguments.cache_file:
+        parser.error("--cache_file can not be used with --stream")
+    if arguments.workers and (arguments.stream or arguments.cache_file):
+        parser.error("--workers can not be used with --stream or --cache_file")
+    output_format = resolve_output_format(arguments.output_file, arguments.format)
+    if arguments.normalized and output_format not in NORMALIZED_FORMATS:
+        parser.error(f"--normalized can not be written as {output_format}")
+    if arguments.enrich and arguments.normalized:
+        parser.error("--enrich can not be used with --normalized")
+    if (
+        output_format == "sqlite"
+        and not arguments.normalized
+        and not (arguments.snapshot_date or snapshot_date_from_path(arguments.file))
+    ):
+        parser.error(
+            "sqlite output needs --snapshot_date or a YYYY-MM-DD file name prefix"
+        )
+    if arguments.category_totals:
+        if arguments.stream or arguments.workers or arguments.cache_file:
+            parser.error(
+                "--category_totals can not be used with --stream, --workers or --cache_file"
+            )
+        if resolve_output_format(arguments.category_totals) not in TABLE_FORMATS:
+            parser.error("--category_totals can not be written to sqlite")
+    return arguments
+
+
+def parse_pledge_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Moving pledged heavy weaponry from html content into a csv file"
+    )
+    parser.add_argument("--file", help="Path to file with html content", required=True)
+    parser.add_argument(
+        "--output_file",
+        help="Name of output file (csv, .parquet, .arrow or .feather)",
+        required=True,
+    )
+    parser.add_argument(
+        "--format",
+        help="Output format (default: from the output file extension, otherwise csv)",
+        choices=TABLE_FORMATS,
+        default=None,
+    )
+    _add_backend_argument(parser)
+    arguments = parser.parse_args()
+    if resolve_output_format(arguments.output_file, arguments.format) == "sqlite":
+        parser.error("Pledges can not be written to sqlite")
+    return arguments
+
+
+def parse_batch_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Moving many html snapshots into longrow csv files"
+    )
+    parser.add_argument(
+        "--input",
+        help="Directory with html snapshots, glob pattern (quote it) "
+        "or tar/zip archive",
+        required=True,
+    )
+    parser.add_argument(
+        "--members",
+        help="Glob pattern of the snapshots inside tar/zip archives (default: *.html)",
+        default="*.html",
+    )
+    parser.add_argument(
+        "--side",
+        help="Whose losses the snapshots document (sets the cutoff)",
+        choices=["ukr", "ru"],
+        required=True,
+    )
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument(
+        "--output_dir", help="Directory for one output file per input file"
+    )
+    output.add_argument(
+        "--output_file",
+        help="Single combined output, with snapshot_date column taken from file names",
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of worker processes (default: number of CPUs)",
+        type=int,
+        default=None,
+    )
+    _add_parsing_args(parser)
+    arguments = parser.parse_args()
+    return arguments
+
+
+def parse_watch_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Parsing html snapshots as they land in a directory"
+    )
+    parser.add_argument(
+        "--watch_dir", help="Directory the html snapshots are saved to", required=True
+    )
+    parser.add_argument(
+        "--output_dir", help="Directory for one output file per snapshot", required=True
+    )
+    parser.add_argument(
+        "--side",
+        help="Whose losses the snapshots document (sets the cutoff)",
+        choices=["ukr", "ru"],
+        required=True,
+    )
+    parser.add_argument(
+        "--concurrency",
+        help="Number of snapshots parsed at the same time (default: 2)",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--queue_size",
+        help="Number of snapshots waiting for parsing before polling pauses (default: 16)",
+        type=int,
+        default=16,
+    )
+    parser.add_argument(
+        "--poll_interval",
+        help="Seconds between two scans of the watch directory (default: 2)",
+        type=float,
+        default=2.0,
+    )
+    _add_parsing_args(parser)
+    arguments = parser.parse_args()
+    return arguments
+
+
+def parse_diff_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Added, removed and changed losses between two parsed snapshots"
+    )
+    parser.add_argument(
+        "--old", help="Parsed csv of the earlier snapshot", required=True
+    )
+    parser.add_argument("--new", help="Parsed csv of the later snapshot", required=True)
     parser.add_argument(
         "--output_file", help="Name of output file (csv)", required=True
     )
     arguments = parser.parse_args()
     return arguments
+
+
+def _add_parsing_args(parser: ArgumentParser):
+    parser.add_argument(
+        "--format",
+        help="Output format (default: from the output file extension, otherwise csv)",
+        choices=OUTPUT_FORMATS,
+        default=None,
+    )
+    _add_backend_argument(parser)
+    parser.add_argument(
+        "--stream",
+        help="Parse with the streaming tokenizer instead of building the full tree",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--pretruncate",
+        help="Cut the raw file at the cutoff string before parsing (memory mapped byte search)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="Directory of the parse result cache, pages parsed before are loaded from it "
+        "(no cache if not given; not with --stream or --pretruncate). Entries are pickles, "
+        "use a directory only you can write to",
+        default=None,
+    )
+    parser.add_argument(
+        "--enrich",
+        help="Add status columns parsed from loss_item and category_summary "
+        "(ordinal, status flags, category counts)",
+        action="store_true",
+    )
+
+
+def _add_backend_argument(parser: ArgumentParser):
+    parser.add_argument(
+        "--backend",
+        help="Html parser backend used by BeautifulSoup (auto: fastest installed)",
+        choices=BACKENDS,
+        default="auto",
+    )
@@ -0,0 +1,248 @@
+"""
+Long running ingestion: snapshots landing in a watch directory are parsed as soon as they are complete
+"""
+
+from typing import Optional, Union
+from argparse import Namespace
+from pathlib import Path
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import chain
+import asyncio
+import logging
+import os
+
+from src import batch
+from src import cache
+from src import compressed
+from src import runner
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_atomically(
+    file: Path,
+    output_file: Path,
+    output_format: str,
+    limit: str,
+    limit_tag: Optional[str],
+    backend: str,
+    stream: bool,
+    pretruncate: bool,
+    cache_dir: Optional[Path] = None,
+    enrich: bool = False,
+) -> int:
+    """
+    Output is written to a temp file next to it and renamed, so readers never see a partial file.
+    Sqlite output is upserted in a transaction, so it is written in place.
+    """
+    if output_format == "sqlite":
+        tmp_file = output_file
+    else:
+        tmp_file = output_file.with_name(f".{output_file.name}.tmp")
+    try:
+        rows, _ = batch._parse_to_file(
+            file,
+            tmp_file,
+            output_format,
+            limit,
+            limit_tag,
+            backend,
+            stream,
+            pretruncate,
+            cache_dir,
+            enrich,
+        )
+    except Exception:
+        if tmp_file != output_file:
+            tmp_file.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_file, output_file)
+    return rows
+
+
+class SnapshotWatcher:
+    """
+    The watch directory is polled; a new or changed .html file (or compressed .html.gz etc.) is queued
+    once its size and modification time are the same on two consecutive polls (i.e. the scraper
+    finished writing it).
+    A bounded queue gives backpressure: when the workers fall behind, polling waits for free slots.
+    Parsing runs in a pool of worker processes that stay alive between files.
+    """
+
+    def __init__(
+        self,
+        watch_dir: Union[str, Path],
+        output_dir: Union[str, Path],
+        limit: str,
+        limit_tag: Optional[str] = None,
+        backend: str = "auto",
+        output_format: str = "csv",
+        concurrency: int = 2,
+        queue_size: int = 16,
+        poll_interval: float = 2.0,
+        stream: bool = False,
+        pretruncate: bool = False,
+        cache_dir: Optional[Path] = None,
+        enrich: bool = False,
+    ):
+        """
+        :param watch_dir: directory the snapshots land in
+        :param output_dir: directory of the outputs, named <input name>_parsed.<format>
+        :param limit: cutoff string, content from the tag containing it is not parsed
+        :param limit_tag: name of the tag holding the cutoff string
+        :param backend: BeautifulSoup parser backend
+        :param output_format: one of util.OUTPUT_FORMATS
+        :param concurrency: number of snapshots parsed at the same time
+        :param queue_size: number of complete snapshots waiting for a worker
+        :param poll_interval: seconds between two scans of the watch directory
+        :param stream: parse with the streaming tokenizer instead of building the full tree
+        :param pretruncate: cut the files at the cutoff before parsing them
+        :param cache_dir: directory of the parse result cache, not used if not given
+        :param enrich: add the status columns of enrich.enrich_losses to the outputs
+        """
+        self.watch_dir = Path(watch_dir)
+        self.output_dir = Path(output_dir)
+        self.limit = limit
+        self.limit_tag = limit_tag
+        self.backend = backend
+        self.output_format = output_format
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.stream = stream
+        self.pretruncate = pretruncate
+        self.cache_dir = cache_dir
+        self.enrich = enrich
+        self.parsed: dict[Path, int] = {}
+        self.failed: dict[Path, str] = {}
+        self._stop: Optional[asyncio.Event] = None
+        # path -> (size, mtime) of the last scan, and of the version already queued
+        self._last_seen: dict[Path, tuple] = {}
+        self._queued: dict[Path, tuple] = {}
+
+    async def run(self, executor: Optional[Executor] = None):
+        """
+        Watching until stop() is called
+        :param executor: pool running the parsing (default: process pool of concurrency workers)
+        """
+        self._stop = asyncio.Event()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        queue = asyncio.Queue(self.queue_size)
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=self.concurrency)
+        workers = [
+            asyncio.create_task(self._work(queue, executor))
+            for _ in range(self.concurrency)
+        ]
+        logger.info(f"Watching {self.watch_dir} for snapshots")
+        try:
+            while not self._stop.is_set():
+                for file in await asyncio.to_thread(self.scan):
+                    await queue.put(file)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if own_executor:
+                executor.shutdown()
+
+    def stop(self):
+        """Queued snapshots are still parsed before run() returns"""
+        if self._stop:
+            self._stop.set()
+
+    def scan(self) -> list[Path]:
+        """
+        :return: snapshots complete since the previous scan and not parsed yet in this version
+        """
+        ready = []
+        current = {}
+        files = chain.from_iterable(
+            self.watch_dir.glob(pattern) for pattern in compressed.SNAPSHOT_PATTERNS
+        )
+        for file in sorted(files):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            current[file] = signature
+            if self._last_seen.get(file) != signature:
+                continue
+            if self._queued.get(file) == signature or self._is_up_to_date(file, stat):
+                continue
+            self._queued[file] = signature
+            ready.append(file)
+        self._last_seen = current
+        return ready
+
+    def output_path(self, file: Path) -> Path:
+        return batch.output_path(file, self.output_dir, self.output_format)
+
+    def _is_up_to_date(self, file: Path, stat: os.stat_result) -> bool:
+        """Output left by an earlier run, newer than the snapshot (sqlite collects many snapshots)"""
+        if self.output_format == "sqlite":
+            return False
+        output_file = self.output_path(file)
+        return (
+            output_file.exists() and output_file.stat().st_mtime_ns >= stat.st_mtime_ns
+        )
+
+    async def _work(self, queue: asyncio.Queue, executor: Executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            file = await queue.get()
+            try:
+                self.parsed[file] = await loop.run_in_executor(
+                    executor,
+                    _parse_atomically,
+                    file,
+                    self.output_path(file),
+                    self.output_format,
+                    self.limit,
+                    self.limit_tag,
+                    self.backend,
+                    self.stream,
+                    self.pretruncate,
+                    self.cache_dir,
+                    self.enrich,
+                )
+                self.failed.pop(file, None)
+                logger.info(f"Parsed {file} ({self.parsed[file]} rows)")
+            except Exception as e:
+                self.failed[file] = batch.error_message(e)
+                logger.error(f"Parsing {file} failed: {self.failed[file]}")
+            finally:
+                queue.task_done()
+
+
+async def run_watching(args: Namespace) -> SnapshotWatcher:
+    """
+    :param args: parsed command line arguments (see util.parse_watch_args)
+    :return: the watcher, after it was stopped
+    """
+    limit, limit_tag = runner.CUTOFFS[args.side]
+    watcher = SnapshotWatcher(
+        args.watch_dir,
+        args.output_dir,
+        limit,
+        limit_tag,
+        args.backend,
+        args.format or "csv",
+        args.concurrency,
+        args.queue_size,
+        args.poll_interval,
+        args.stream,
+        args.pretruncate,
+        cache.resolve_cache_dir(args),
+        args.enrich,
+    )
+    await watcher.run()
+    return watcher
@@ -0,0 +1,152 @@
+from unittest import TestCase, main
+from pathlib import Path
+import bz2
+import csv
+import gzip
+import io
+import pickle
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+from src import archive
+from src import batch
+from src import runner
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+MEMBERS = ["2025-04/2025-04-21_ukr.html", "2025-04/2025-04-22_ukr.html", "notes.txt"]
+
+
+class TestArchive(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.tar_file = self.tmp_dir / "2025-04.tar.gz"
+        self.zip_file = self.tmp_dir / "2025-04.zip"
+        with tarfile.open(self.tar_file, "w:gz") as tar_file:
+            for name in MEMBERS:
+                tar_file.add(FIXTURE, name)
+        with zipfile.ZipFile(self.zip_file, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("2025-04/", "")
+            for name in MEMBERS:
+                zip_file.write(FIXTURE, name)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_is_archive(self):
+        self.assertTrue(archive.is_archive(self.tar_file))
+        self.assertTrue(archive.is_archive(self.zip_file))
+        self.assertFalse(archive.is_archive(FIXTURE))
+
+    def test_find_members(self):
+        for archive_file in (self.tar_file, self.zip_file):
+            with self.subTest(archive_file.name):
+                # Case 1: html files, directories left out
+                members = archive.find_members(archive_file)
+                self.assertEqual([member.member for member in members], MEMBERS[:2])
+                self.assertEqual(members[0].name, "2025-04-21_ukr.html")
+                self.assertEqual(
+                    str(members[0]), f"{archive_file}:2025-04/2025-04-21_ukr.html"
+                )
+
+                # Case 2: other pattern
+                members = archive.find_members(archive_file, "*-22_*.html")
+                self.assertEqual([member.member for member in members], MEMBERS[1:2])
+
+    def test_open(self):
+        for archive_file in (self.tar_file, self.zip_file):
+            member = archive.find_members(archive_file)[0]
+            # sent to worker processes as is
+            member = pickle.loads(pickle.dumps(member))
+            self.assertEqual(member, archive.ArchiveMember(archive_file, MEMBERS[0]))
+            with member.open() as member_file:
+                self.assertEqual(member_file.read(), FIXTURE.read_bytes())
+            with archive.open_text(member) as text_file:
+                self.assertEqual(text_file.read(), FIXTURE.read_text())
+
+    def test_parse_file(self):
+        limit = runner.UKR_LOSSES_CUTOFF
+        expected = list(runner.parse_file(FIXTURE, *limit))
+        member = archive.find_members(self.tar_file)[0]
+        # Case 1: tree
+        self.assertEqual(list(runner.parse_file(member, *limit)), expected)
+        # Case 2: stream
+        self.assertEqual(list(runner.parse_file(member, *limit, stream=True)), expected)
+        # Case 3: pretruncated, also with workers
+        rows = runner.parse_file(member, *limit, pretruncate=True)
+        self.assertEqual(list(rows), expected)
+        self.assertEqual(list(runner.parse_file(member, *limit, workers=1)), expected)
+        # Case 4: cached
+        cache_dir = self.tmp_dir / "cache"
+        self.assertEqual(
+            runner.parse_file(member, *limit, cache_dir=cache_dir), expected
+        )
+        self.assertEqual(
+            runner.parse_file(member, *limit, cache_dir=cache_dir), expected
+        )
+
+    def test_batch(self):
+        output_file = self.tmp_dir / "combined.csv"
+        snapshots = batch.find_snapshots(self.zip_file)
+        self.assertEqual([snapshot.member for snapshot in snapshots], MEMBERS[:2])
+        self.assertEqual(
+            batch.output_path(snapshots[0], "out"),
+            Path("out/2025-04-21_ukr_parsed.csv"),
+        )
+
+        summary = batch.BatchParser(
+            *runner.UKR_LOSSES_CUTOFF, "html.parser", workers=1
+        ).to_combined(snapshots, output_file)
+        self.assertEqual(summary.failed, {})
+        with open(output_file, newline="") as file:
+            dates = [row["snapshot_date"] for row in csv.DictReader(file)]
+        self.assertEqual(dates, ["2025-04-21"] * 12 + ["2025-04-22"] * 12)
+
+    def test_compressed_members(self):
+        members = {
+            "2025-04-21_ukr.html.gz": gzip.compress(FIXTURE.read_bytes()),
+            "2025-04-22_ukr.html.bz2": bz2.compress(FIXTURE.read_bytes()),
+        }
+        tar_path = self.tmp_dir / "compressed.tar"
+        with tarfile.open(tar_path, "w") as tar_file:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar_file.addfile(info, io.BytesIO(data))
+        zip_path = self.tmp_dir / "compressed.zip"
+        with zipfile.ZipFile(zip_path, "w") as zip_file:
+            for name, data in members.items():
+                zip_file.writestr(name, data)
+        limit = runner.UKR_LOSSES_CUTOFF
+        expected = list(runner.parse_file(FIXTURE, *limit))
+        for archive_file in (tar_path, zip_path):
+            with self.subTest(archive_file.name):
+                snapshots = batch.find_snapshots(archive_file, "*.html*")
+                # Case 1: decompressed while read, stored bytes kept for the cache key
+                with snapshots[0].open() as member_file:
+                    self.assertEqual(member_file.read(), FIXTURE.read_bytes())
+                with archive.open_raw(snapshots[0]) as raw_file:
+                    self.assertEqual(raw_file.read(), members[snapshots[0].member])
+
+                # Case 2: every parsing mode
+                for options in ({}, {"stream": True}, {"pretruncate": True}):
+                    rows = runner.parse_file(snapshots[1], *limit, **options)
+                    self.assertEqual(list(rows), expected)
+
+                # Case 3: batch output named without the compression suffix
+                self.assertEqual(
+                    batch.output_path(snapshots[0], "out"),
+                    Path("out/2025-04-21_ukr_parsed.csv"),
+                )
+                summary = batch.BatchParser(*limit, "html.parser", workers=1).to_files(
+                    snapshots, self.tmp_dir / archive_file.stem
+                )
+                self.assertEqual(summary.failed, {})
+                self.assertEqual(sum(summary.rows.values()), 24)
+
+
+if __name__ == "__main__":
+    main()
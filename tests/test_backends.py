@@ -0,0 +1,81 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from pathlib import Path
+import json
+
+from src import backends
+from src import loss_parser
+from src import stream_parser
+from src import util
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+LIMIT = (
+    "Attack On Europe: Documenting Ukrainian Equipment"
+    " Losses During The Russian Invasion Of Ukraine"
+)
+
+
+class TestBackends(TestCase):
+
+    @patch("src.backends.builder_registry")
+    def test_available_backends(self, registry_mock):
+        registry_mock.lookup.side_effect = lambda name: None if name == "lxml" else name
+        self.assertEqual(backends.available_backends(), ["html.parser", "html5lib"])
+
+    @patch("src.backends.available_backends")
+    def test_resolve_backend(self, available_mock):
+        # Case 1: auto picks the fastest installed
+        available_mock.return_value = ["html.parser", "lxml"]
+        self.assertEqual(backends.resolve_backend("auto"), "lxml")
+        available_mock.return_value = ["html.parser"]
+        self.assertEqual(backends.resolve_backend("auto"), "html.parser")
+
+        # Case 2: explicit backend
+        self.assertEqual(backends.resolve_backend("html.parser"), "html.parser")
+        self.assertEqual(backends.resolve_backend(), "html.parser")
+
+        # Case 3: not installed -> Exception
+        with self.assertRaises(Exception):
+            backends.resolve_backend("lxml")
+
+        # Case 4: unknown -> Exception
+        with self.assertRaises(Exception):
+            backends.resolve_backend("selectolax")
+
+
+class TestBackendConformance(TestCase):
+    """Every installed backend has to produce the exact same rows on the fixture page"""
+
+    def setUp(self):
+        self.html_file = FIXTURES / "oryx_losses.html"
+        with open(FIXTURES / "oryx_losses_expected.json") as file:
+            self.expected = [util.LossRow(**row) for row in json.load(file)]
+
+    def test_single_parse_pipeline(self):
+        for backend in backends.available_backends():
+            with self.subTest(backend=backend):
+                content = (
+                    util.HTMLFileContent(self.html_file, backend)
+                    .load()
+                    .truncate_soup(LIMIT, "a")
+                )
+                rows = loss_parser.OryxLossParser(backend).parse_losses(content.soup)
+                self.assertEqual(rows, self.expected)
+
+    def test_string_pipeline(self):
+        html = self.html_file.read_text()
+        for backend in backends.available_backends():
+            with self.subTest(backend=backend):
+                parser = loss_parser.OryxLossParser(backend)
+                rows = parser.parse_losses(parser.truncate_content(html, LIMIT, "a"))
+                self.assertEqual(rows, self.expected)
+
+    def test_stream_parser(self):
+        with open(self.html_file) as file:
+            rows = list(stream_parser.OryxStreamParser().iter_losses(file, LIMIT, "a"))
+        self.assertEqual(rows, self.expected)
+
+
+if __name__ == "__main__":
+    main()
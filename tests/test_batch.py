@@ -0,0 +1,207 @@
+from unittest import TestCase, main, skipUnless
+from unittest.mock import patch
+from argparse import Namespace
+from pathlib import Path
+import csv
+import shutil
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from src import batch
+from src import runner
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+
+
+class TestFindSnapshots(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        for name in [
+            "2025-04-22_page.html",
+            "2025-04-21_page.html",
+            "2025-04-23_page.html.gz",
+            "notes.txt",
+        ]:
+            (self.tmp_dir / name).write_text("")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_directory(self):
+        files = batch.find_snapshots(self.tmp_dir)
+        self.assertEqual(
+            [file.name for file in files],
+            [
+                "2025-04-21_page.html",
+                "2025-04-22_page.html",
+                "2025-04-23_page.html.gz",
+            ],
+        )
+
+    def test_glob(self):
+        files = batch.find_snapshots(str(self.tmp_dir / "*22*"))
+        self.assertEqual([file.name for file in files], ["2025-04-22_page.html"])
+
+    def test_output_path(self):
+        result = batch.output_path(Path("in/2025-04-21_page.html"), "out")
+        self.assertEqual(result, Path("out/2025-04-21_page_parsed.csv"))
+        result = batch.output_path(Path("2025-04-21_page.html"), "out", "parquet")
+        self.assertEqual(result, Path("out/2025-04-21_page_parsed.parquet"))
+        result = batch.output_path(Path("2025-04-21_page.html.xz"), "out")
+        self.assertEqual(result, Path("out/2025-04-21_page_parsed.csv"))
+
+
+class TestBatchSummary(TestCase):
+
+    def test_str(self):
+        summary = batch.BatchSummary()
+        summary.rows = {Path("a.html"): 10, Path("b.html"): 5}
+        summary.failed = {Path("c.html"): "Exception('boom')"}
+        summary.seconds = 1.25
+        self.assertEqual(
+            str(summary),
+            "Parsed 2/3 snapshots (15 rows) in 1.2s\nFailed: c.html: Exception('boom')",
+        )
+
+    def test_error_message(self):
+        error = UnicodeDecodeError("utf-8", b"\x8b" * 10_000, 0, 1, "invalid start byte")
+        message = batch.error_message(error)
+        self.assertTrue(message.startswith("UnicodeDecodeError: 'utf-8' codec"))
+        self.assertLessEqual(len(message), batch.MAX_ERROR_CHARS + 30)
+        self.assertEqual(batch.error_message(Exception("boom")), "Exception: boom")
+
+
+class TestBatchParser(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.files = []
+        for name in ["2025-04-21_ukr.html", "2025-04-22_ukr.html"]:
+            shutil.copy(FIXTURE, self.tmp_dir / name)
+            self.files.append(self.tmp_dir / name)
+        self.broken = self.tmp_dir / "2025-04-23_ukr.html"
+        self.broken.write_text("<html>no cutoff</html>")
+        limit, limit_tag = runner.UKR_LOSSES_CUTOFF
+        self.batch_parser = batch.BatchParser(limit, limit_tag, workers=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_init(self):
+        self.assertEqual(self.batch_parser.backend, "auto")
+        self.assertFalse(self.batch_parser.stream)
+        self.assertEqual(self.batch_parser.workers, 2)
+        self.assertFalse(self.batch_parser.pretruncate)
+
+    def test_to_files(self):
+        output_dir = self.tmp_dir / "out"
+        summary = self.batch_parser.to_files(
+            self.files + [self.broken], output_dir
+        )
+        self.assertEqual(summary.rows, {self.files[0]: 12, self.files[1]: 12})
+        self.assertEqual(list(summary.failed), [self.broken])
+        self.assertEqual(
+            sorted(file.name for file in output_dir.iterdir()),
+            ["2025-04-21_ukr_parsed.csv", "2025-04-22_ukr_parsed.csv"],
+        )
+
+    def test_to_combined(self):
+        output_file = self.tmp_dir / "combined.csv"
+        summary = self.batch_parser.to_combined(
+            [self.broken] + self.files, output_file
+        )
+        self.assertEqual(len(summary.rows), 2)
+        self.assertEqual(len(summary.failed), 1)
+        with open(output_file) as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 24)
+        self.assertEqual(list(rows[0])[1], "snapshot_date")
+        self.assertEqual(rows[0]["snapshot_date"], "2025-04-21")
+        self.assertEqual(rows[-1]["snapshot_date"], "2025-04-22")
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_to_combined_parquet(self):
+        output_file = self.tmp_dir / "combined.parquet"
+        self.batch_parser.to_combined(self.files, output_file)
+        frame = pd.read_parquet(output_file)
+        self.assertEqual(len(frame), 24)
+        self.assertEqual(frame["snapshot_date"].dtype, "category")
+
+    def test_enrich(self):
+        self.batch_parser.enrich = True
+        # Case 1: one output per file
+        output_dir = self.tmp_dir / "out"
+        self.batch_parser.to_files(self.files[:1], output_dir)
+        frame = pd.read_csv(output_dir / "2025-04-21_ukr_parsed.csv")
+        self.assertEqual(frame["category_total"].dtype, "int64")
+
+        # Case 2: combined output
+        output_file = self.tmp_dir / "combined.csv"
+        self.batch_parser.to_combined(self.files, output_file)
+        frame = pd.read_csv(output_file)
+        self.assertEqual(len(frame), 24)
+        self.assertEqual(list(frame.columns)[-1], "category_captured")
+
+    @patch("src.batch.util.ParsedContent")
+    def test_to_combined_nothing_parsed(self, parsed_mock):
+        summary = self.batch_parser.to_combined([self.broken], "out.csv")
+        self.assertEqual(len(summary.failed), 1)
+        parsed_mock.assert_not_called()
+
+
+class TestRunBatchParsing(TestCase):
+
+    @patch("src.batch.find_snapshots")
+    @patch("src.batch.BatchParser")
+    def test_run_batch_parsing(self, parser_mock, find_mock):
+        find_mock.return_value = ["a.html"]
+        args = Namespace(
+            input="dir",
+            members="2025-*.html",
+            side="ru",
+            output_dir=None,
+            output_file="out.csv",
+            workers=4,
+            backend="lxml",
+            stream=False,
+            format=None,
+            pretruncate=True,
+            cache_dir="cache",
+            enrich=False,
+        )
+
+        # Case 1: combined output
+        batch.run_batch_parsing(args)
+        parser_mock.assert_called_with(
+            *runner.RU_LOSSES_CUTOFF, "lxml", False, 4, True, Path("cache"), False
+        )
+        find_mock.assert_called_with("dir", "2025-*.html")
+        parser_mock.return_value.to_combined.assert_called_with(
+            ["a.html"], "out.csv", None
+        )
+
+        # Case 2: one output per file
+        args.output_dir, args.output_file = "out", None
+        batch.run_batch_parsing(args)
+        parser_mock.return_value.to_files.assert_called_with(
+            ["a.html"], "out", "csv"
+        )
+
+        # Case 3: one output per file, other format
+        args.format = "parquet"
+        batch.run_batch_parsing(args)
+        parser_mock.return_value.to_files.assert_called_with(
+            ["a.html"], "out", "parquet"
+        )
+
+
+if __name__ == "__main__":
+    main()
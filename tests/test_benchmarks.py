@@ -0,0 +1,115 @@
+from unittest import TestCase, main
+from pathlib import Path
+import tempfile
+
+from benchmarks import bench, tags
+from benchmarks.generator import OryxPageGenerator
+from src import runner
+from src.util import HTMLFileContent
+
+
+class TestOryxPageGenerator(TestCase):
+
+    def test_render(self):
+        generator = OryxPageGenerator(
+            categories=3, types_per_category=2, losses_per_type=4, broken_every=2
+        )
+        # Case 1: deterministic, a different seed gives another page
+        self.assertEqual(generator.render(), OryxPageGenerator(3, 2, 4, 2).render())
+        self.assertNotEqual(
+            generator.render(), OryxPageGenerator(3, 2, 4, 2, seed=1).render()
+        )
+
+        # Case 2: parsed rows, broken losses merged, nothing from after the cutoff
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            page = generator.write(Path(tmp_dir) / "page.html")
+            rows = list(runner.parse_file(page, *runner.UKR_LOSSES_CUTOFF))
+        self.assertEqual(len(rows), generator.expected_rows)
+        self.assertEqual([row.category_counter for row in rows[::8]], [1, 2, 3])
+        self.assertTrue(all(row.loss_item.endswith(")") for row in rows))
+        self.assertIn("and", rows[1].loss_item)
+        self.assertNotIn("after.cutoff", {row.loss_proof for row in rows})
+
+    def test_scaled(self):
+        generator = OryxPageGenerator(2, 3, 4).scaled(10)
+        self.assertEqual(generator.categories, 20)
+        self.assertEqual(generator.expected_rows, 240)
+
+
+class TestFindRegressions(TestCase):
+
+    def test_find_regressions(self):
+        baseline = {
+            "1": {
+                "load": {"seconds": 0.1, "relative": 0.1, "peak_bytes": 1000},
+                "parse_losses": {
+                    "seconds": 0.001,
+                    "relative": 0.001,
+                    "peak_bytes": 1000,
+                },
+            }
+        }
+        # Case 1: within tolerance, or below the timer noise floor
+        results = {
+            1: {
+                "load": bench.StageResult(0.14, 1100),
+                "parse_losses": bench.StageResult(0.004, 1000),
+            }
+        }
+        self.assertEqual(bench.find_regressions(results, baseline), [])
+
+        # Case 2: slower and bigger past the thresholds
+        results[1]["load"] = bench.StageResult(0.2, 1300)
+        regressions = bench.find_regressions(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(r.startswith("1x load") for r in regressions))
+
+        # Case 3: scales and stages missing from the baseline are not compared
+        results[10] = {"load": bench.StageResult(5.0, 10**9)}
+        self.assertEqual(len(bench.find_regressions(results, baseline)), 2)
+
+        # Case 4: compared as multiples of the reference time of the machine
+        results = {1: {"load": bench.StageResult(0.28, 1000)}}
+        self.assertEqual(len(bench.find_regressions(results, baseline)), 1)
+        slower_machine = bench.find_regressions(
+            results, baseline, reference_seconds=2.0
+        )
+        self.assertEqual(slower_machine, [])
+
+    def test_to_baseline(self):
+        results = {1: {"load": bench.StageResult(0.5, 1000)}}
+        self.assertEqual(
+            bench.to_baseline(results, 0.25),
+            {"1": {"load": {"seconds": 0.5, "relative": 2.0, "peak_bytes": 1000}}},
+        )
+        self.assertGreater(bench.calibrate(repeat=1), 0)
+
+
+class TestTagBenchmark(TestCase):
+
+    def test_single_walk(self):
+        page = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+        content = HTMLFileContent(page, "html.parser")
+        content.load()
+        # Same values read by both approaches
+        for tag in content.soup.find_all(["h3", "li"]):
+            expected = tags.repeated_walks(tag)
+            item = tags.single_walk(tag)
+            if tag.name == "h3":
+                self.assertEqual(item, expected[0])
+            else:
+                self.assertEqual(item.text, expected[0])
+                self.assertEqual(item.img_links, " ".join(expected[1]) or None)
+                self.assertEqual(item.anchors, expected[2])
+
+    def test_run(self):
+        results = tags.TagBenchmark("html.parser", repeat=1).run()
+        self.assertEqual(list(results), ["oryx_generated.html"])
+        timings = results["oryx_generated.html"]
+        self.assertEqual(list(timings), list(tags.APPROACHES))
+        self.assertTrue(all(value > 0 for value in timings.values()))
+        self.assertIn("single_walk", tags.format_tag_results(results))
+
+
+if __name__ == "__main__":
+    main()
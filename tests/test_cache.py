@@ -0,0 +1,133 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from argparse import Namespace
+from pathlib import Path
+import os
+import shutil
+import tempfile
+
+from src import cache
+from src import runner
+from src.util import LossRow
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+ROWS = [
+    LossRow(1, "Tanks", "2", "T-72", 2, None, "(1, destroyed)", "p1"),
+    LossRow(1, "Tanks", "2", "T-72", 2, "a b", "(2, damaged)", "p2"),
+]
+
+
+class TestParseCache(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.cache_dir = self.tmp_dir / "cache"
+        self.test_cache = cache.ParseCache(self.cache_dir)
+        self.html_file = self.tmp_dir / "page.html"
+        shutil.copy(FIXTURE, self.html_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_key(self):
+        key = cache.ParseCache.key(self.html_file, "limit", "a")
+        # Case 1: same file and cutoff -> same key
+        self.assertEqual(key, cache.ParseCache.key(self.html_file, "limit", "a"))
+
+        # Case 2: other cutoff
+        self.assertNotEqual(key, cache.ParseCache.key(self.html_file, "limit", None))
+        self.assertNotEqual(key, cache.ParseCache.key(self.html_file, "other", "a"))
+
+        # Case 3: other parser version
+        with patch("src.cache.PARSER_VERSION", -1):
+            self.assertNotEqual(key, cache.ParseCache.key(self.html_file, "limit", "a"))
+
+        # Case 4: other parser backend or parallel parsing, "auto" as the backend it resolves to
+        self.assertNotEqual(
+            key, cache.ParseCache.key(self.html_file, "limit", "a", "html5lib")
+        )
+        self.assertNotEqual(
+            key, cache.ParseCache.key(self.html_file, "limit", "a", parallel=True)
+        )
+        with patch("src.cache.resolve_backend", return_value="html.parser"):
+            self.assertEqual(
+                key, cache.ParseCache.key(self.html_file, "limit", "a", "auto")
+            )
+
+        # Case 5: changed content
+        with open(self.html_file, "a") as file:
+            file.write("<p>new</p>")
+        self.assertNotEqual(key, cache.ParseCache.key(self.html_file, "limit", "a"))
+
+    def test_get_put(self):
+        # Case 1: miss, no directory yet
+        self.assertIsNone(self.test_cache.get("key"))
+
+        # Case 2: hit
+        self.test_cache.put("key", ROWS)
+        self.assertEqual(self.test_cache.get("key"), ROWS)
+        self.assertIsInstance(self.test_cache.get("key")[0], LossRow)
+        self.assertEqual(list(self.cache_dir.glob("*.tmp")), [])
+
+        # Case 3: unreadable entry is removed
+        (self.cache_dir / "broken.pickle").write_bytes(b"not a pickle")
+        with self.assertLogs("src.cache", "WARNING"):
+            self.assertIsNone(self.test_cache.get("broken"))
+        self.assertFalse((self.cache_dir / "broken.pickle").exists())
+
+    def test_evict(self):
+        self.test_cache.put("old", ROWS)
+        self.test_cache.put("used", ROWS)
+        entry_size = (self.cache_dir / "old.pickle").stat().st_size
+        for number, key in enumerate(["old", "used"]):
+            os.utime(self.cache_dir / f"{key}.pickle", ns=(number, number))
+        # reading refreshes the entry, so the other one is the least recently used
+        self.test_cache.get("old")
+
+        self.test_cache.max_bytes = 2 * entry_size
+        self.test_cache.put("new", ROWS)
+        self.assertEqual(
+            sorted(path.stem for path in self.cache_dir.glob("*.pickle")),
+            ["new", "old"],
+        )
+
+    def test_resolve_cache_dir(self):
+        args = Namespace(cache_dir=None)
+        self.assertIsNone(cache.resolve_cache_dir(args))
+        args.cache_dir = "dir"
+        self.assertEqual(cache.resolve_cache_dir(args), Path("dir"))
+
+    def test_parse_file_cached(self):
+        limit = runner.UKR_LOSSES_CUTOFF
+        expected = list(runner.parse_file(self.html_file, *limit))
+
+        # Case 1: miss -> parsed and stored
+        rows = runner.parse_file(self.html_file, *limit, cache_dir=self.cache_dir)
+        self.assertEqual(rows, expected)
+        self.assertEqual(len(list(self.cache_dir.glob("*.pickle"))), 1)
+
+        # Case 2: hit -> no html parsing
+        with patch("src.runner.util.HTMLFileContent") as content_mock:
+            rows = runner.parse_file(self.html_file, *limit, cache_dir=self.cache_dir)
+        self.assertEqual(rows, expected)
+        content_mock.assert_not_called()
+
+        # Case 3: other backend -> parsed again
+        runner.parse_file(
+            self.html_file, *limit, backend="html5lib", cache_dir=self.cache_dir
+        )
+        self.assertEqual(len(list(self.cache_dir.glob("*.pickle"))), 2)
+
+        # Case 4: streaming and pretruncate stop at the cutoff, not cached
+        for settings in ({"stream": True}, {"pretruncate": True}):
+            with patch("src.runner.cache.ParseCache") as cache_mock:
+                rows = runner.parse_file(
+                    self.html_file, *limit, cache_dir=self.cache_dir, **settings
+                )
+                self.assertEqual(list(rows), expected)
+            cache_mock.assert_not_called()
+
+
+if __name__ == "__main__":
+    main()
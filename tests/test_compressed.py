@@ -0,0 +1,127 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from pathlib import Path
+import bz2
+import gzip
+import lzma
+import shutil
+import sys
+import tempfile
+
+from src import compressed
+from src import cutoff
+from src import runner
+from src import util
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+COMPRESSORS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+
+class TestCompressed(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.content = FIXTURE.read_bytes()
+        self.files = {}
+        for name, compress in COMPRESSORS.items():
+            # name suffix left out, the format is told by the magic bytes
+            self.files[name] = self.tmp_dir / f"page_{name}.html"
+            self.files[name].write_bytes(compress(self.content))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_detect_compression(self):
+        for name, file in self.files.items():
+            self.assertEqual(compressed.detect_compression(file), name)
+        self.assertIsNone(compressed.detect_compression(FIXTURE))
+        empty_file = self.tmp_dir / "empty.html"
+        empty_file.write_bytes(b"")
+        self.assertIsNone(compressed.detect_compression(empty_file))
+
+    def test_open_text(self):
+        with open(FIXTURE) as file:
+            expected = file.read()
+        for name, file in [*self.files.items(), ("none", FIXTURE)]:
+            with self.subTest(name):
+                with compressed.open_text(file) as text_file:
+                    self.assertEqual(text_file.read(), expected)
+
+    def test_open_stream(self):
+        for name, file in [*self.files.items(), ("none", FIXTURE)]:
+            with self.subTest(name):
+                # a raw stream without peek is buffered first
+                with open(file, "rb", buffering=0) as raw_file:
+                    self.assertEqual(
+                        compressed.open_stream(raw_file).read(), self.content
+                    )
+
+    def test_open_zstd_not_installed(self):
+        zstd_file = self.tmp_dir / "page.html.zst"
+        zstd_file.write_bytes(b"\x28\xb5\x2f\xfd" + bytes(10))
+        with patch.dict(sys.modules, {"zstandard": None}):
+            with self.assertRaisesRegex(Exception, "install zstandard"):
+                compressed.open_binary(zstd_file)
+
+    def test_read_until_cutoff(self):
+        marker = runner.UKR_LOSSES_CUTOFF[0].encode()
+        expected = self.content[: cutoff.find_cutoff_bytes(self.content, marker, "a")]
+
+        # Case 1: same prefix as in the uncompressed bytes
+        with compressed.open_binary(self.files["gzip"]) as binary_file:
+            prefix = compressed.read_until_cutoff(binary_file, marker, "a", 64)
+        self.assertEqual(prefix, expected)
+
+        # Case 2: decompression stops at the chunk with the cutoff,
+        # trailing bytes that are not gzip would fail reading past it
+        broken_file = self.tmp_dir / "broken.html.gz"
+        broken_file.write_bytes(gzip.compress(self.content) + b"not gzip" * 100)
+        with compressed.open_binary(broken_file) as binary_file:
+            with self.assertRaises(gzip.BadGzipFile):
+                binary_file.read()
+        with compressed.open_binary(broken_file) as binary_file:
+            prefix = compressed.read_until_cutoff(binary_file, marker, "a", 64)
+        self.assertEqual(prefix, expected)
+
+        # Case 3: cutoff not found or without tag name
+        with compressed.open_binary(self.files["bz2"]) as binary_file:
+            self.assertIsNone(
+                compressed.read_until_cutoff(binary_file, b"nowhere", "a")
+            )
+            self.assertIsNone(compressed.read_until_cutoff(binary_file, marker))
+
+    def test_snapshot_stem(self):
+        self.assertEqual(
+            compressed.snapshot_stem("2025-04-21_page.html"), "2025-04-21_page"
+        )
+        self.assertEqual(
+            compressed.snapshot_stem("dir/2025-04-21_page.html.zst"), "2025-04-21_page"
+        )
+        self.assertEqual(compressed.snapshot_stem("page.tar"), "page")
+
+    def test_parse_file(self):
+        limit = runner.UKR_LOSSES_CUTOFF
+        expected = list(runner.parse_file(FIXTURE, *limit))
+        file = self.files["gzip"]
+        # Case 1: tree
+        self.assertEqual(list(runner.parse_file(file, *limit)), expected)
+        # Case 2: stream
+        self.assertEqual(list(runner.parse_file(file, *limit, stream=True)), expected)
+        # Case 3: pretruncated, also with workers
+        self.assertEqual(
+            list(runner.parse_file(file, *limit, pretruncate=True)), expected
+        )
+        self.assertEqual(list(runner.parse_file(file, *limit, workers=1)), expected)
+
+    def test_load_truncated(self):
+        limit = runner.UKR_LOSSES_CUTOFF
+        expected = util.HTMLFileContent(FIXTURE).load_truncated(*limit)
+        with patch("src.util.HTMLFileContent.load") as load_mock:
+            result = util.HTMLFileContent(self.files["xz"]).load_truncated(*limit)
+        load_mock.assert_not_called()
+        self.assertEqual(result(), expected())
+        self.assertEqual(str(result.soup), str(expected.soup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
+
+from src import cutoff
+from src.backends import available_backends
+
+
+HTML = (
+    "<html><head><script>var link = '<a>stop here</a>';</script></head>\n"
+    "<body><!-- <a>stop here</a> -->\n"
+    "<p>intro <b>stop</b> here</p>\n"
+    "<ul><li><a href='x'>first</a></li>\n"
+    "  <li>text <a href='y'>stop <i>here</i></a> after</li></ul>\n"
+    "<p>gone</p></body></html>"
+)
+
+
+class TestFindCutoffTag(TestCase):
+
+    def test_find_cutoff_tag(self):
+        soup = BeautifulSoup(HTML, "html.parser")
+
+        # Case 1: marker spread over several text nodes of the tag
+        tag = cutoff.find_cutoff_tag(soup, "stop here", "a")
+        self.assertEqual(tag.get("href"), "y")
+
+        # Case 2: same tag as the first of find_all with the marker in get_text
+        for tag_name in ["p", "li", "body", None]:
+            expected = next(
+                tag for tag in soup.find_all(tag_name) if "stop here" in tag.get_text()
+            )
+            self.assertIs(cutoff.find_cutoff_tag(soup, "stop here", tag_name), expected)
+
+        # Case 3: match spanning the text nodes of two search chunks
+        with patch.object(cutoff, "CHUNK_NODES", 2):
+            tag = cutoff.find_cutoff_tag(soup, "stop here", "a")
+        self.assertEqual(tag.get("href"), "y")
+
+        # Case 4: string not found, or not inside a tag of that name -> Exception
+        with self.assertRaises(Exception):
+            cutoff.find_cutoff_tag(soup, "not in the page", "a")
+        with self.assertRaises(Exception):
+            cutoff.find_cutoff_tag(soup, "intro", "a")
+
+    @patch("bs4.element.Tag.get_text")
+    def test_single_pass(self, get_text_mock):
+        soup = BeautifulSoup(HTML, "html.parser")
+        cutoff.find_cutoff_tag(soup, "stop here", "a")
+        get_text_mock.assert_not_called()
+
+
+class TestFindCutoffPos(TestCase):
+
+    def test_find_cutoff_pos(self):
+        expected = HTML.index("<a href='y'>")
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                soup = BeautifulSoup(HTML, backend)
+                position = cutoff.find_cutoff_pos(soup, HTML, "stop here", "a")
+                self.assertEqual(position, expected)
+
+    def test_without_source_positions(self):
+        # lxml keeps no positions: start tags counted, skipping scripts and comments
+        soup = BeautifulSoup(HTML, "html.parser")
+        for tag in soup.find_all():
+            tag.sourceline, tag.sourcepos = None, None
+        position = cutoff.find_cutoff_pos(soup, HTML, "stop here", "a")
+        self.assertEqual(position, HTML.index("<a href='y'>"))
+
+
+class TestFindCutoffBytes(TestCase):
+
+    def test_find_cutoff_bytes(self):
+        data = (
+            "<html><head><title>stop here</title><meta content='stop here'>"
+            "<script>var a = '<a>stop here';</script></head><body>"
+            "<!-- <a>stop here</a> --><abbr>stop here</abbr><a href='x'>first</a>"
+            "<p><a href='y'><b>stop here</b></a></p><a>stop here</a></body></html>"
+        ).encode()
+        expected = data.index(b"<a href='y'>")
+
+        # Case 1: title, attribute, script, comment and other tags skipped
+        self.assertEqual(cutoff.find_cutoff_bytes(data, b"stop here", "a"), expected)
+        self.assertEqual(
+            cutoff.find_cutoff_bytes(data.upper(), b"STOP HERE", "a"), expected
+        )
+
+        # Case 2: ambiguous -> None
+        self.assertIsNone(cutoff.find_cutoff_bytes(data, b"stop here"))
+        self.assertIsNone(cutoff.find_cutoff_bytes(data, b"not in the page", "a"))
+        self.assertIsNone(cutoff.find_cutoff_bytes(data, b"first", "p"))
+
+        # Case 3: earlier marker split by an entity or an inline tag -> None
+        for split in ("stop&#32;here", "stop<i> here</i>", "sto<b>p</b> here"):
+            split_data = data.replace(
+                b"<a href='x'>first</a>", f"<a href='x'>{split}</a>".encode()
+            )
+            self.assertIsNone(cutoff.find_cutoff_bytes(split_data, b"stop here", "a"))
+
+
+if __name__ == "__main__":
+    main()
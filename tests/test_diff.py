@@ -0,0 +1,117 @@
+from unittest import TestCase, main
+from pathlib import Path
+import csv
+import shutil
+import tempfile
+
+from src import diff
+
+
+COLUMNS = ["", "category_counter", "category_name", "type_name", "loss_item", "loss_proof"]
+
+
+class TestSnapshotDiff(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.old_file = self.tmp_dir / "old.csv"
+        self.new_file = self.tmp_dir / "new.csv"
+        self._write(
+            self.old_file,
+            [
+                ["0", "1", "Tanks", "T-64BV", "(1, destroyed)", "p1"],
+                ["1", "1", "Tanks", "T-64BV", "(2, damaged)", "p2"],
+                ["2", "1", "Tanks", "T-64BV", "(3, captured)", "p3"],
+                ["3", "1", "Tanks", "T-72", "(1, destroyed)", "p4"],
+                ["4", "1", "Tanks", "T-72", "(2, destroyed)", "p4"],
+            ],
+        )
+        self._write(
+            self.new_file,
+            [
+                ["0", "1", "Aircraft", "Su-25", "(1, destroyed)", "p9"],
+                ["1", "2", "Tanks", "T-64BV", "(1, destroyed)", "p1"],
+                ["2", "2", "Tanks", "T-64BV", "(2, damaged and captured)", "p2"],
+                ["3", "2", "Tanks", "T-72", "(1, destroyed)", "p4"],
+                ["4", "2", "Tanks", "T-72", "(2, destroyed)", "p4"],
+                ["5", "2", "Tanks", "T-72", "(3, destroyed)", "p4"],
+            ],
+        )
+        self.test_diff = diff.SnapshotDiff(self.old_file, self.new_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def _write(file, rows, columns=COLUMNS):
+        with open(file, "w", newline="") as csv_file:
+            csv.writer(csv_file).writerows([columns] + rows)
+
+    def test_iter_changes(self):
+        changes = list(self.test_diff.iter_changes())
+        self.assertEqual(
+            [(change["change"], change["type_name"], change["loss_item"]) for change in changes],
+            [
+                ("added", "Su-25", "(1, destroyed)"),
+                ("changed", "T-64BV", "(2, damaged and captured)"),
+                ("added", "T-72", "(3, destroyed)"),
+                ("removed", "T-64BV", "(3, captured)"),
+            ],
+        )
+        self.assertEqual(changes[1]["previous_loss_item"], "(2, damaged)")
+        self.assertEqual(changes[1]["previous_category_name"], "Tanks")
+        self.assertEqual(changes[0]["previous_loss_item"], None)
+        self.assertNotIn("", changes[0])
+        self.assertEqual(self.test_diff.counts, {"added": 2, "removed": 1, "changed": 1})
+
+    def test_iter_changes_same_snapshot(self):
+        test_diff = diff.SnapshotDiff(self.old_file, self.old_file)
+        self.assertEqual(list(test_diff.iter_changes()), [])
+
+    def test_columns(self):
+        self.assertEqual(
+            self.test_diff.columns(),
+            ["change"] + COLUMNS[1:] + ["previous_category_name", "previous_loss_item"],
+        )
+
+    def test_to_csv(self):
+        output_file = self.tmp_dir / "diff.csv"
+        self.test_diff.to_csv(output_file)
+        with open(output_file, newline="") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([row["change"] for row in rows], ["added", "changed", "added", "removed"])
+
+    def test_to_csv_different_columns(self):
+        # Case 1: old rows with a column the new file does not have
+        self._write(
+            self.old_file,
+            [["0", "1", "Tanks", "T-64BV", "(3, captured)", "p3", "2025-04-21"]],
+            COLUMNS + ["snapshot_date"],
+        )
+        output_file = self.tmp_dir / "diff.csv"
+        self.test_diff.to_csv(output_file)
+        with open(output_file, newline="") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows[-1]["change"], "removed")
+        self.assertEqual(rows[-1]["snapshot_date"], "2025-04-21")
+        self.assertEqual(rows[0]["snapshot_date"], "")
+
+        # Case 2: a failing diff leaves neither output nor temp file
+        self._write(self.new_file, [["0", "1", "Tanks"]], ["", "category_counter", "x"])
+        with self.assertRaises(KeyError):
+            diff.SnapshotDiff(self.old_file, self.new_file).to_csv(
+                self.tmp_dir / "failed.csv"
+            )
+        self.assertEqual(
+            sorted(file.name for file in self.tmp_dir.iterdir()),
+            ["diff.csv", "new.csv", "old.csv"],
+        )
+
+    def test__read_lines(self):
+        rows = list(diff.SnapshotDiff._read_lines(self.old_file, [1, 3]))
+        self.assertEqual([row["loss_proof"] for row in rows], ["p2", "p4"])
+        self.assertEqual(list(diff.SnapshotDiff._read_lines(self.old_file, [])), [])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+from unittest import TestCase, main, skipUnless
+from pathlib import Path
+import shutil
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from src import enrich
+from src import runner
+from src import util
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+SUMMARY = "7, of which destroyed: 4, damaged: 1, captured: 2"
+
+
+class TestEnrichLosses(TestCase):
+
+    def test_enrich_losses(self):
+        frame = pd.DataFrame(
+            {
+                "category_summary": [
+                    SUMMARY,
+                    SUMMARY,
+                    "3, of which abandoned: 3",
+                    None,
+                ],
+                "loss_item": [
+                    "(1, destroyed)",
+                    "(12, captured and later destroyed)",
+                    "(1 and 2, damagedand abandoned)",
+                    None,
+                ],
+            },
+            index=[5, 6, 7, 8],
+        )
+        enriched = enrich.enrich_losses(frame)
+        self.assertEqual(list(enriched.columns), [*frame, *enrich.ENRICHED_COLUMNS])
+        self.assertEqual(list(enriched.index), [5, 6, 7, 8])
+
+        # Case 1: ordinal, the first one of several
+        self.assertEqual(enriched["loss_ordinal"].dtype, "Int64")
+        self.assertEqual(enriched["loss_ordinal"].tolist()[:3], [1, 12, 1])
+
+        # Case 2: status flags, also of merged broken entries
+        self.assertEqual(enriched["loss_destroyed"].dtype, "boolean")
+        self.assertEqual(enriched["loss_destroyed"].tolist()[:3], [True, True, False])
+        self.assertEqual(enriched["loss_captured"].tolist()[:3], [False, True, False])
+        self.assertEqual(enriched["loss_damaged"].tolist()[:3], [False, False, True])
+        self.assertEqual(enriched["loss_abandoned"].tolist()[:3], [False, False, True])
+
+        # Case 3: category counts, 0 for statuses not listed
+        self.assertEqual(enriched["category_total"].tolist()[:3], [7, 7, 3])
+        self.assertEqual(enriched["category_destroyed"].tolist()[:3], [4, 4, 0])
+        self.assertEqual(enriched["category_captured"].tolist()[:3], [2, 2, 0])
+        self.assertEqual(enriched["category_abandoned"].tolist()[:3], [0, 0, 3])
+        self.assertEqual(enriched["category_damaged"].dtype, "Int64")
+
+        # Case 4: missing texts give missing values
+        self.assertTrue(enriched.loc[8, list(enrich.ENRICHED_COLUMNS)].isna().all())
+
+    def test_enrich_losses_empty(self):
+        enriched = enrich.enrich_losses(pd.DataFrame([]))
+        self.assertEqual(list(enriched.columns), list(enrich.ENRICHED_COLUMNS))
+        self.assertEqual(len(enriched), 0)
+
+
+class TestParsedContentEnrich(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.rows = list(runner.parse_file(FIXTURE, *runner.UKR_LOSSES_CUTOFF))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_enrich(self):
+        output = util.ParsedContent(iter(self.rows)).load().enrich()
+        frame = output.to_dataframe()
+        self.assertEqual(len(frame), len(self.rows))
+        self.assertTrue(frame["loss_ordinal"].notna().all())
+        self.assertTrue(
+            frame[[f"loss_{status}" for status in enrich.STATUSES]].any(axis=1).all()
+        )
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_enrich_parquet(self):
+        output_file = self.tmp_dir / "out.parquet"
+        util.ParsedContent(self.rows).load().enrich().write(output_file)
+        frame = pd.read_parquet(output_file)
+        self.assertEqual(frame["loss_captured"].dtype, "boolean")
+        self.assertEqual(frame["category_total"].dtype, "Int64")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from unittest import TestCase, main
+from pathlib import Path
+
+from src import extractors
+from src import loss_parser
+from src import runner
+from src.util import HTMLFileContent
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+
+
+class RecordingExtractor(extractors.Extractor):
+    """Records the name of every handled tag into a shared list"""
+
+    def __init__(self, label: str, tags: tuple, seen: list):
+        self.label = label
+        self.tags = tags
+        self.seen = seen
+
+    def handle(self, tag):
+        self.seen.append((self.label, tag.name))
+        return (tag.name,)
+
+    def finish(self):
+        return ("end",)
+
+
+class TestExtractorRegistry(TestCase):
+
+    def setUp(self):
+        self.content = HTMLFileContent(FIXTURE, "html.parser").load()
+        self.content.truncate_soup(*runner.UKR_LOSSES_CUTOFF)
+
+    def test_register(self):
+        registry = extractors.ExtractorRegistry()
+        registry.register("losses", extractors.LossExtractor)
+        self.assertEqual(registry.names, ("losses",))
+        with self.assertRaises(Exception):
+            registry.register("losses", extractors.CategoryTotalsExtractor)
+
+    def test_single_walk(self):
+        seen = []
+        registry = extractors.ExtractorRegistry()
+        registry.register(
+            "first", lambda: RecordingExtractor("first", ("h3", "li"), seen)
+        )
+        registry.register("second", lambda: RecordingExtractor("second", ("h3",), seen))
+        html = "<h3>A</h3><ul><li>a</li></ul><h3>B</h3><p>b</p>"
+        results = registry.extract(html, backend="html.parser")
+
+        # Case 1: tags handed over in document order, to each extractor of the tag
+        self.assertEqual(
+            seen,
+            [
+                ("first", "h3"),
+                ("second", "h3"),
+                ("first", "li"),
+                ("first", "h3"),
+                ("second", "h3"),
+            ],
+        )
+        self.assertEqual(results["first"], ["h3", "li", "h3", "end"])
+        self.assertEqual(results["second"], ["h3", "h3", "end"])
+
+        # Case 2: only the selected extractors
+        seen.clear()
+        results = registry.extract(html, ["second"], backend="html.parser")
+        self.assertEqual(list(results), ["second"])
+        self.assertEqual(seen, [("second", "h3"), ("second", "h3")])
+
+        # Case 3: unknown name
+        with self.assertRaises(Exception):
+            registry.extract(html, ["pledges"])
+
+    def test_losses_as_parse_losses(self):
+        results = runner.EXTRACTORS.extract(self.content.soup, ["losses"])
+        expected = loss_parser.OryxLossParser().parse_losses(self.content.soup)
+        self.assertEqual(len(results["losses"]), 12)
+        self.assertEqual(results["losses"], expected)
+
+    def test_category_totals(self):
+        results = runner.EXTRACTORS.extract(
+            self.content.soup, ["losses", "category_totals"]
+        )
+        self.assertEqual(len(results["losses"]), 12)
+        self.assertEqual(
+            results["category_totals"],
+            [
+                extractors.CategoryTotal(
+                    1,
+                    "Tanks",
+                    "7, of which destroyed: 4, damaged: 1, captured: 2",
+                    7,
+                    destroyed=4,
+                    damaged=1,
+                    abandoned=0,
+                    captured=2,
+                ),
+                extractors.CategoryTotal(
+                    2,
+                    "Armoured Fighting Vehicles",
+                    "5, of which destroyed: 2, damaged: 1, abandoned: 1, captured: 1",
+                    5,
+                    destroyed=2,
+                    damaged=1,
+                    abandoned=1,
+                    captured=1,
+                ),
+            ],
+        )
+        # the category counters agree with the loss rows
+        counters = {
+            row.category_name: row.category_counter for row in results["losses"]
+        }
+        for total in results["category_totals"]:
+            self.assertEqual(counters[total.category_name], total.category_counter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from pathlib import Path
+import json
+import shutil
+import tempfile
+
+from src import incremental
+from src import loss_parser
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+LIMIT = (
+    "Attack On Europe: Documenting Ukrainian Equipment"
+    " Losses During The Russian Invasion Of Ukraine"
+)
+
+
+class TestIncrementalLossParser(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.cache_file = self.tmp_dir / "cache.json"
+        self.html = loss_parser.OryxLossParser().truncate_content(
+            FIXTURE.read_text(), LIMIT, "a"
+        )
+        self.expected = loss_parser.OryxLossParser().parse_losses(self.html)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_init(self):
+        test_parser = incremental.IncrementalLossParser(self.cache_file)
+        self.assertEqual(test_parser.cache_file, self.cache_file)
+        self.assertIsInstance(test_parser.loss_parser, loss_parser.OryxLossParser)
+
+    def test_parse_losses_same_as_full_parse(self):
+        # Case 1: no cache yet -> every section parsed
+        test_parser = incremental.IncrementalLossParser(self.cache_file)
+        self.assertEqual(test_parser.parse_losses(self.html), self.expected)
+        self.assertEqual((test_parser.reused, test_parser.parsed), (0, 2))
+        self.assertEqual(test_parser.counters["rows"], len(self.expected))
+        self.assertEqual(test_parser.counters["categories"], 2)
+        self.assertTrue(self.cache_file.exists())
+
+        # Case 2: unchanged page -> every section reused
+        test_parser = incremental.IncrementalLossParser(self.cache_file)
+        with patch.object(test_parser.loss_parser, "parse_losses") as parse_mock:
+            self.assertEqual(test_parser.parse_losses(self.html), self.expected)
+            parse_mock.assert_not_called()
+        self.assertEqual((test_parser.reused, test_parser.parsed), (2, 0))
+        # rows of the reused sections are still counted
+        self.assertEqual(test_parser.counters, {"rows": len(self.expected)})
+
+    def test_parse_losses_changed_section(self):
+        incremental.IncrementalLossParser(self.cache_file).parse_losses(self.html)
+        new_loss = '(2, damaged)</a> <a href="https://new.jpg">(3, destroyed)</a>'
+        changed = self.html.replace("(2, damaged)</a>", new_loss)
+
+        test_parser = incremental.IncrementalLossParser(self.cache_file)
+        rows = test_parser.parse_losses(changed)
+        self.assertEqual(rows, loss_parser.OryxLossParser().parse_losses(changed))
+        self.assertEqual(len(rows), len(self.expected) + 1)
+        self.assertEqual((test_parser.reused, test_parser.parsed), (1, 1))
+
+    def test_parse_losses_new_category_shifts_counter(self):
+        incremental.IncrementalLossParser(self.cache_file).parse_losses(self.html)
+        first_category = self.html.index("<h3><span class=\"mw-headline\" id=")
+        new_category = (
+            "<h3>Aircraft (1, of which destroyed: 1)</h3>"
+            "<ul><li>1 Su-25: <a href='p'>(1, destroyed)</a></li></ul>"
+        )
+        changed = self.html[:first_category] + new_category + self.html[first_category:]
+
+        test_parser = incremental.IncrementalLossParser(self.cache_file)
+        rows = test_parser.parse_losses(changed)
+        self.assertEqual(rows, loss_parser.OryxLossParser().parse_losses(changed))
+        self.assertEqual(rows[-1].category_counter, 3)
+
+    def test__fingerprint(self):
+        fingerprint = incremental.IncrementalLossParser._fingerprint
+        self.assertEqual(fingerprint("<h3>a</h3>", None), fingerprint("<h3>a</h3>", None))
+        self.assertNotEqual(fingerprint("<h3>a</h3>", None), fingerprint("<h3>b</h3>", None))
+        self.assertNotEqual(fingerprint("<h3>a</h3>", None), fingerprint("<h3>a</h3>", "(1"))
+
+    def test__load_cache(self):
+        test_parser = incremental.IncrementalLossParser(self.cache_file)
+
+        # Case 1: no cache file
+        self.assertEqual(test_parser._load_cache(), {})
+
+        # Case 2: broken cache file
+        self.cache_file.write_text("{not json")
+        self.assertEqual(test_parser._load_cache(), {})
+
+        # Case 3: other cache version
+        self.cache_file.write_text(json.dumps({"version": 0, "sections": {"a": 1}}))
+        self.assertEqual(test_parser._load_cache(), {})
+
+        # Case 4: valid cache
+        test_parser._save_cache({"a": {"rows": [], "buffer": None}})
+        self.assertEqual(test_parser._load_cache(), {"a": {"rows": [], "buffer": None}})
+        self.assertEqual(list(self.tmp_dir.iterdir()), [self.cache_file])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,221 @@
 from unittest import TestCase, main
 from unittest.mock import MagicMock, patch, call
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator
+import json
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
 from src import loss_parser
+from src.util import LossRow
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
 
 
 class TestOrxyLossParser(TestCase):
 
     def setUp(self):
         self.testparser = loss_parser.OryxLossParser()
+        self.context = loss_parser.ParseContext()
 
     def test_default_init(self):
         test_oryxparser = loss_parser.OryxLossParser()
-
-        self.assertEqual(test_oryxparser.category_counter, 0)
-        self.assertEqual(test_oryxparser.category_name, None)
-        self.assertEqual(test_oryxparser.category_summary, None)
-        self.assertEqual(test_oryxparser.type_name, None)
-        self.assertEqual(test_oryxparser.type_ttl_count, 0)
-        self.assertEqual(test_oryxparser.type_img_links, None)
-        self.assertEqual(test_oryxparser.errors, [])
+        self.assertEqual(test_oryxparser.backend, "html.parser")
+
+    def test_default_context(self):
+        context = loss_parser.ParseContext()
+
+        self.assertEqual(context.category_counter, 0)
+        self.assertEqual(context.category_name, None)
+        self.assertEqual(context.category_summary, None)
+        self.assertEqual(context.type_name, None)
+        self.assertEqual(context.type_ttl_count, 0)
+        self.assertEqual(context.type_img_links, None)
+        self.assertEqual(context.errors, [])
+        self.assertEqual(context.buffer, None)
+
+        context = loss_parser.ParseContext(3, "(1, dam")
+        self.assertEqual(context.category_counter, 3)
+        self.assertEqual(context.buffer, "(1, dam")
+
+    @patch("src.loss_parser.resolve_backend")
+    def test_init_backend(self, resolve_mock):
+        resolve_mock.return_value = "lxml"
+        test_oryxparser = loss_parser.OryxLossParser("auto")
+        resolve_mock.assert_called_with("auto")
+        self.assertEqual(test_oryxparser.backend, "lxml")
 
     @patch("src.loss_parser.BeautifulSoup")
-    @patch("src.loss_parser.OryxLossParser._parse_tag_data")
+    @patch("src.loss_parser.OryxLossParser.parse_tag_data")
     def test_parse_losses(self, mock_parse_tagdata, mock_bs):
         bs_instance = MagicMock()
         mock_bs.return_value = bs_instance
-        fake_tags = ["tag1", "tag2", "tag3"]
-        bs_instance.find_all.return_value = fake_tags
+        fake_tags = [MagicMock(name=f"tag{i}") for i in range(3)]
+        for tag, name in zip(fake_tags, ["h3", "li", "h2"]):
+            tag.name = name
+        other = MagicMock()
+        other.name = "p"
+        bs_instance.descendants = [fake_tags[0], other, *fake_tags[1:]]
+        mock_parse_tagdata.side_effect = lambda tag, context: iter([tag.name])
         fake_content = "Some html content"
-        exected_findall_call = ["h3", "h2", "li"]
-        expected_calls = [
-            call(fake_tags[0], []),
-            call(fake_tags[1], []),
-            call(fake_tags[2], []),
-        ]
-
-        # Case 1: Normal, tags returned
-        result = self.testparser.parse_losses(fake_content)
-        self.assertEqual(result, [])  # mocking parse_tag_data -> list won't update
+        # Case 1: Normal, rows of the category/type/loss tags returned
+        result = self.testparser.parse_losses(fake_content, self.context)
+        self.assertEqual(result, ["h3", "li", "h2"])
         mock_bs.assert_called_with(fake_content, "html.parser")
-        bs_instance.find_all.assert_called_with(exected_findall_call)
-        mock_parse_tagdata.assert_has_calls(expected_calls)
+        mock_parse_tagdata.assert_has_calls(
+            [call(tag, self.context) for tag in fake_tags]
+        )
 
         mock_parse_tagdata.reset_mock()
         mock_bs.reset_mock()
-        bs_instance.reset_mock()
 
         # Case 2: no tags found
-        bs_instance.find_all.return_value = []
+        bs_instance.descendants = [other]
         result = self.testparser.parse_losses(fake_content)
-        self.assertEqual(result, [])  # mocking parse_tag_data -> list won't update
+        self.assertEqual(result, [])
         mock_bs.assert_called_with(fake_content, "html.parser")
-        bs_instance.find_all.assert_called_with(exected_findall_call)
         mock_parse_tagdata.assert_not_called()
 
+        # Case 3: new context per call when not given
+        bs_instance.descendants = fake_tags[:1]
+        self.testparser.parse_losses(fake_content)
+        self.testparser.parse_losses(fake_content)
+        first, second = [c.args[1] for c in mock_parse_tagdata.call_args_list]
+        self.assertIsInstance(first, loss_parser.ParseContext)
+        self.assertIsNot(first, second)
+
+    def test_parse_losses_no_shared_state(self):
+        broken = (
+            "<h3>Tanks (1, of which destroyed: 1)</h3>"
+            "<ul><li>1 T-72: <a href='x'>(1, damaged</a></li></ul>"
+        )
+        complete = (
+            "<h3>IFV (1, of which destroyed: 1)</h3>"
+            "<ul><li>1 BMP-1: <a href='y'>(1, destroyed)</a></li></ul>"
+        )
+        self.assertEqual(self.testparser.parse_losses(broken), [])
+        rows = self.testparser.parse_losses(complete)
+        self.assertEqual(
+            [(row.category_counter, row.loss_item) for row in rows],
+            [(1, "(1, destroyed)")],
+        )
+
+    def test_parse_losses_shared_across_threads(self):
+        html = (FIXTURES / "oryx_losses.html").read_text()
+        html = self.testparser.truncate_content(
+            html, "Attack On Europe: Documenting Ukrainian Equipment", "a"
+        )
+        expected = [
+            LossRow(**row)
+            for row in json.loads((FIXTURES / "oryx_losses_expected.json").read_text())
+        ]
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(self.testparser.parse_losses, [html] * 8))
+        self.assertEqual(results, [expected] * 8)
+
+    @patch("src.loss_parser.BeautifulSoup")
+    @patch("src.loss_parser.OryxLossParser.parse_tag_data")
+    def test_parse_losses_parsed_tree(self, mock_parse_tagdata, mock_bs):
+        soup = MagicMock(spec=Tag)
+        fake_tags = [MagicMock(), MagicMock()]
+        for tag in fake_tags:
+            tag.name = "li"
+        soup.descendants = fake_tags
+        mock_parse_tagdata.return_value = iter([])
+
+        # Already parsed tree is used as is, no new parse
+        result = self.testparser.parse_losses(soup, self.context)
+        self.assertEqual(result, [])
+        mock_bs.assert_not_called()
+        mock_parse_tagdata.assert_has_calls(
+            [call(fake_tags[0], self.context), call(fake_tags[1], self.context)]
+        )
+
+    def test_iter_losses(self):
+        html = (FIXTURES / "oryx_losses.html").read_text()
+        html = self.testparser.truncate_content(
+            html, "Attack On Europe: Documenting Ukrainian Equipment", "a"
+        )
+        expected = [
+            LossRow(**row)
+            for row in json.loads((FIXTURES / "oryx_losses_expected.json").read_text())
+        ]
+        # Case 1: same rows as parse_losses, as a generator
+        losses = self.testparser.iter_losses(html)
+        self.assertIsInstance(losses, Iterator)
+        self.assertEqual(list(losses), expected)
+
+        # Case 2: stopping early leaves the rest of the tree unvisited
+        soup = BeautifulSoup(html, "html.parser")
+        with patch.object(
+            self.testparser,
+            "parse_tag_data",
+            wraps=self.testparser.parse_tag_data,
+        ) as mock_parse_tagdata:
+            first = list(islice(self.testparser.iter_losses(soup), 2))
+        self.assertEqual(first, expected[:2])
+        self.assertLess(
+            mock_parse_tagdata.call_count, len(soup.find_all(["h3", "h2", "li"]))
+        )
+
+    def test_parse_losses_parallel(self):
+        html = (
+            "<p>intro</p>"
+            "<h3>Tanks (3, of which destroyed: 3)</h3><ul>"
+            "<li>2 T-72: <a href='a1'>(1, destroyed)</a> <a href='a2'>(2, damaged</a></li></ul>"
+            "<h3>IFV (2, of which destroyed: 2)</h3><ul>"
+            "<li>2 BMP-1: <a href='b1'> and abandoned)</a> <a href='b2'>(2, destroyed)</a></li>"
+            "</ul><h3>APC (1, of which destroyed: 1)</h3>"
+            "<ul><li>1 BTR-80: <a href='c1'>(1, destroyed)</a></li></ul>"
+        )
+        expected = self.testparser.parse_losses(html)
+        # broken loss text carried over into the next section
+        self.assertEqual(expected[1].loss_item, "(2, damagedand abandoned)")
+
+        result = self.testparser.parse_losses_parallel(html, workers=2)
+        self.assertEqual(result, expected)
+        self.assertEqual([row.category_counter for row in result], [1, 2, 2, 3])
+
+    def test__parse_shard(self):
+        section = (
+            "<h3>IFV (2, of which destroyed: 2)</h3>"
+            "<ul><li>2 BMP-1: <a href='b1'>(1, destroyed)</a> <a href='b2'>(2, dam</a></li></ul>"
+        )
+        rows, buffer, counters = self.testparser._parse_shard(section, 4)
+        self.assertEqual([row.category_counter for row in rows], [5])
+        self.assertEqual(buffer, "(2, dam")
+        self.assertEqual(counters["rows"], 1)
+        self.assertEqual(counters["skipped_entries"], 1)
+
+    def test_split_sections(self):
+        html = (
+            "<p>intro</p><h3>Notes</h3><H3 id='t'>Tanks (2, of which destroyed: 2)</H3>"
+            "<ul><li>a</li></ul><h3>Other (no category)</h3>"
+            "<h3>\n<span>IFV (1, of which damaged: 1)</span></h3><ul><li>b</li></ul>"
+        )
+        sections = self.testparser.split_sections(html)
+        self.assertEqual(
+            sections,
+            [
+                "<H3 id='t'>Tanks (2, of which destroyed: 2)</H3>"
+                "<ul><li>a</li></ul><h3>Other (no category)</h3>",
+                "<h3>\n<span>IFV (1, of which damaged: 1)</span></h3><ul><li>b</li></ul>",
+            ],
+        )
+        self.assertEqual(self.testparser.split_sections("<h3>no</h3>"), [])
+
     @patch("src.loss_parser.BeautifulSoup")
-    @patch("src.loss_parser.OryxLossParser._find_str_pos")
-    def test_truncate_content(self, find_str_mock, mock_bs):
+    @patch("src.loss_parser.cutoff.find_cutoff_pos")
+    def test_truncate_content(self, find_pos_mock, mock_bs):
         bs_instance = MagicMock()
         mock_bs.return_value = bs_instance
-        fake_tags = ["tag1", "tag2", "tag3"]
-        bs_instance.find_all.return_value = fake_tags
         fake_content = "Some html content"
-        bs_instance.__str__.return_value = fake_content
         exclude = "content"
-        mocked_pos_return = 10
-        find_str_mock.return_value = mocked_pos_return
+        find_pos_mock.return_value = 10
 
         # Case 1: tag name is provided
         truncated = self.testparser.truncate_content(
@@ -72,52 +223,13 @@ class TestOrxyLossParser(TestCase):
         )
         self.assertEqual(truncated, fake_content[:10])
         mock_bs.assert_called_with(fake_content, "html.parser")
-        bs_instance.find_all.assert_called_with("a")
-        find_str_mock.assert_called_with(fake_tags, exclude, fake_content)
-
-        find_str_mock.reset_mock()
-        mock_bs.reset_mock()
-        bs_instance.reset_mock()
+        find_pos_mock.assert_called_with(bs_instance, fake_content, exclude, "a")
+        bs_instance.__str__.assert_not_called()
 
         # Case 2: tag name NOT provided
         truncated_2 = self.testparser.truncate_content(fake_content, exclude)
         self.assertEqual(truncated_2, fake_content[:10])
-        mock_bs.assert_called_with(fake_content, "html.parser")
-        bs_instance.find_all.assert_called_with()
-        find_str_mock.assert_called_with(fake_tags, exclude, fake_content)
-
-    def test__find_str_pos(self):
-        tag1, tag2, tag3 = MagicMock(), MagicMock(), MagicMock()
-        tags = [tag1, tag2, tag3]
-        tag1.get_text.return_value = "not here"
-        tag2.get_text.return_value = "content here"
-        tag3.get_text.return_value = "not here"
-        tag2.__str__.return_value = "content"
-        content_str = "Some html content"
-        find_str = "content"
-
-        # Case 1: string found
-        result = self.testparser._find_str_pos(tags, find_str, content_str)
-        self.assertEqual(result, 10)
-        tag1.get_text.assert_called_once()
-        tag2.get_text.assert_called_once()
-        tag3.get_text.assert_not_called()
-        tag2.__str__.assert_called_once()
-
-        tag1.reset_mock()
-        tag2.reset_mock()
-        tag3.reset_mock()
-
-        # Case 2: string not found -> Exception
-        tag2.get_text.return_value = "not even here now"
-        with self.assertRaises(Exception) as e:
-            result = self.testparser._find_str_pos(tags, find_str, content_str)
-        tag1.get_text.assert_called_once()
-        tag2.get_text.assert_called_once()
-        tag3.get_text.assert_called_once()
-        tag1.__str__.assert_not_called()
-        tag2.__str__.assert_not_called()
-        tag3.__str__.assert_not_called()
+        find_pos_mock.assert_called_with(bs_instance, fake_content, exclude, None)
 
     @patch("src.loss_parser.OryxLossParser._update_category")
     def test_parse_category(self, update_cat_mock):
@@ -127,8 +239,8 @@ class TestOrxyLossParser(TestCase):
         mock_tag.name = "h3"
         found_category_name = "Some vehicle (123, of which: captured: 123)"
         mock_tag.get_text.return_value = "Some vehicle (123, of which: captured: 123)"
-        self.testparser._parse_category(mock_tag)
-        update_cat_mock.assert_called_with(mock_tag, found_category_name)
+        self.testparser._parse_category(mock_tag, self.context)
+        update_cat_mock.assert_called_with(found_category_name, self.context)
         mock_tag.get_text.assert_called_with()
 
         mock_tag.reset_mock()
@@ -137,7 +249,7 @@ class TestOrxyLossParser(TestCase):
         # Case 2: tag is h3 but NOT new category
         mock_tag.name = "h3"
         mock_tag.get_text.return_value = "Some other header is here"
-        self.testparser._parse_category(mock_tag)
+        self.testparser._parse_category(mock_tag, self.context)
         mock_tag.get_text.assert_called_with()
         update_cat_mock.assert_not_called()
 
@@ -147,7 +259,7 @@ class TestOrxyLossParser(TestCase):
         # Case 3: tag is h3 but NOT new category, but contains key text "of which"
         mock_tag.name = "h3"
         mock_tag.get_text.return_value = "Russia 12345, of which: destroyed 4321, etc"
-        self.testparser._parse_category(mock_tag)
+        self.testparser._parse_category(mock_tag, self.context)
         mock_tag.get_text.assert_called_with()
         update_cat_mock.assert_not_called()
 
@@ -157,7 +269,7 @@ class TestOrxyLossParser(TestCase):
         # Case 4: tag is h3 but NOT new category, but contains key text bracket "("
         mock_tag.name = "h3"
         mock_tag.get_text.return_value = "Some header here with (brackerts) in it..."
-        self.testparser._parse_category(mock_tag)
+        self.testparser._parse_category(mock_tag, self.context)
         mock_tag.get_text.assert_called_with()
         update_cat_mock.assert_not_called()
 
@@ -167,206 +279,162 @@ class TestOrxyLossParser(TestCase):
         # Case 5: tag is NOT h3
         mock_tag.name = "img"
         mock_tag.find.return_value = None
-        self.testparser._parse_category(mock_tag)
+        self.testparser._parse_category(mock_tag, self.context)
         mock_tag.find.assert_not_called()
         update_cat_mock.assert_not_called()
 
         mock_tag.reset_mock()
         update_cat_mock.reset_mock()
 
-    @patch("src.loss_parser.OryxLossParser._parse_category_summary")
-    @patch("src.loss_parser.OryxLossParser._parse_category_name")
+    @patch("src.loss_parser.OryxLossParser.parse_category_summary")
+    @patch("src.loss_parser.OryxLossParser.parse_category_name")
     def test__update_category(self, parse_cat_name_mock, parse_cat_summ_mock):
-        tag = "Some tag"
         new_cat = "IFV"
-        self.testparser.category_counter = 0
-        self.testparser.category_name = "Tanks"
+        self.context.category_counter = 0
+        self.context.category_name = "Tanks"
         summary_val = "Category summary values"
         parse_cat_summ_mock.return_value = summary_val
         parse_cat_name_mock.return_value = new_cat
 
-        self.testparser._update_category(tag, new_cat)
-        self.assertEqual(self.testparser.category_counter, 1)
-        self.assertEqual(self.testparser.category_name, new_cat)
-        self.assertEqual(self.testparser.category_summary, summary_val)
-        parse_cat_summ_mock.assert_called_with(tag)
+        self.testparser._update_category(new_cat, self.context)
+        self.assertEqual(self.context.category_counter, 1)
+        self.assertEqual(self.context.category_name, new_cat)
+        self.assertEqual(self.context.category_summary, summary_val)
+        parse_cat_summ_mock.assert_called_with(new_cat, new_cat)
 
-    def test__parse_category_summary(self):
-        tag = MagicMock()
+    def test_parse_category_summary(self):
         mock_text = "IFVs:(5 destroyed, 10 damaged)"
-        tag.get_text.return_value = mock_text
         new_cat_name = "IFVs:"
-        self.testparser.category_name = new_cat_name
         expected = "5 destroyed, 10 damaged"
 
-        summary = self.testparser._parse_category_summary(tag)
+        summary = self.testparser.parse_category_summary(mock_text, new_cat_name)
         self.assertEqual(summary, expected)
-        tag.get_text.assert_called_with()
 
-    def test__parse_category_name(self):
+    def test_parse_category_name(self):
         full_text = """Radars And Communications Equipment 
         (136, of which destroyed: 100, damaged: 21, abandoned: 1, captured: 14)"""
         expected = "Radars And Communications Equipment"
-        parsed = self.testparser._parse_category_name(full_text)
+        parsed = self.testparser.parse_category_name(full_text)
         self.assertEqual(expected, parsed)
 
     @patch("src.loss_parser.OryxLossParser._parse_type_count")
-    @patch("src.loss_parser.OryxLossParser._parse_type_images")
-    def test__parse_type(self, mock_type_img, mock_type_count):
-        tag = MagicMock()
-        text = "33 T-64BV: (blah, blah) "
-        tag.get_text.return_value = text
+    def test__parse_type(self, mock_type_count):
+        img_link = "some img link"
+        item = loss_parser.ListItem("33 T-64BV: (blah, blah)", img_link, [])
         expected_name = "T-64BV"
         mock_words = ["33", "T-64BV"]
-        img_link = "some img link"
-        mock_type_img.return_value = img_link
         mock_count = 33
         mock_type_count.return_value = mock_count
 
-        # Case 1: category identified (counter > 0) and "li" tag
-        tag.name = "li"
-        self.testparser.category_counter = 1
-        self.testparser._parse_type(tag)
-        self.assertEqual(self.testparser.type_ttl_count, mock_count)
-        self.assertEqual(self.testparser.type_name, expected_name)
-        self.assertEqual(self.testparser.type_img_links, img_link)
-        tag.get_text.assert_called_with(strip=True)
-        mock_type_count.assert_called_with(mock_words)
-        mock_type_img.assert_called_with(tag)
-
-        tag.reset_mock()
-        mock_type_count.reset_mock()
-        mock_type_img.reset_mock()
+        self.context.category_counter = 1
+        self.testparser._parse_type(item, self.context)
+        self.assertEqual(self.context.type_ttl_count, mock_count)
+        self.assertEqual(self.context.type_name, expected_name)
+        self.assertEqual(self.context.type_img_links, img_link)
+        mock_type_count.assert_called_with(mock_words, self.context)
+
+    @patch("src.loss_parser.ListItem.from_tag")
+    @patch("src.loss_parser.OryxLossParser._iter_item_losses")
+    @patch("src.loss_parser.OryxLossParser._parse_type")
+    @patch("src.loss_parser.OryxLossParser._parse_category")
+    def test_parse_tag_data(self, mock_category, mock_type, mock_losses, mock_item):
+        tag = MagicMock()
+        mock_losses.return_value = iter(["row"])
 
-        # Case 2: category not yet found
+        # Case 1: category identified (counter > 0) and "li" tag -> one ListItem
         tag.name = "li"
-        self.testparser.category_counter = 0
-        self.testparser._parse_type(tag)
-        tag.get_text.assert_not_called()
-        mock_type_count.assert_not_called()
-        mock_type_img.assert_not_called()
+        self.context.category_counter = 1
+        rows = list(self.testparser.parse_tag_data(tag, self.context))
+        self.assertEqual(rows, ["row"])
+        mock_item.assert_called_once_with(tag)
+        mock_type.assert_called_with(mock_item.return_value, self.context)
+        mock_losses.assert_called_with(mock_item.return_value, self.context)
+        mock_category.assert_not_called()
+        mock_item.reset_mock()
+        mock_type.reset_mock()
 
-        # Case 3: not "li" tag
-        tag.name = "h3"
-        self.testparser.category_counter = 1
-        self.testparser._parse_type(tag)
-        tag.get_text.assert_not_called()
-        mock_type_count.assert_not_called()
-        mock_type_img.assert_not_called()
+        # Case 2: category not yet found
+        self.context.category_counter = 0
+        self.assertEqual(list(self.testparser.parse_tag_data(tag, self.context)), [])
+        mock_item.assert_not_called()
+        mock_type.assert_not_called()
 
-        # Case 4: Not identifiyed category AND not "li" tag
+        # Case 3: "h3" tag
         tag.name = "h3"
-        self.testparser.category_counter = 0
-        self.testparser._parse_type(tag)
-        tag.get_text.assert_not_called()
-        mock_type_count.assert_not_called()
-        mock_type_img.assert_not_called()
+        self.context.category_counter = 1
+        self.assertEqual(list(self.testparser.parse_tag_data(tag, self.context)), [])
+        mock_category.assert_called_with(tag, self.context)
+        mock_item.assert_not_called()
+        self.assertEqual(self.context.counters["tags"], 3)
 
     def test__parse_type_count(self):
         # Case 1: text includes numeric count
         text = ["33", "T-64BV"]
         expected = 33
 
-        type_count = self.testparser._parse_type_count(text)
+        type_count = self.testparser._parse_type_count(text, self.context)
         self.assertEqual(type_count, expected)
 
         # Case 2: Counter is missing convertible value
         text_2 = ["t-64BV"]
         with self.assertRaises(Exception) as e:
-            type_count = self.testparser._parse_type_count(text_2)
-            self.assertEqual(self.testparser.errors[0], (e, text_2))
+            type_count = self.testparser._parse_type_count(text_2, self.context)
+            self.assertEqual(self.context.errors[0], (e, text_2))
+
+    def test_list_item_from_tag(self):
+        tag = BeautifulSoup(
+            "<li><img src='u.png'/> 2 T-72 <img class='x'/>:"
+            "<span><a href='a1'> (1, <b>destroyed</b>) </a></span>"
+            "<!-- note --> <a href='a2'><img src='r.png'/>(2, captured)</a>"
+            " <a>(3)</a></li>",
+            "html.parser",
+        ).li
+
+        # Case 1: same as get_text(strip=True)/find_all of the tag
+        item = loss_parser.ListItem.from_tag(tag)
+        self.assertEqual(item.text, tag.get_text(strip=True))
+        self.assertEqual(item.img_links, "u.png r.png")
+        self.assertEqual(
+            item.anchors,
+            [("(1,destroyed)", "a1"), ("(2, captured)", "a2"), ("(3)", None)],
+        )
 
-    def test__parse_type_image(self):
-        tag = MagicMock()
-        img_mock1, img_mock2, img_mock3 = MagicMock(), MagicMock(), MagicMock()
-        tag_mocks = [img_mock1, img_mock2, img_mock3]
-        tag.find_all.return_value = tag_mocks
-
-        # Case 1: single image link
-        image_mock = "img_link_here"
-        img_mock2.attrs = {"src": image_mock}
-        img_mock2.__getitem__.return_value = image_mock
-
-        returned_img = self.testparser._parse_type_images(tag)
-        self.assertEqual(returned_img, image_mock)
-        img_mock2.__getitem__.assert_called_with("src")
-        img_mock1.__getitem__.assert_not_called()
-        img_mock3.__getitem__.assert_not_called()
-
-        img_mock1.reset_mock()
-        img_mock2.reset_mock()
-        img_mock3.reset_mock()
-
-        # Case 2: multiple images
-        image_mock = "img_link_here"
-        image_mock2 = "another_img_link_here"
-        img_mock2.attrs = {"src": image_mock}
-        img_mock2.__getitem__.return_value = image_mock
-        img_mock3.attrs = {"src": image_mock2}
-        img_mock3.__getitem__.return_value = image_mock2
-        expected = " ".join([image_mock, image_mock2])
-
-        returned_imges = self.testparser._parse_type_images(tag)
-        self.assertEqual(returned_imges, expected)
-        img_mock2.__getitem__.assert_called_with("src")
-        img_mock1.__getitem__.assert_not_called()
-        img_mock3.__getitem__.assert_called_with("src")
-
-        img_mock1.reset_mock()
-        img_mock2.reset_mock()
-        img_mock3.reset_mock()
-
-        # Case 3: no "src" in img.attrs
-        img_mock2.attrs = {"blah": None}
-        img_mock3.attrs = {"blah": None}
-        expected = None
-
-        returned_img = self.testparser._parse_type_images(tag)
-        self.assertEqual(returned_img, expected)
-        img_mock2.__getitem__.assert_not_called()
-        img_mock1.__getitem__.assert_not_called()
-        img_mock3.__getitem__.assert_not_called()
-
-        img_mock1.reset_mock()
-        img_mock2.reset_mock()
-        img_mock3.reset_mock()
-
-        # Case 4: no "img" tag found
-        tag.find_all.return_value = []
-        img_mock2.attrs = {"blah": None}
-        img_mock3.attrs = {"blah": None}
-        expected = None
-
-        returned_img = self.testparser._parse_type_images(tag)
-        self.assertEqual(returned_img, expected)
+        # Case 2: no images
+        item = loss_parser.ListItem.from_tag(
+            BeautifulSoup("<li>1 BMP-1: <a href='b'>(1)</a></li>", "html.parser").li
+        )
+        self.assertEqual(item, ("1 BMP-1:(1)", None, [("(1)", "b")]))
+
+    def test_list_item_from_tag_fixture(self):
+        soup = BeautifulSoup((FIXTURES / "oryx_losses.html").read_text(), "html.parser")
+        for tag in soup.find_all("li"):
+            item = loss_parser.ListItem.from_tag(tag)
+            images = [img["src"] for img in tag.find_all("img") if "src" in img.attrs]
+            anchors = [
+                (a.get_text(strip=True), a.get("href")) for a in tag.find_all("a")
+            ]
+            self.assertEqual(
+                item,
+                (tag.get_text(strip=True), " ".join(images) or None, anchors),
+            )
 
     @patch("src.loss_parser.OryxLossParser._merge_broken_losses")
     def test__parse_loss_item(self, merge_broken_mock):
         # Case 1: valid text value with both brackets ()
         merge_broken_mock.return_value = "(Text value)"
-        tag = MagicMock()
         text_value, proof_value = "(Text value)", "Proof link"
-        tag.get_text.return_value = text_value
-        tag.get.return_value = proof_value
 
-        output = self.testparser._parse_loss_item(tag)
+        output = self.testparser._parse_loss_item(text_value, proof_value, self.context)
         self.assertEqual(output, (text_value, proof_value))
-        tag.get_text.assert_called_with(strip=True)
-        tag.get.assert_called_with("href")
-        merge_broken_mock.assert_called_with("(Text value)")
+        merge_broken_mock.assert_called_with("(Text value)", self.context)
 
         # Case 2: Not valid test value
         merge_broken_mock.return_value = None
-        tag = MagicMock()
         text_value, proof_value = "(Text value", "Proof link"
-        tag.get_text.return_value = text_value
-        tag.get.return_value = proof_value
 
-        output = self.testparser._parse_loss_item(tag)
+        output = self.testparser._parse_loss_item(text_value, proof_value, self.context)
         self.assertEqual(output, ("skip", "skip"))
-        tag.get_text.assert_called_with(strip=True)
-        tag.get.assert_called_with("href")
-        merge_broken_mock.assert_called_with("(Text value")
+        merge_broken_mock.assert_called_with("(Text value", self.context)
 
     def test__merge_broken_losses(self):
         # Case 1: Text broken into three tags
@@ -374,103 +442,67 @@ class TestOrxyLossParser(TestCase):
         response = []
         expected_buffer = None
         for piece in consecutive_pieces:
-            self.assertEqual(self.testparser.buffer, expected_buffer)
-            response.append(self.testparser._merge_broken_losses(piece))
+            self.assertEqual(self.context.buffer, expected_buffer)
+            response.append(self.testparser._merge_broken_losses(piece, self.context))
             expected_buffer = piece if not expected_buffer else expected_buffer + piece
-        self.assertEqual(self.testparser.buffer, None)
+        self.assertEqual(self.context.buffer, None)
         self.assertEqual(response[0], None)
         self.assertEqual(response[1], None)
         self.assertEqual(response[2], "(1 and 2 damaged)")
 
         # Case 2: Text is not broken -> return same text
         good_text = "(1, destroyed)"
-        response = self.testparser._merge_broken_losses(good_text)
+        response = self.testparser._merge_broken_losses(good_text, self.context)
         self.assertEqual(good_text, response)
-        self.assertEqual(self.testparser.buffer, None)
+        self.assertEqual(self.context.buffer, None)
 
     def test__create_longrow(self):
-        self.testparser.category_counter = 1
-        self.testparser.category_name = "Tank"
-        self.testparser.category_summary = "54 destroyed, 66 damaged"
-        self.testparser.type_name = "T-64BV"
-        self.testparser.type_ttl_count = 33
-        self.testparser.type_img_links = "some link here"
+        self.context.category_counter = 1
+        self.context.category_name = "Tank"
+        self.context.category_summary = "54 destroyed, 66 damaged"
+        self.context.type_name = "T-64BV"
+        self.context.type_ttl_count = 33
+        self.context.type_img_links = "some link here"
         item = "destoyed"
         proof = "img_link_here"
         expected_dict = {
-            "category_counter": self.testparser.category_counter,
-            "category_name": self.testparser.category_name,
-            "category_summary": self.testparser.category_summary,
-            "type_name": self.testparser.type_name,
-            "type_ttl_count": self.testparser.type_ttl_count,
-            "type_img_links": self.testparser.type_img_links,
+            "category_counter": self.context.category_counter,
+            "category_name": self.context.category_name,
+            "category_summary": self.context.category_summary,
+            "type_name": self.context.type_name,
+            "type_ttl_count": self.context.type_ttl_count,
+            "type_img_links": self.context.type_img_links,
             "loss_item": item,
             "loss_proof": proof,
         }
-        result = self.testparser._create_longrow(item, proof)
-        self.assertEqual(result, expected_dict)
+        result = self.testparser._create_longrow(item, proof, self.context)
+        self.assertIsInstance(result, LossRow)
+        self.assertEqual(result._asdict(), expected_dict)
 
     @patch("src.loss_parser.OryxLossParser._parse_loss_item")
     @patch("src.loss_parser.OryxLossParser._create_longrow")
-    def test__self_add_losses(self, mock_longrow, mock_parse_loss):
-        tag = MagicMock()
-        item1, item2, item3 = ["item1", "item2", "item3"]
-        items = [item1, item2, item3]
-        tag.find_all.return_value = items
-        parse_return_vals = [("loss1", "link1"), ("loss2", "link2"), ("loss3", "link3")]
+    def test__iter_item_losses(self, mock_longrow, mock_parse_loss):
+        anchors = [("item1", "link1"), ("item2", "link2"), ("item3", "link3")]
+        item = loss_parser.ListItem("text", None, anchors)
+        parse_return_vals = [("loss1", "link1"), ("skip", "skip"), ("loss3", "link3")]
         mock_parse_loss.side_effect = parse_return_vals
-        longrows = ["row1", "row2", "row3"]
+        longrows = ["row1", "row3"]
         mock_longrow.side_effect = longrows
 
-        # Case 1: Category found (counter > 0) and tag is "li"
-        expected_parse_calls = [call(item1), call(item2), call(item3)]
-        expected_create_longrow_calls = [
-            call(*parse_return_vals[0]),
-            call(*parse_return_vals[1]),
-            call(*parse_return_vals[2]),
-        ]
-        loss_list = []
-        self.testparser.category_counter = 1
-        tag.name = "li"
-        self.testparser._add_losses(tag, loss_list)
+        # Rows of the links, fragments of broken entries skipped
+        loss_list = list(self.testparser._iter_item_losses(item, self.context))
         self.assertEqual(loss_list, longrows)
-        tag.find_all.assert_called_with("a")
-        mock_parse_loss.assert_has_calls(expected_parse_calls)
-        mock_longrow.assert_has_calls(expected_create_longrow_calls)
-
-        mock_parse_loss.reset_mock()
-        mock_longrow.reset_mock()
-        tag.reset_mock()
-
-        # Case 2: Category is not found
-        loss_list_2 = []
-        tag.name = "li"
-        self.testparser.category_counter = 0
-        self.testparser._add_losses(tag, loss_list)
-        self.assertEqual(loss_list_2, [])
-        tag.find_all.assert_not_called()
-        mock_parse_loss.assert_not_called()
-        mock_longrow.assert_not_called()
-
-        # Case 3: Not "li" tag
-        loss_list_2 = []
-        tag.name = "h3"
-        self.testparser.category_counter = 1
-        self.testparser._add_losses(tag, loss_list)
-        self.assertEqual(loss_list_2, [])
-        tag.find_all.assert_not_called()
-        mock_parse_loss.assert_not_called()
-        mock_longrow.assert_not_called()
-
-        # Case 4: Neither
-        loss_list_2 = []
-        tag.name = "h3"
-        self.testparser.category_counter = 0
-        self.testparser._add_losses(tag, loss_list)
-        self.assertEqual(loss_list_2, [])
-        tag.find_all.assert_not_called()
-        mock_parse_loss.assert_not_called()
-        mock_longrow.assert_not_called()
+        mock_parse_loss.assert_has_calls(
+            [call(text, href, self.context) for text, href in anchors]
+        )
+        mock_longrow.assert_has_calls(
+            [
+                call(*parse_return_vals[0], self.context),
+                call(*parse_return_vals[2], self.context),
+            ]
+        )
+        self.assertEqual(self.context.counters["rows"], 2)
+        self.assertEqual(self.context.counters["skipped_entries"], 1)
 
 
 if __name__ == "__main__":
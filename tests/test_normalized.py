@@ -0,0 +1,153 @@
+from unittest import TestCase, main, skipUnless
+from unittest.mock import patch
+from pathlib import Path
+import json
+import sqlite3
+import tempfile
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from src import normalized
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class TestNormalizedContent(TestCase):
+
+    def setUp(self):
+        with open(FIXTURES / "oryx_losses_expected.json") as file:
+            self.rows = json.load(file)
+        self.content = normalized.NormalizedContent(iter(self.rows)).load()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load(self):
+        tables = self.content()
+        self.assertEqual(
+            [category._asdict() for category in tables["categories"]],
+            [
+                {
+                    "category_counter": 1,
+                    "category_name": "Tanks",
+                    "category_summary": "7, of which destroyed: 4, damaged: 1, captured: 2",
+                },
+                {
+                    "category_counter": 2,
+                    "category_name": "Armoured Fighting Vehicles",
+                    "category_summary": "5, of which destroyed: 2, damaged: 1, "
+                    "abandoned: 1, captured: 1",
+                },
+            ],
+        )
+        self.assertEqual(len(tables["types"]), 4)
+        self.assertEqual(tables["types"][1].type_name, "T-72 & Co")
+        self.assertEqual(tables["types"][1].category_counter, 1)
+        self.assertEqual(len(tables["losses"]), len(self.rows))
+        self.assertEqual(
+            tables["losses"][0]._asdict(),
+            {
+                "loss_id": 1,
+                "type_id": 1,
+                "loss_item": "(1, destroyed)",
+                "loss_proof": "https://i.postimg.cc/a1.jpg",
+            },
+        )
+
+    def test_iter_longrows(self):
+        self.assertEqual(
+            [row._asdict() for row in self.content.iter_longrows()], self.rows
+        )
+
+    def test_table_paths(self):
+        paths = self.content.table_paths("out/losses.csv", ".csv")
+        self.assertEqual(
+            paths,
+            {
+                "categories": Path("out/losses_categories.csv"),
+                "types": Path("out/losses_types.csv"),
+                "losses": Path("out/losses_losses.csv"),
+            },
+        )
+
+    def test_write_csv(self):
+        self.content.write(self.tmp_path / "out.csv")
+        self.assertEqual(
+            sorted(path.name for path in self.tmp_path.iterdir()),
+            ["out_categories.csv", "out_losses.csv", "out_types.csv"],
+        )
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_write_parquet(self):
+        self.content.write(self.tmp_path / "out.csv", "parquet")
+        self.assertEqual(
+            sorted(path.name for path in self.tmp_path.iterdir()),
+            ["out_categories.parquet", "out_losses.parquet", "out_types.parquet"],
+        )
+
+    @patch("src.normalized.NormalizedContent.to_sqlite")
+    def test_write_sqlite(self, sqlite_mock):
+        self.content.write("out.db")
+        sqlite_mock.assert_called_with("out.db")
+        self.content.write("out.data", "sqlite")
+        sqlite_mock.assert_called_with("out.data")
+
+    def test_write_unsupported_format(self):
+        with self.assertRaises(Exception):
+            self.content.write(self.tmp_path / "out.arrow")
+
+    def test_to_sqlite(self):
+        database = self.tmp_path / "out.sqlite"
+        # Case 1: long_losses view gives back the long rows, written twice -> replaced
+        for _ in range(2):
+            self.content.to_sqlite(database)
+        connection = sqlite3.connect(database)
+        connection.row_factory = sqlite3.Row
+        rows = [dict(row) for row in connection.execute("SELECT * FROM long_losses")]
+        self.assertEqual(rows, self.rows)
+        count = connection.execute("SELECT COUNT(*) FROM norm_types").fetchone()[0]
+        self.assertEqual(count, 4)
+        connection.close()
+
+        # Case 2: no rows
+        normalized.NormalizedContent([]).load().to_sqlite(database)
+        connection = sqlite3.connect(database)
+        count = connection.execute("SELECT COUNT(*) FROM long_losses").fetchone()[0]
+        self.assertEqual(count, 0)
+        connection.close()
+
+    def test_to_sqlite_other_tables(self):
+        database = self.tmp_path / "other.db"
+        connection = sqlite3.connect(database)
+        connection.execute("CREATE TABLE losses (snapshot_date TEXT, loss_item TEXT)")
+        connection.execute("INSERT INTO losses VALUES ('2025-04-21', '(1, destroyed)')")
+        connection.commit()
+        connection.close()
+
+        # a losses table of another layout is neither dropped nor written to
+        with self.assertRaises(Exception):
+            self.content.to_sqlite(database)
+        connection = sqlite3.connect(database)
+        count = connection.execute("SELECT COUNT(*) FROM losses").fetchone()[0]
+        tables = connection.execute("SELECT name FROM sqlite_master").fetchall()
+        connection.close()
+        self.assertEqual(count, 1)
+        self.assertEqual(tables, [("losses",)])
+
+    def test_write_csv_columns(self):
+        self.content.write(self.tmp_path / "out.csv")
+        with open(self.tmp_path / "out_types.csv") as file:
+            header = file.readline().strip()
+        self.assertEqual(
+            header, ",type_id,category_counter,type_name,type_ttl_count,type_img_links"
+        )
+
+
+if __name__ == "__main__":
+    main()
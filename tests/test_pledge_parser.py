@@ -0,0 +1,96 @@
+from unittest import TestCase, main
+from pathlib import Path
+from collections import Counter
+
+from bs4 import BeautifulSoup
+
+from src import pledge_parser
+from src import runner
+from src.pledge_parser import PledgeRow
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_pledges.html"
+
+
+class TestPledgeExtractor(TestCase):
+
+    def setUp(self):
+        self.extractor = pledge_parser.PledgeExtractor()
+
+    def _handle(self, html: str) -> list:
+        tag = next(BeautifulSoup(html, "html.parser").children)
+        return list(self.extractor.handle(tag))
+
+    def test_handle(self):
+        # Case 1: entry before any donor
+        self.assertEqual(self._handle("<li>3 Leopard 2A4</li>"), [])
+
+        # Case 2: donor header with flag, trailing colon dropped
+        self.assertEqual(self._handle('<h3><img src="pl.png"/> Poland:</h3>'), [])
+        self.assertEqual(self.extractor.donor, "Poland")
+        self.assertEqual(self.extractor.donor_counter, 1)
+
+        # Case 3: count, equipment, linked status
+        rows = self._handle(
+            '<li><img src="pl.png"/> 14 Leopard 2A4 <a href="https://x/1">(delivered)</a></li>'
+        )
+        self.assertEqual(
+            rows,
+            [
+                PledgeRow(
+                    1, "Poland", "pl.png", 14, "Leopard 2A4", "delivered", "https://x/1"
+                )
+            ],
+        )
+
+        # Case 4: type name starting with digits, no count, no status
+        rows = self._handle("<li>2S1 Gvozdika</li>")
+        self.assertEqual(rows[0].item_count, None)
+        self.assertEqual(rows[0].equipment, "2S1 Gvozdika")
+        self.assertEqual(rows[0].status, None)
+        self.assertEqual(rows[0].proof, None)
+
+        # Case 5: entry without equipment name
+        self.assertEqual(
+            self._handle('<li><a href="https://x/2">(pledged)</a></li>'), []
+        )
+        self.assertEqual(self.extractor.skipped, 1)
+
+        # Case 6: a section header ends the donor
+        self._handle("<h2>Other support</h2>")
+        self.assertEqual(self._handle("<li>Ammunition</li>"), [])
+
+    def test_fixture(self):
+        pledges = runner.extract_file(FIXTURE, ["pledges"], backend="html.parser")[
+            "pledges"
+        ]
+        self.assertEqual(
+            [(row.donor, row.item_count, row.equipment, row.status) for row in pledges],
+            [
+                ("Australia", 120, "Bushmaster PMV", "delivered"),
+                ("Australia", 14, "M113AS4 APC", "pledged"),
+                (
+                    "Belgium",
+                    None,
+                    "2S1 Gvozdika",
+                    "together with the Netherlands delivered",
+                ),
+            ],
+        )
+        self.assertEqual(pledges[2].donor_counter, 2)
+        self.assertEqual(
+            pledges[2].donor_img_links, "https://upload.wikimedia.org/be.png"
+        )
+        self.assertEqual(pledges[0].proof, "https://example.org/au1")
+
+    def test_count(self):
+        counters = Counter()
+        runner.EXTRACTORS.extract(
+            FIXTURE.read_text(), ["pledges"], "html.parser", counters
+        )
+        self.assertEqual(counters["pledges"], 3)
+        self.assertEqual(counters["skipped_entries"], 1)
+
+
+if __name__ == "__main__":
+    main()
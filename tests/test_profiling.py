@@ -0,0 +1,151 @@
+from unittest import TestCase, main
+from argparse import Namespace
+from pathlib import Path
+import json
+import pstats
+import shutil
+import tempfile
+import tracemalloc
+
+from src import profiling
+from src import runner
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+
+
+class TestParseProfile(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_stage(self):
+        profile = profiling.ParseProfile()
+        # Case 1: time and peak memory of the block
+        with profile.stage("load") as stats:
+            data = [bytes(1000) for _ in range(100)]
+        self.assertIs(profile.stages["load"], stats)
+        self.assertGreater(stats.wall_seconds, 0)
+        self.assertGreaterEqual(stats.cpu_seconds, 0)
+        self.assertGreater(stats.peak_bytes, 100_000)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        # Case 2: repeated stage adds up
+        wall_seconds = stats.wall_seconds
+        with profile.stage("load"):
+            del data
+        self.assertGreater(profile.stages["load"].wall_seconds, wall_seconds)
+
+        # Case 3: without memory tracing
+        profile = profiling.ParseProfile(trace_memory=False)
+        with profile.stage("parse") as stats:
+            pass
+        self.assertEqual(stats.peak_bytes, 0)
+
+    def test_stage_cprofile(self):
+        cprofile_file = self.tmp_dir / "parse.prof"
+        profile = profiling.ParseProfile(cprofile_file)
+        # Case 1: other stages are not profiled
+        with profile.stage("load"):
+            pass
+        self.assertFalse(cprofile_file.exists())
+
+        # Case 2: parse stage dumped as pstats
+        with profile.stage("parse"):
+            sorted(range(1000), key=str)
+        self.assertGreater(pstats.Stats(str(cprofile_file)).total_calls, 0)
+
+        # Case 3: a stage entered again adds to the same dump, a nested entry is not profiled apart
+        calls = pstats.Stats(str(cprofile_file)).total_calls
+        with profile.stage("parse"):
+            with profile.stage("parse"):
+                sorted(range(1000), key=str)
+        self.assertGreater(pstats.Stats(str(cprofile_file)).total_calls, calls * 1.5)
+
+    def test_to_dict(self):
+        profile = profiling.ParseProfile()
+        # Case 1: nothing measured
+        self.assertEqual(profile.to_dict()["rows_per_second"], None)
+
+        # Case 2: stages and counters
+        with profile.stage("parse"):
+            pass
+        profile.counters.update(rows=10, tags=5)
+        report = profile.to_dict()
+        self.assertEqual(list(report["stages"]), ["parse"])
+        self.assertEqual(
+            set(report["stages"]["parse"]),
+            {"wall_seconds", "cpu_seconds", "peak_bytes"},
+        )
+        self.assertEqual(report["counters"], {"rows": 10, "tags": 5})
+        self.assertGreater(report["rows_per_second"], 0)
+
+    def test_stage_without_profile(self):
+        with profiling.stage(None, "parse") as stats:
+            self.assertIsNone(stats)
+
+    def test_run_loss_parsing_report(self):
+        args = Namespace(
+            file=str(FIXTURE),
+            output_file=str(self.tmp_dir / "out.csv"),
+            stream=False,
+            backend="html.parser",
+            cache_file=None,
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=None,
+            profile=str(self.tmp_dir / "report.json"),
+            cprofile=None,
+            workers=None,
+            format=None,
+            normalized=False,
+            snapshot_date=None,
+        )
+        runner.run_loss_parsing(args, *runner.UKR_LOSSES_CUTOFF)
+        with open(args.profile) as file:
+            report = json.load(file)
+        self.assertEqual(report["file"], str(FIXTURE))
+        self.assertEqual(list(report["stages"]), ["load", "truncate", "parse", "write"])
+        counters = report["counters"]
+        self.assertEqual(counters["rows"], 12)
+        self.assertEqual(counters["categories"], 2)
+        self.assertGreater(counters["tags"], counters["types"])
+        self.assertEqual(counters["merged_fragments"], counters["skipped_entries"])
+
+    def test_run_loss_parsing_report_incremental(self):
+        args = Namespace(
+            file=str(FIXTURE),
+            output_file=str(self.tmp_dir / "out.csv"),
+            stream=False,
+            backend="html.parser",
+            cache_file=str(self.tmp_dir / "sections.json"),
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=None,
+            profile=str(self.tmp_dir / "report.json"),
+            cprofile=str(self.tmp_dir / "parse.prof"),
+            workers=None,
+            format=None,
+            normalized=False,
+            snapshot_date=None,
+        )
+        # second run reuses every section
+        for _ in range(2):
+            runner.run_loss_parsing(args, *runner.UKR_LOSSES_CUTOFF)
+        with open(args.profile) as file:
+            report = json.load(file)
+        self.assertEqual(report["counters"]["rows"], 12)
+        self.assertEqual(report["counters"]["sections_reused"], 2)
+        self.assertGreater(report["rows_per_second"], 0)
+        # the dump holds the incremental parse, not only the list() of its result
+        stats = pstats.Stats(args.cprofile)
+        self.assertGreater(stats.total_calls, 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+from unittest import TestCase, main
+from unittest.mock import ANY, MagicMock, patch
+from argparse import Namespace
+from pathlib import Path
+import csv
+import json
+import shutil
+import tempfile
+
+from src import runner
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class TestParseFile(TestCase):
+
+    @patch("src.runner.loss_parser.OryxLossParser")
+    @patch("src.runner.util.HTMLFileContent")
+    def test_parse_file(self, content_mock, parser_mock):
+        parser_mock.return_value.iter_losses.return_value = iter(["row"])
+        result = list(runner.parse_file("in.html", "limit", "a", "lxml"))
+        self.assertEqual(result, ["row"])
+        content_mock.assert_called_with("in.html", "lxml")
+
+    @patch("src.runner.incremental.IncrementalLossParser")
+    @patch("src.runner.loss_parser.OryxLossParser")
+    @patch("src.runner.util.HTMLFileContent")
+    def test_parse_file_with_cache(self, content_mock, parser_mock, incremental_mock):
+        content = content_mock.return_value
+        content.return_value = "truncated html"
+        incremental_mock.return_value.parse_losses.return_value = ["row"]
+
+        result = runner.parse_file(
+            "in.html", "limit", "a", "lxml", cache_file="c.json"
+        )
+        self.assertEqual(result, ["row"])
+        # raw content cut at the cutoff, without parsing the whole page
+        content.read_truncated.assert_called_with("limit", "a")
+        content.load.assert_not_called()
+        content.load_truncated.assert_not_called()
+        incremental_mock.assert_called_with("c.json", parser_mock.return_value)
+        incremental_mock.return_value.parse_losses.assert_called_with("truncated html")
+
+    @patch("src.runner.loss_parser.OryxLossParser")
+    @patch("src.runner.util.HTMLFileContent")
+    def test_parse_file_pretruncated(self, content_mock, parser_mock):
+        parser_mock.return_value.iter_losses.return_value = iter(["row"])
+        result = list(
+            runner.parse_file("in.html", "limit", "a", "lxml", pretruncate=True)
+        )
+        self.assertEqual(result, ["row"])
+        content_mock.return_value.load_truncated.assert_called_with("limit", "a")
+        content_mock.return_value.load.assert_not_called()
+        parser_mock.return_value.iter_losses.assert_called_with(
+            content_mock.return_value.soup, ANY
+        )
+
+    @patch("src.runner.loss_parser.OryxLossParser")
+    @patch("src.runner.util.HTMLFileContent")
+    def test_parse_file_with_workers(self, content_mock, parser_mock):
+        content = content_mock.return_value
+        content.return_value = "truncated html"
+        parser_mock.return_value.parse_losses_parallel.return_value = ["row"]
+
+        result = runner.parse_file("in.html", "limit", "a", "lxml", workers=4)
+        self.assertEqual(result, ["row"])
+        content.read_truncated.assert_called_with("limit", "a")
+        content.load.assert_not_called()
+        parser_mock.return_value.parse_losses_parallel.assert_called_with(
+            "truncated html", 4, ANY
+        )
+
+    def test_cutoffs(self):
+        self.assertEqual(runner.CUTOFFS["ukr"], runner.UKR_LOSSES_CUTOFF)
+        self.assertEqual(runner.CUTOFFS["ru"], runner.RU_LOSSES_CUTOFF)
+
+
+class TestRunLossParsing(TestCase):
+
+    @patch("src.runner.util.ParsedContent")
+    @patch("src.runner.loss_parser.OryxLossParser")
+    @patch("src.runner.util.HTMLFileContent")
+    def test_tree_parsing(self, content_mock, parser_mock, parsed_mock):
+        args = Namespace(
+            file="in.html",
+            output_file="out.csv",
+            stream=False,
+            backend="lxml",
+            cache_file=None,
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=None,
+            profile=None,
+            cprofile=None,
+            workers=None,
+            format="parquet",
+            normalized=False,
+            snapshot_date=None,
+        )
+        content = content_mock.return_value
+        rows = iter(["row"])
+        parser_mock.return_value.iter_losses.return_value = rows
+
+        runner.run_loss_parsing(args, "limit", "a")
+        content_mock.assert_called_with("in.html", "lxml")
+        parser_mock.assert_called_with("lxml")
+        content_mock.return_value.truncate_soup.assert_called_with(
+            "limit", "a"
+        )
+        parser_mock.return_value.iter_losses.assert_called_with(content.soup, ANY)
+        parsed_mock.assert_called_with(rows, None)
+        parsed_mock.return_value.load.return_value.write.assert_called_with(
+            "out.csv", "parquet"
+        )
+        parsed_mock.return_value.load.return_value.enrich.assert_not_called()
+
+        # Case 2: with the status columns
+        args.enrich = True
+        runner.run_loss_parsing(args, "limit", "a")
+        parsed_mock.return_value.load.return_value.enrich.assert_called_once_with()
+
+    @patch("src.runner.archive.open_text")
+    @patch("src.runner.util.ParsedContent")
+    @patch("src.runner.stream_parser.OryxStreamParser")
+    @patch("src.runner.util.HTMLFileContent")
+    def test_stream_parsing(self, content_mock, stream_mock, parsed_mock, open_mock):
+        args = Namespace(
+            file="in.html",
+            output_file="out.csv",
+            stream=True,
+            backend="lxml",
+            cache_file=None,
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=None,
+            profile=None,
+            cprofile=None,
+            workers=None,
+            format=None,
+            normalized=False,
+            snapshot_date=None,
+        )
+        file_mock = MagicMock()
+        open_mock.return_value.__enter__.return_value = file_mock
+        stream_mock.return_value.iter_losses.return_value = iter(["row"])
+
+        parsed_mock.return_value.load.return_value.write.side_effect = (
+            lambda *args: self.assertEqual(list(parsed_mock.call_args.args[0]), ["row"])
+        )
+
+        runner.run_loss_parsing(args, "limit", "a")
+        open_mock.assert_called_with("in.html")
+        stream_mock.return_value.iter_losses.assert_called_with(
+            file_mock, "limit", "a", ANY
+        )
+        content_mock.assert_not_called()
+        # rows are handed over as a generator, consumed by the writer
+        parsed_mock.return_value.load.return_value.write.assert_called_with(
+            "out.csv", None
+        )
+
+    @patch("src.runner.util.ParsedContent")
+    @patch("src.runner.parse_file")
+    def test_snapshot_date(self, parse_mock, parsed_mock):
+        args = Namespace(
+            file="data/2024-05-01_losses.html",
+            output_file="losses.db",
+            stream=False,
+            backend="lxml",
+            cache_file=None,
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=None,
+            profile=None,
+            cprofile=None,
+            workers=None,
+            format=None,
+            normalized=False,
+            snapshot_date=None,
+        )
+        parse_mock.return_value = ["row"]
+
+        # Case 1: date from the file name
+        runner.run_loss_parsing(args, "limit", "a")
+        parsed_mock.assert_called_with(["row"], "2024-05-01")
+
+        # Case 2: explicit date wins
+        args.snapshot_date = "2024-06-01"
+        runner.run_loss_parsing(args, "limit", "a")
+        parsed_mock.assert_called_with(["row"], "2024-06-01")
+
+    @patch("src.runner.normalized.NormalizedContent")
+    @patch("src.runner.util.ParsedContent")
+    @patch("src.runner.parse_file")
+    def test_normalized_output(self, parse_mock, parsed_mock, normalized_mock):
+        args = Namespace(
+            file="in.html",
+            output_file="out.db",
+            stream=False,
+            backend="lxml",
+            cache_file=None,
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=None,
+            profile=None,
+            cprofile=None,
+            workers=None,
+            format=None,
+            normalized=True,
+        )
+        parse_mock.return_value = ["row"]
+        runner.run_loss_parsing(args, "limit", "a")
+        normalized_mock.assert_called_with(["row"])
+        normalized_mock.return_value.load.return_value.write.assert_called_with(
+            "out.db", None
+        )
+        parsed_mock.assert_not_called()
+
+
+class TestExtraction(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _read_csv(self, file: Path) -> list[dict]:
+        with open(file, newline="") as csv_file:
+            return list(csv.DictReader(csv_file))
+
+    def test_run_pledge_parsing(self):
+        args = Namespace(
+            file=str(FIXTURES / "oryx_pledges.html"),
+            output_file=str(self.tmp_dir / "pledges.csv"),
+            format=None,
+            backend="html.parser",
+        )
+        runner.run_pledge_parsing(args)
+        rows = self._read_csv(self.tmp_dir / "pledges.csv")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["donor"], "Australia")
+        self.assertEqual(rows[0]["item_count"], "120")
+        self.assertEqual(rows[2]["item_count"], "")
+
+    @patch("src.runner.parse_file")
+    def test_category_totals(self, parse_mock):
+        args = Namespace(
+            file=str(FIXTURES / "oryx_losses.html"),
+            output_file=str(self.tmp_dir / "losses.csv"),
+            stream=False,
+            backend="html.parser",
+            cache_file=None,
+            pretruncate=False,
+            cache_dir=None,
+            enrich=False,
+            category_totals=str(self.tmp_dir / "totals.csv"),
+            profile=None,
+            cprofile=None,
+            workers=None,
+            format=None,
+            normalized=False,
+            snapshot_date=None,
+        )
+        runner.run_loss_parsing(args, *runner.UKR_LOSSES_CUTOFF)
+        # losses and totals come from one walk, not from parse_file
+        parse_mock.assert_not_called()
+        self.assertEqual(len(self._read_csv(self.tmp_dir / "losses.csv")), 12)
+        totals = self._read_csv(self.tmp_dir / "totals.csv")
+        self.assertEqual(
+            [(row["category_name"], row["total"]) for row in totals],
+            [("Tanks", "7"), ("Armoured Fighting Vehicles", "5")],
+        )
+
+        # Case 2: pretruncated page, same rows
+        args.pretruncate = True
+        runner.run_loss_parsing(args, *runner.UKR_LOSSES_CUTOFF)
+        self.assertEqual(len(self._read_csv(self.tmp_dir / "losses.csv")), 12)
+        self.assertEqual(self._read_csv(self.tmp_dir / "totals.csv"), totals)
+
+        # Case 3: extracted rows counted in the profile report
+        args.profile = str(self.tmp_dir / "profile.json")
+        runner.run_loss_parsing(args, *runner.UKR_LOSSES_CUTOFF)
+        with open(args.profile) as file:
+            report = json.load(file)
+        self.assertEqual(report["counters"]["rows"], 12)
+        self.assertEqual(report["counters"]["categories"], 2)
+        self.assertEqual(report["counters"]["category_totals"], 2)
+        self.assertGreater(report["rows_per_second"], 0)
+
+
+if __name__ == "__main__":
+    main()
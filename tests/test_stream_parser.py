@@ -0,0 +1,140 @@
+from unittest import TestCase, main
+from unittest.mock import MagicMock
+import io
+
+from src import loss_parser
+from src import stream_parser
+
+
+HTML = (
+    "<html><head><title>Cutoff here</title></head><body>"
+    "<h3>Intro</h3>"
+    "<h3><span>Tanks (3, of which destroyed: 2, damaged: 1)</span></h3>"
+    "<ul><li><img src='flag.png'> 3 T-64BV: <a href='p1'>(1, destroyed)</a> "
+    "<a href='p2'>(2, damaged</a><a href='p3'> and abandoned)</a></li>"
+    "<li>2 T-72 &amp; Co: <a href='p4'>(1, destroyed)</a><!-- note --> "
+    "<a href='p5'>(2, captured)</a></li></ul>"
+    "<p>Go to <a href='x'>Cutoff here</a></p>"
+    "<ul><li>1 BMP-1: <a href='p6'>(1, destroyed)</a></li></ul>"
+    "</body></html>"
+)
+
+
+class TestStreamedTag(TestCase):
+
+    def setUp(self):
+        self.tag = stream_parser.StreamedTag("li", [("class", "x"), ("hidden", None)])
+        self.tag.strings = [" 3 T-64BV: ", "(1, destroyed)", " ", " more "]
+        self.img = stream_parser.StreamedTag("img", [("src", "flag.png")])
+        self.a = stream_parser.StreamedTag("a", [("href", "p1")])
+        self.tag.children = [self.img, self.a]
+
+    def test_init(self):
+        self.assertEqual(self.tag.name, "li")
+        self.assertEqual(self.tag.attrs, {"class": "x", "hidden": ""})
+
+    def test_get_text(self):
+        self.assertEqual(self.tag.get_text(), " 3 T-64BV: (1, destroyed)  more ")
+        self.assertEqual(self.tag.get_text(strip=True), "3 T-64BV:(1, destroyed)more")
+
+    def test_find_all(self):
+        self.assertEqual(self.tag.find_all("img"), [self.img])
+        self.assertEqual(self.tag.find_all("a"), [self.a])
+        self.assertEqual(self.tag.find_all("h3"), [])
+
+    def test_get_and_getitem(self):
+        self.assertEqual(self.a.get("href"), "p1")
+        self.assertEqual(self.a.get("title"), None)
+        self.assertEqual(self.img["src"], "flag.png")
+        with self.assertRaises(KeyError):
+            self.img["alt"]
+
+
+class TestOryxTokenizer(TestCase):
+
+    def _tokenize(self, html, *cutoff):
+        tokenizer = stream_parser.OryxTokenizer(*cutoff)
+        tokenizer.feed(html)
+        tokenizer.close()
+        return tokenizer, tokenizer.pop_ready()
+
+    def test_collects_tags_in_document_order(self):
+        html = "<h2>a</h2><ul><li>1<ul><li>2 <a>x</a></li></ul></li></ul><h3>b</h3>"
+        _, tags = self._tokenize(html)
+        self.assertEqual([tag.name for tag in tags], ["h2", "li", "li", "h3"])
+        self.assertEqual(tags[1].get_text(), "12 x")
+        self.assertEqual(len(tags[1].find_all("a")), 1)
+        self.assertEqual(tags[2].get_text(), "2 x")
+
+    def test_skips_script_text(self):
+        _, tags = self._tokenize("<li>a<script>x</script>b<style>y</style></li>")
+        self.assertEqual(tags[0].get_text(), "ab")
+
+    def test_cutoff(self):
+        # Case 1: cutoff tag inside li -> li keeps text before the tag only
+        html = "<li>1 T: <a>(1)</a> <a>stop</a> <a>(2)</a></li><li>never</li>"
+        tokenizer, tags = self._tokenize(html, "stop", "a")
+        self.assertTrue(tokenizer.cutoff_found)
+        self.assertEqual(len(tags), 1)
+        self.assertEqual(tags[0].get_text(), "1 T: (1) ")
+        self.assertEqual(len(tags[0].find_all("a")), 1)
+
+        # Case 2: string only found outside tag_name tags
+        tokenizer, tags = self._tokenize("<li>stop</li>", "stop", "a")
+        self.assertFalse(tokenizer.cutoff_found)
+        self.assertEqual(len(tags), 1)
+
+        # Case 3: cutoff tag nested in an earlier unclosed tag_name tag -> cut from the outer one,
+        # li tags closed inside it are rolled back as well
+        html = "<li>kept</li><a>open <ul><li>1 T</li></ul><a>stop</a></a><li>never</li>"
+        tokenizer, tags = self._tokenize(html, "stop", "a")
+        self.assertTrue(tokenizer.cutoff_found)
+        self.assertEqual([tag.get_text() for tag in tags], ["kept"])
+
+    def test_ignores_unmatched_end_tag(self):
+        _, tags = self._tokenize("<li>a</b>b</li>")
+        self.assertEqual(tags[0].get_text(), "ab")
+
+
+class TestOryxStreamParser(TestCase):
+
+    def test_init(self):
+        test_parser = stream_parser.OryxStreamParser()
+        self.assertIsInstance(test_parser.loss_parser, loss_parser.OryxLossParser)
+        self.assertEqual(test_parser.chunk_size, 64 * 1024)
+
+    def test_iter_losses_matches_parse_losses(self):
+        truncated = loss_parser.OryxLossParser().truncate_content(
+            HTML, "Cutoff here", "a"
+        )
+        expected = loss_parser.OryxLossParser().parse_losses(truncated)
+        self.assertEqual(len(expected), 4)
+
+        for chunk_size in (1, 5, 100000):
+            test_parser = stream_parser.OryxStreamParser(chunk_size=chunk_size)
+            rows = list(test_parser.iter_losses(io.StringIO(HTML), "Cutoff here", "a"))
+            self.assertEqual(rows, expected)
+
+    def test_iter_losses_stops_reading_at_cutoff(self):
+        stream = MagicMock()
+        stream.read.side_effect = [HTML, AssertionError("read past cutoff")]
+        test_parser = stream_parser.OryxStreamParser()
+        rows = list(test_parser.iter_losses(stream, "Cutoff here", "a"))
+        self.assertEqual(len(rows), 4)
+        stream.read.assert_called_once_with(64 * 1024)
+
+    def test_iter_losses_cutoff_not_found(self):
+        test_parser = stream_parser.OryxStreamParser()
+        rows = test_parser.iter_losses(io.StringIO(HTML), "Not in page", "a")
+        with self.assertRaises(Exception):
+            list(rows)
+
+    def test_iter_losses_without_cutoff(self):
+        test_parser = stream_parser.OryxStreamParser()
+        rows = list(test_parser.iter_losses(io.StringIO(HTML)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1].loss_proof, "p6")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,24 @@
-from unittest import TestCase, main
+from unittest import TestCase, main, skipUnless
 from unittest.mock import MagicMock, patch, call
+from pathlib import Path
+from contextlib import closing
+import sqlite3
 import sys
+import tempfile
+
+from bs4 import BeautifulSoup
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 from src import util
+from src.normalized import NormalizedContent
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
 
 
 class TestHTMLFileContent(TestCase):
@@ -17,8 +33,16 @@ class TestHTMLFileContent(TestCase):
         test_instance = util.HTMLFileContent(some_source)
         content_mock.assert_called_with(some_source)
         self.assertEqual(test_instance.soup, None)
+        self.assertEqual(test_instance.backend, "html.parser")
+
+    @patch("src.util.resolve_backend")
+    def test_init_backend(self, resolve_mock):
+        resolve_mock.return_value = "lxml"
+        test_instance = util.HTMLFileContent("file.html", "auto")
+        resolve_mock.assert_called_with("auto")
+        self.assertEqual(test_instance.backend, "lxml")
 
-    @patch("src.util.open")
+    @patch("src.util.compressed.open_text")
     @patch("src.util.BeautifulSoup")
     def test_load(self, bs_mock, open_mock):
         file_mock = MagicMock()
@@ -31,69 +55,109 @@ class TestHTMLFileContent(TestCase):
         bs_mock.assert_called_with(fake_html, "html.parser")
         self.assertEqual(test_instance._content, fake_html)
 
-    @patch("src.util.HTMLFileContent._find_str_pos")
-    def test_truncate_content(self, find_str_mock):
+    def test_load_truncated(self):
+        limit = "Attack On Europe: Documenting Ukrainian Equipment"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            html_file = Path(tmp_dir) / "page.html"
+            html_file.write_bytes(FIXTURE.read_bytes().replace(b"\n", b"\r\n"))
+            expected = util.HTMLFileContent(html_file).load()
+            expected.truncate_content(limit, "a").truncate_soup(limit, "a")
+
+            # Case 1: cut as bytes, before parsing
+            with patch("src.util.HTMLFileContent.load") as load_mock:
+                result = util.HTMLFileContent(html_file).load_truncated(limit, "a")
+            load_mock.assert_not_called()
+            self.assertEqual(result._content, expected._content)
+            self.assertEqual(str(result.soup), str(expected.soup))
+
+            # Case 2: raw content only, not parsed
+            with patch("src.util.BeautifulSoup") as bs_mock:
+                result = util.HTMLFileContent(html_file).read_truncated(limit, "a")
+            bs_mock.assert_not_called()
+            self.assertEqual(result(), expected._content)
+
+            # Case 3: no tag name -> tree based truncation
+            with patch("src.util.HTMLFileContent.truncate_soup") as soup_mock:
+                test_instance = util.HTMLFileContent(html_file)
+                test_instance.load_truncated(limit)
+            soup_mock.assert_called_with(limit, None)
+
+            # Case 4: earlier marker split by an entity, cut there as load + truncate does
+            split_link = (
+                b'<p><a href="x">Attack On Europe: Documenting Ukrainian Equipment'
+                b" Losses During The Russian Invasion Of&#32;Ukraine</a></p>\r\n"
+            )
+            second_category = b'<h3><span class="mw-headline">Armoured'
+            html_file.write_bytes(
+                FIXTURE.read_bytes().replace(
+                    second_category, split_link + second_category
+                )
+            )
+            expected = util.HTMLFileContent(html_file).load()
+            expected.truncate_content(limit, "a").truncate_soup(limit, "a")
+            result = util.HTMLFileContent(html_file).load_truncated(limit, "a")
+            self.assertEqual(result._content, expected._content)
+            self.assertEqual(str(result.soup), str(expected.soup))
+
+            # Case 5: empty file, parsed (and not found) as before
+            html_file.write_bytes(b"")
+            with self.assertRaises(Exception):
+                util.HTMLFileContent(html_file).load_truncated(limit, "a")
+
+    @patch("src.util.cutoff.find_cutoff_pos")
+    def test_truncate_content(self, find_pos_mock):
         soup_mock = MagicMock()
         content_str = "Some html content"
-        fake_tags = ["tag1", "tag2", "tag3"]
-        soup_mock.find_all.return_value = fake_tags
-        fake_content = "Some html content"
-        soup_mock.__str__.return_value = fake_content
         exclude = "content"
-        mocked_pos_return = 10
-        find_str_mock.return_value = mocked_pos_return
+        find_pos_mock.return_value = 10
         self.test_htmlfcont.soup = soup_mock
         self.test_htmlfcont._content = content_str
 
         # Case 1: tag name is provided
         truncated = self.test_htmlfcont.truncate_content(exclude, tag_name="a")
+        self.assertIs(truncated, self.test_htmlfcont)
         self.assertEqual(self.test_htmlfcont._content, content_str[:10])
-        soup_mock.find_all.assert_called_with("a")
-        find_str_mock.assert_called_with(fake_tags, exclude)
-
-        find_str_mock.reset_mock()
+        find_pos_mock.assert_called_with(soup_mock, content_str, exclude, "a")
+        soup_mock.__str__.assert_not_called()
 
         # Case 2: tag name NOT provided
-        truncated_2 = self.test_htmlfcont.truncate_content(exclude)
-        self.assertEqual(self.test_htmlfcont._content, fake_content[:10])
-        soup_mock.find_all.assert_called_with()
-        find_str_mock.assert_called_with(fake_tags, exclude)
+        self.test_htmlfcont._content = content_str
+        self.test_htmlfcont.truncate_content(exclude)
+        self.assertEqual(self.test_htmlfcont._content, content_str[:10])
+        find_pos_mock.assert_called_with(soup_mock, content_str, exclude, None)
 
-    def test__find_str_pos(self):
+    @patch("src.util.HTMLFileContent._remove_from")
+    @patch("src.util.cutoff.find_cutoff_tag")
+    def test_truncate_soup(self, find_tag_mock, remove_mock):
         soup_mock = MagicMock()
         content_str = "Some html content"
-        soup_mock.__str__.return_value = content_str
+        exclude = "content"
+        find_tag_mock.return_value = "tag2"
         self.test_htmlfcont.soup = soup_mock
-        tag1, tag2, tag3 = MagicMock(), MagicMock(), MagicMock()
-        tags = [tag1, tag2, tag3]
-        tag1.get_text.return_value = "not here"
-        tag2.get_text.return_value = "content here"
-        tag3.get_text.return_value = "not here"
-        tag2.__str__.return_value = "content"
-        find_str = "content"
-
-        # Case 1: string found
-        result = self.test_htmlfcont._find_str_pos(tags, find_str)
-        self.assertEqual(result, 10)
-        tag1.get_text.assert_called_once()
-        tag2.get_text.assert_called_once()
-        tag3.get_text.assert_not_called()
-        tag2.__str__.assert_called_once()
-
-        tag1.reset_mock()
-        tag2.reset_mock()
-        tag3.reset_mock()
-
-        # Case 2: string not found -> Exception
-        tag2.get_text.return_value = "not even here now"
-        with self.assertRaises(Exception) as e:
-            result = self.test_htmlfcont._find_str_pos(tags, find_str)
-        tag1.get_text.assert_called_once()
-        tag2.get_text.assert_called_once()
-        tag3.get_text.assert_called_once()
-        tag1.__str__.assert_not_called()
-        tag2.__str__.assert_not_called()
-        tag3.__str__.assert_not_called()
+        self.test_htmlfcont._content = content_str
+
+        # Case 1: tag name is provided
+        result = self.test_htmlfcont.truncate_soup(exclude, tag_name="a")
+        self.assertIs(result, self.test_htmlfcont)
+        find_tag_mock.assert_called_with(soup_mock, exclude, "a")
+        remove_mock.assert_called_with("tag2")
+        self.assertEqual(self.test_htmlfcont._content, content_str)
+        soup_mock.__str__.assert_not_called()
+
+        # Case 2: tag name NOT provided
+        self.test_htmlfcont.truncate_soup(exclude)
+        find_tag_mock.assert_called_with(soup_mock, exclude, None)
+
+    def test__remove_from(self):
+        html = (
+            "<html><body><div><p>keep</p><p>also <a>cut</a> this</p><p>gone</p></div>"
+            "<ul><li>gone too</li></ul></body></html>"
+        )
+        soup = BeautifulSoup(html, "html.parser")
+        util.HTMLFileContent._remove_from(soup.find("a"))
+        self.assertEqual(
+            str(soup), "<html><body><div><p>keep</p><p>also </p></div></body></html>"
+        )
 
 
 class TestParsedContent(TestCase):
@@ -104,25 +168,258 @@ class TestParsedContent(TestCase):
         test_instance = util.ParsedContent(some_source)
         content_mock.assert_called_with(some_source)
 
-    @patch("src.util.pd")
-    def test_load(self, pandas_mock):
-        fake_df = "some dataframe"
-        pandas_mock.DataFrame.return_value = fake_df
+    def test_load(self):
         some_source = [{"blah": "test"}]
-        test_instance = util.ParsedContent(some_source).load()
-        pandas_mock.DataFrame.assert_called_with(some_source)
-        self.assertEqual(test_instance._content, fake_df)
+        with patch.dict(sys.modules, {"pandas": None}):
+            # pandas is not needed for loading
+            test_instance = util.ParsedContent(some_source).load()
+        self.assertIs(test_instance._content, some_source)
 
-    @patch("src.util.pd.DataFrame")
-    def test_to_csv(self, df_mock):
-        df_instance = MagicMock()
-        df_mock.return_value = df_instance
+    @patch("pandas.DataFrame")
+    def test_to_dataframe(self, df_mock):
         some_source = [{"blah": "test"}]
-        output_name = "some_csv"
         test_instance = util.ParsedContent(some_source).load()
-        test_instance.to_csv(output_name)
-        df_instance.to_csv.assert_called_with(output_name)
-        self.assertEqual(test_instance._content, df_instance)
+        result = test_instance.to_dataframe()
+        df_mock.assert_called_once_with(some_source)
+        self.assertEqual(result, df_mock.return_value)
+        self.assertEqual(test_instance._content, df_mock.return_value)
+
+    def test_to_dataframe_built_once(self):
+        test_instance = util.ParsedContent(iter([{"blah": "test"}])).load()
+        frame = test_instance.to_dataframe()
+        self.assertIsInstance(frame, pd.DataFrame)
+        self.assertIs(test_instance.to_dataframe(), frame)
+        self.assertEqual(frame.to_dict("records"), [{"blah": "test"}])
+
+    def test_to_csv(self):
+        rows = [
+            {"name": "T-64BV", "count": 3, "links": None, "item": '(1, "destroyed")'},
+            {"name": "T-72", "count": 2, "links": "a b", "item": "(2, damaged)"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            streamed, from_pandas = Path(tmp_dir) / "a.csv", Path(tmp_dir) / "b.csv"
+
+            # Case 1: same output as pandas, also from a generator and with no rows
+            for source, expected_rows in [(rows, rows), (iter(rows), rows), ([], [])]:
+                with patch.dict(sys.modules, {"pandas": None}):
+                    util.ParsedContent(source).load().to_csv(streamed)
+                pd.DataFrame(expected_rows).to_csv(from_pandas)
+                self.assertEqual(streamed.read_bytes(), from_pandas.read_bytes())
+
+            # Case 2: already built DataFrame
+            test_instance = util.ParsedContent(rows).load()
+            test_instance.to_dataframe()
+            test_instance.to_csv(streamed)
+            pd.DataFrame(rows).to_csv(from_pandas)
+            self.assertEqual(streamed.read_bytes(), from_pandas.read_bytes())
+
+    def test_loss_rows(self):
+        rows = [
+            util.LossRow(1, "Tanks", "2", "T-72", 2, None, "(1, destroyed)", "p1"),
+            util.LossRow(1, "Tanks", "2", "T-72", 2, "a b", "(2, damaged)", "p2"),
+        ]
+        dict_rows = [row._asdict() for row in rows]
+        # Case 1: DataFrame in the long row column order
+        frame = util.ParsedContent(iter(rows)).load().to_dataframe()
+        self.assertEqual(tuple(frame.columns), util.LONGROW_COLUMNS)
+        self.assertEqual(frame.to_dict("records")[1], dict_rows[1])
+
+        # Case 2: same csv as from dict rows
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            from_records, from_dicts = Path(tmp_dir) / "a.csv", Path(tmp_dir) / "b.csv"
+            util.ParsedContent(iter(rows)).load().to_csv(from_records)
+            util.ParsedContent(dict_rows).load().to_csv(from_dicts)
+            self.assertEqual(from_records.read_bytes(), from_dicts.read_bytes())
+
+        # Case 3: extra columns only through dicts
+        self.assertEqual(util.row_dict(rows[0]), dict_rows[0])
+        self.assertIs(util.row_dict(dict_rows[0]), dict_rows[0])
+
+    @patch("src.util.ParsedContent.to_feather")
+    @patch("src.util.ParsedContent.to_parquet")
+    @patch("src.util.ParsedContent.to_csv")
+    def test_write(self, csv_mock, parquet_mock, feather_mock):
+        test_instance = util.ParsedContent([{"blah": "test"}]).load()
+
+        # Case 1: format from extension
+        test_instance.write("out.parquet")
+        parquet_mock.assert_called_with("out.parquet")
+        test_instance.write("out.arrow")
+        feather_mock.assert_called_with("out.arrow")
+
+        # Case 2: explicit format wins
+        test_instance.write("out.parquet", "csv")
+        csv_mock.assert_called_with("out.parquet")
+        test_instance.write("out.dat", "feather")
+        feather_mock.assert_called_with("out.dat")
+
+    def test__categorized(self):
+        rows = [
+            {"category_name": "Tanks", "type_name": "T-64BV", "loss_item": "(1)"},
+            {"category_name": "Tanks", "type_name": "T-72", "loss_item": "(2)"},
+        ]
+        categorized = util.ParsedContent(rows).load()._categorized()
+        self.assertEqual(categorized["category_name"].dtype, "category")
+        self.assertEqual(categorized["type_name"].dtype, "category")
+        self.assertEqual(categorized["loss_item"].dtype, object)
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_columnar_round_trip(self):
+        rows = [
+            {"category_name": "Tanks", "type_ttl_count": 2, "type_img_links": None},
+            {"category_name": "Tanks", "type_ttl_count": 2, "type_img_links": "a b"},
+        ]
+        test_instance = util.ParsedContent(rows).load()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, reader in [
+                ("out.parquet", pd.read_parquet),
+                ("out.arrow", pd.read_feather),
+                ("out.feather", pd.read_feather),
+            ]:
+                output_file = Path(tmp_dir) / name
+                test_instance.write(output_file)
+                frame = reader(output_file)
+                self.assertEqual(frame["category_name"].dtype, "category")
+                self.assertEqual(frame["type_ttl_count"].tolist(), [2, 2])
+                self.assertEqual(frame["type_img_links"].isna().tolist(), [True, False])
+                self.assertEqual(frame["type_img_links"][1], "a b")
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    @patch("src.util.CHUNK_ROWS", 2)
+    def test_to_parquet_chunked(self):
+        rows = [
+            {"category_name": f"C{i // 2}", "type_img_links": "a" if i else None}
+            for i in range(5)
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Case 1: generator written in row groups of CHUNK_ROWS rows
+            output_file = Path(tmp_dir) / "out.parquet"
+            util.ParsedContent(iter(rows)).load().to_parquet(output_file)
+            self.assertEqual(pyarrow.parquet.ParquetFile(output_file).num_row_groups, 3)
+            frame = pd.read_parquet(output_file)
+            self.assertEqual(frame["category_name"].dtype, "category")
+            self.assertEqual(
+                frame["category_name"].tolist(), ["C0", "C0", "C1", "C1", "C2"]
+            )
+            self.assertEqual(
+                frame["type_img_links"].isna().tolist(), [True] + [False] * 4
+            )
+
+            # Case 2: no rows
+            util.ParsedContent(iter([])).load().to_parquet(output_file)
+            self.assertTrue(pd.read_parquet(output_file).empty)
+
+            # Case 3: nullable columns empty in the first chunk, typed from the LossRow fields
+            counts = [None, None, 3, None, 7]
+            records = [
+                util.LossRow(1, "Tanks", None, "T-72", count, None, "(1)", None)
+                for count in counts
+            ]
+            dict_rows = [
+                {"category_name": "Tanks", "type_ttl_count": count} for count in counts
+            ]
+            for source in (records, dict_rows):
+                util.ParsedContent(iter(source)).load().to_parquet(output_file)
+                table = pyarrow.parquet.read_table(output_file)
+                self.assertEqual(table.schema.field("type_ttl_count").type, "int64")
+                self.assertEqual(table.column("type_ttl_count").to_pylist(), counts)
+
+    def test_iter_chunks(self):
+        self.assertEqual(
+            list(util.iter_chunks(iter(range(5)), 2)), [[0, 1], [2, 3], [4]]
+        )
+        self.assertEqual(list(util.iter_chunks([], 2)), [])
+
+    def test_to_sqlite(self):
+        def row(type_name, loss_proof, loss_item, count=2):
+            return {
+                "category_counter": 1,
+                "category_name": "Tanks",
+                "category_summary": "Tanks (2, of which destroyed: 2)",
+                "type_name": type_name,
+                "type_ttl_count": count,
+                "type_img_links": None,
+                "loss_item": loss_item,
+                "loss_proof": loss_proof,
+            }
+
+        rows = [
+            row("T-64BV", "https://x/1", "(1, destroyed)"),
+            # same proof link showing a second item of the type
+            row("T-64BV", "https://x/1", "(2, destroyed)"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = Path(tmp_dir) / "losses.db"
+            query = "SELECT snapshot_date, loss_item, occurrence, type_ttl_count FROM losses ORDER BY 1, 3"
+
+            # Case 1: new database, both items kept
+            util.ParsedContent(rows, "2024-05-01").load().write(output_file)
+            with closing(sqlite3.connect(output_file)) as connection:
+                self.assertEqual(
+                    connection.execute(query).fetchall(),
+                    [
+                        ("2024-05-01", "(1, destroyed)", 1, 2),
+                        ("2024-05-01", "(2, destroyed)", 2, 2),
+                    ],
+                )
+                self.assertEqual(
+                    connection.execute("PRAGMA journal_mode").fetchone(), ("wal",)
+                )
+
+            # Case 2: re-run of the snapshot updates in place, a new snapshot is appended
+            rerun = [row("T-64BV", "https://x/1", "(1, abandoned)", 3), rows[1]]
+            util.ParsedContent(rerun, "2024-05-01").load().to_sqlite(output_file)
+            util.ParsedContent(
+                [{"snapshot_date": "2024-05-02", **rows[0]}]
+            ).load().to_sqlite(output_file)
+            with closing(sqlite3.connect(output_file)) as connection:
+                self.assertEqual(
+                    connection.execute(query).fetchall(),
+                    [
+                        ("2024-05-01", "(1, abandoned)", 1, 3),
+                        ("2024-05-01", "(2, destroyed)", 2, 2),
+                        ("2024-05-02", "(1, destroyed)", 1, 2),
+                    ],
+                )
+
+            # Case 3: no snapshot date
+            with self.assertRaises(Exception):
+                util.ParsedContent(rows).load().to_sqlite(output_file)
+
+            # Case 4: normalized output refused next to the accumulated rows, which are kept
+            with self.assertRaises(Exception):
+                NormalizedContent(rows).load().to_sqlite(output_file)
+            util.ParsedContent(rows, "2024-05-03").load().to_sqlite(output_file)
+            with closing(sqlite3.connect(output_file)) as connection:
+                self.assertEqual(len(connection.execute(query).fetchall()), 5)
+
+            # Case 5: long rows refused in a database of normalized tables
+            normalized_file = Path(tmp_dir) / "normalized.db"
+            NormalizedContent(rows).load().to_sqlite(normalized_file)
+            with self.assertRaises(Exception):
+                util.ParsedContent(rows, "2024-05-01").load().to_sqlite(normalized_file)
+
+            # Case 6: losses table of another layout
+            other_file = Path(tmp_dir) / "other.db"
+            with closing(sqlite3.connect(other_file)) as connection:
+                connection.execute(
+                    "CREATE TABLE losses (loss_id INTEGER, loss_item TEXT)"
+                )
+            with self.assertRaises(Exception):
+                util.ParsedContent(rows, "2024-05-01").load().to_sqlite(other_file)
+
+
+class TestResolveOutputFormat(TestCase):
+
+    def test_resolve_output_format(self):
+        self.assertEqual(util.resolve_output_format("out.csv"), "csv")
+        self.assertEqual(util.resolve_output_format("out.PARQUET"), "parquet")
+        self.assertEqual(util.resolve_output_format("out.arrow"), "arrow")
+        self.assertEqual(util.resolve_output_format("out.feather"), "feather")
+        self.assertEqual(util.resolve_output_format("out.db"), "sqlite")
+        self.assertEqual(util.resolve_output_format("out.sqlite3"), "sqlite")
+        self.assertEqual(util.resolve_output_format("out.txt"), "csv")
+        self.assertEqual(util.resolve_output_format("out.csv", "parquet"), "parquet")
 
 
 class TestParseArgs(TestCase):
@@ -137,8 +434,141 @@ class TestParseArgs(TestCase):
         args = util.parse_args()
         self.assertEqual(args.file, "input.html")
         self.assertEqual(args.output_file, "output.html")
+        self.assertFalse(args.stream)
+        self.assertEqual(args.backend, "auto")
+        self.assertEqual(args.cache_file, None)
+        self.assertEqual(args.format, None)
+        self.assertFalse(args.normalized)
+        self.assertEqual(args.snapshot_date, None)
+        self.assertEqual(args.workers, None)
+        self.assertEqual(args.cache_dir, None)
+
+    # Case 1b: result cache directory
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.csv"]
+        + ["--cache_dir", "cache"],
+    )
+    def test_args_with_cache_dir(self):
+        self.assertEqual(util.parse_args().cache_dir, "cache")
+
+    # Case 1b: streaming flag
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.csv", "--stream"],
+    )
+    def test_args_with_stream(self):
+        args = util.parse_args()
+        self.assertTrue(args.stream)
+
+        # Case 1c: cache file, not together with streaming
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.csv"]
+        + ["--cache_file", "cache.json"],
+    )
+    def test_args_with_cache_file(self):
+        args = util.parse_args()
+        self.assertEqual(args.cache_file, "cache.json")
+        with patch.object(sys, "argv", sys.argv + ["--stream"]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+
+        # Case 1d: workers, not together with streaming
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.csv"]
+        + ["--workers", "4"],
+    )
+    def test_args_with_workers(self):
+        self.assertEqual(util.parse_args().workers, 4)
+        with patch.object(sys, "argv", sys.argv + ["--stream"]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+
+        # Case 1e: output format
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.csv", "--enrich"],
+    )
+    def test_args_with_enrich(self):
+        self.assertTrue(util.parse_args().enrich)
+        with patch.object(sys, "argv", sys.argv + ["--normalized"]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.db"]
+        + ["--snapshot_date", "2025-04-21"],
+    )
+    def test_args_with_sqlite(self):
+        self.assertEqual(util.parse_args().snapshot_date, "2025-04-21")
+        # Case 1: date from the file name
+        with patch.object(
+            sys, "argv", sys.argv[:2] + ["2025-04-21_ukr.html"] + sys.argv[3:5]
+        ):
+            self.assertEqual(util.parse_args().snapshot_date, None)
+        # Case 2: no snapshot date
+        with patch.object(sys, "argv", sys.argv[:5]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+        # Case 3: normalized tables have no snapshot date
+        with patch.object(sys, "argv", sys.argv[:5] + ["--normalized"]):
+            self.assertTrue(util.parse_args().normalized)
 
-    # Case 2: only input file is provided
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.db", "--normalized"],
+    )
+    def test_args_with_normalized(self):
+        self.assertTrue(util.parse_args().normalized)
+        for output_file in ("out.csv", "out.parquet"):
+            with patch.object(
+                sys, "argv", sys.argv[:4] + [output_file, "--normalized"]
+            ):
+                self.assertTrue(util.parse_args().normalized)
+        for output_args in (["out.arrow"], ["out.csv", "--format", "feather"]):
+            with patch.object(
+                sys, "argv", sys.argv[:4] + output_args + ["--normalized"]
+            ):
+                with self.assertRaises(SystemExit):
+                    util.parse_args()
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out.csv"]
+        + ["--category_totals", "totals.csv"],
+    )
+    def test_args_with_category_totals(self):
+        self.assertEqual(util.parse_args().category_totals, "totals.csv")
+        with patch.object(sys, "argv", sys.argv + ["--workers", "2"]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+        with patch.object(sys, "argv", sys.argv[:-1] + ["totals.db"]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "in.html", "--output_file", "out", "--format", "arrow"],
+    )
+    def test_args_with_format(self):
+        self.assertEqual(util.parse_args().format, "arrow")
+        with patch.object(sys, "argv", sys.argv[:-1] + ["xlsx"]):
+            with self.assertRaises(SystemExit):
+                util.parse_args()
+
+        # Case 2: only input file is provided
     @patch.object(sys, "argv", ["parsehtml", "--file", "input.html"])
     def test_args_with_only_file(self):
         with self.assertRaises(SystemExit):
@@ -157,5 +587,128 @@ class TestParseArgs(TestCase):
             util.parse_args()
 
 
+class TestSnapshotDate(TestCase):
+
+    def test_snapshot_date_from_path(self):
+        self.assertEqual(
+            util.snapshot_date_from_path(
+                "dir/2025-04-21_attack-on-europe-documenting-ukrainian.html"
+            ),
+            "2025-04-21",
+        )
+        self.assertEqual(util.snapshot_date_from_path("page.html"), None)
+        self.assertEqual(util.snapshot_date_from_path("x_2025-04-21.html"), None)
+
+
+class TestParseBatchArgs(TestCase):
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--input", "dir", "--side", "ukr", "--output_dir", "out"],
+    )
+    def test_args_with_output_dir(self):
+        args = util.parse_batch_args()
+        self.assertEqual(args.input, "dir")
+        self.assertEqual(args.side, "ukr")
+        self.assertEqual(args.output_dir, "out")
+        self.assertEqual(args.output_file, None)
+        self.assertEqual(args.workers, None)
+        self.assertEqual(args.backend, "auto")
+        self.assertEqual(args.members, "*.html")
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--input", "d", "--side", "ru", "--output_file", "o.csv"]
+        + ["--workers", "4"],
+    )
+    def test_args_with_output_file(self):
+        args = util.parse_batch_args()
+        self.assertEqual(args.output_file, "o.csv")
+        self.assertEqual(args.workers, 4)
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--input", "d", "--side", "ru", "--output_file", "o.csv"]
+        + ["--output_dir", "out"],
+    )
+    def test_args_with_both_outputs(self):
+        with self.assertRaises(SystemExit):
+            util.parse_batch_args()
+
+    @patch.object(sys, "argv", ["parsehtml", "--input", "d", "--side", "ru"])
+    def test_args_without_output(self):
+        with self.assertRaises(SystemExit):
+            util.parse_batch_args()
+
+
+class TestParsePledgeArgs(TestCase):
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--file", "pledges.html", "--output_file", "pledges.parquet"],
+    )
+    def test_args(self):
+        args = util.parse_pledge_args()
+        self.assertEqual(args.file, "pledges.html")
+        self.assertEqual(args.output_file, "pledges.parquet")
+        self.assertEqual(args.format, None)
+        self.assertEqual(args.backend, "auto")
+
+    @patch.object(
+        sys, "argv", ["parsehtml", "--file", "p.html", "--output_file", "p.db"]
+    )
+    def test_args_with_sqlite_output(self):
+        with self.assertRaises(SystemExit):
+            util.parse_pledge_args()
+        with patch.object(sys, "argv", sys.argv + ["--format", "sqlite"]):
+            with self.assertRaises(SystemExit):
+                util.parse_pledge_args()
+
+
+class TestParseWatchArgs(TestCase):
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--watch_dir", "in", "--output_dir", "out", "--side", "ukr"],
+    )
+    def test_args(self):
+        args = util.parse_watch_args()
+        self.assertEqual(args.watch_dir, "in")
+        self.assertEqual(args.output_dir, "out")
+        self.assertEqual(args.concurrency, 2)
+        self.assertEqual(args.queue_size, 16)
+        self.assertEqual(args.poll_interval, 2.0)
+        self.assertEqual(args.backend, "auto")
+
+    @patch.object(sys, "argv", ["parsehtml", "--watch_dir", "in", "--side", "ukr"])
+    def test_args_missing_output(self):
+        with self.assertRaises(SystemExit):
+            util.parse_watch_args()
+
+
+class TestParseDiffArgs(TestCase):
+
+    @patch.object(
+        sys,
+        "argv",
+        ["parsehtml", "--old", "a.csv", "--new", "b.csv", "--output_file", "d.csv"],
+    )
+    def test_args(self):
+        args = util.parse_diff_args()
+        self.assertEqual(args.old, "a.csv")
+        self.assertEqual(args.new, "b.csv")
+        self.assertEqual(args.output_file, "d.csv")
+
+    @patch.object(sys, "argv", ["parsehtml", "--old", "a.csv", "--new", "b.csv"])
+    def test_args_missing_output(self):
+        with self.assertRaises(SystemExit):
+            util.parse_diff_args()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,164 @@
+from unittest import IsolatedAsyncioTestCase, TestCase, main
+from unittest.mock import patch
+from argparse import Namespace
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import csv
+import os
+import shutil
+import tempfile
+
+from src import batch
+from src import runner
+from src import watch
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "oryx_losses.html"
+LIMIT, LIMIT_TAG = runner.UKR_LOSSES_CUTOFF
+
+
+class TestParseAtomically(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parse_atomically(self):
+        output_file = self.tmp_dir / "out.csv"
+
+        # Case 1: output renamed into place, no temp file left
+        rows = watch._parse_atomically(
+            FIXTURE, output_file, "csv", LIMIT, LIMIT_TAG, "html.parser", False, False
+        )
+        self.assertEqual(rows, 12)
+        self.assertEqual([file.name for file in self.tmp_dir.iterdir()], ["out.csv"])
+
+        # Case 2: failing parse leaves the previous output as it was
+        broken = self.tmp_dir / "broken.html"
+        broken.write_text("<html>no cutoff</html>")
+        before = output_file.read_bytes()
+        with self.assertRaises(Exception):
+            watch._parse_atomically(
+                broken, output_file, "csv", LIMIT, LIMIT_TAG, "html.parser", False, False
+            )
+        self.assertEqual(output_file.read_bytes(), before)
+        self.assertEqual(
+            sorted(file.name for file in self.tmp_dir.iterdir()),
+            ["broken.html", "out.csv"],
+        )
+
+
+class TestSnapshotWatcher(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.watch_dir = self.tmp_dir / "in"
+        self.watch_dir.mkdir()
+        self.watcher = watch.SnapshotWatcher(
+            self.watch_dir, self.tmp_dir / "out", LIMIT, LIMIT_TAG
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_scan(self):
+        snapshot = self.watch_dir / "2025-04-21_ukr.html"
+        snapshot.write_text("<html>")
+        (self.watch_dir / "notes.txt").write_text("")
+
+        # Case 1: queued once the file stopped changing between two scans
+        self.assertEqual(self.watcher.scan(), [])
+        self.assertEqual(self.watcher.scan(), [snapshot])
+        self.assertEqual(self.watcher.scan(), [])
+
+        # Case 2: changed file queued again
+        snapshot.write_text("<html></html>")
+        self.assertEqual(self.watcher.scan(), [])
+        self.assertEqual(self.watcher.scan(), [snapshot])
+
+    def test_scan_up_to_date(self):
+        snapshot = self.watch_dir / "2025-04-21_ukr.html"
+        snapshot.write_text("<html>")
+        output_file = self.watcher.output_path(snapshot)
+        output_file.parent.mkdir()
+        output_file.write_text("")
+        os.utime(snapshot, ns=(0, 0))
+        self.watcher.scan()
+        self.assertEqual(self.watcher.scan(), [])
+
+
+class TestSnapshotWatcherRun(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.watch_dir = self.tmp_dir / "in"
+        self.watch_dir.mkdir()
+        self.output_dir = self.tmp_dir / "out"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    async def test_run(self):
+        watcher = watch.SnapshotWatcher(
+            self.watch_dir,
+            self.output_dir,
+            LIMIT,
+            LIMIT_TAG,
+            "html.parser",
+            concurrency=2,
+            queue_size=1,
+            poll_interval=0.01,
+        )
+        with ThreadPoolExecutor(2) as executor:
+            task = asyncio.create_task(watcher.run(executor))
+            for name in ["2025-04-21_ukr.html", "2025-04-22_ukr.html"]:
+                shutil.copy(FIXTURE, self.watch_dir / name)
+            (self.watch_dir / "2025-04-23_ukr.html").write_text("<html></html>")
+            async with asyncio.timeout(10):
+                while len(watcher.parsed) + len(watcher.failed) < 3:
+                    await asyncio.sleep(0.01)
+            watcher.stop()
+            await task
+
+        self.assertEqual(list(watcher.failed), [self.watch_dir / "2025-04-23_ukr.html"])
+        error = watcher.failed[self.watch_dir / "2025-04-23_ukr.html"]
+        self.assertTrue(error.startswith("Exception: "))
+        self.assertLessEqual(len(error), len("Exception: ") + batch.MAX_ERROR_CHARS + 3)
+        self.assertEqual(
+            sorted(file.name for file in self.output_dir.iterdir()),
+            ["2025-04-21_ukr_parsed.csv", "2025-04-22_ukr_parsed.csv"],
+        )
+        with open(self.output_dir / "2025-04-22_ukr_parsed.csv") as file:
+            self.assertEqual(len(list(csv.DictReader(file))), 12)
+
+    @patch("src.watch.SnapshotWatcher.run")
+    async def test_run_watching(self, run_mock):
+        args = Namespace(
+            watch_dir="in",
+            output_dir="out",
+            side="ru",
+            backend="lxml",
+            format=None,
+            concurrency=3,
+            queue_size=5,
+            poll_interval=0.5,
+            stream=False,
+            pretruncate=True,
+            cache_dir=None,
+            enrich=False,
+        )
+        watcher = await watch.run_watching(args)
+        run_mock.assert_called_once_with()
+        self.assertEqual((watcher.limit, watcher.limit_tag), runner.RU_LOSSES_CUTOFF)
+        self.assertEqual(watcher.output_format, "csv")
+        self.assertEqual(watcher.concurrency, 3)
+        self.assertTrue(watcher.pretruncate)
+        self.assertIsNone(watcher.cache_dir)
+        self.assertFalse(watcher.enrich)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Parsing Oryx snapshots as they are saved into a directory, until interrupted
+"""
+
+import asyncio
+import logging
+
+from src import util
+from src import watch
+
+
+if __name__ == "__main__":
+    args = util.parse_watch_args()
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    try:
+        asyncio.run(watch.run_watching(args))
+    except KeyboardInterrupt:
+        pass